@@ -31,6 +31,7 @@ def build_config(
     available_sample_types: List[str],
     available_eras: List[str],
     available_scopes: List[str],
+    weight_variations: bool = True,
 ):
     configuration = Configuration(
         era,
@@ -42,6 +43,20 @@ def build_config(
         available_scopes,
     )
 
+    # Write the systematic variations of the event weights (pileup, muon and electron scale
+    # factors) as _up/_down columns of the nominal output. If disabled, they run as
+    # systematic shifts, each of which reruns the weight producers in a shifted copy.
+    if weight_variations:
+        pu_weights = event.PUweightsVariations
+        muon_sfs = scalefactors.MuonIDIsoTrigger_SF_Variations
+        electron_sfs = scalefactors.ElectronIDTrigger_SF_Variations
+        electron_id_sfs = [scalefactors.Ele_1_ID_SF_Variations, scalefactors.Ele_2_ID_SF_Variations]
+    else:
+        pu_weights = event.PUweights
+        muon_sfs = scalefactors.MuonIDIsoTrigger_SF
+        electron_sfs = scalefactors.ElectronIDTrigger_SF
+        electron_id_sfs = [scalefactors.Ele_1_ID_SF, scalefactors.Ele_2_ID_SF]
+
     configuration.add_config_parameters(
         "global",
         {
@@ -64,6 +79,8 @@ def build_config(
                 }
             ),
             "PU_reweighting_variation": "nominal",
+            "PU_reweighting_validation": 0,  # 1 compares the pileup weights of every event with correctionlib
+            "flat_corrections_dir": "",  # directory of the flatten_corrections.py tables, "" uses correctionlib
 
             "golden_json_file": EraModifier(
                 {
@@ -159,6 +176,30 @@ def build_config(
             "max_pfcands_eta": 2.5,
             "min_pfcands_mass": 0.139,
             "max_pfcands_mass": 0.14,
+            # candidates of each charge needed for the Higgs daughters: 2 for ChargePairs, 1 for HiggsSelection
+            "higgs_prefilter_min_per_charge": 2,
+            # cell size of the PF candidate eta-phi grid (PFCandGrid), at least the largest cone queried (isolation, 0.4)
+            "pfcand_grid_cell_size": 0.4,
+            # ranked Higgs quadruplets (HiggsSelectionRanked): number kept and ranking (higgs_mass, sum_pt or pair_mass_diff)
+            "higgs_quadruplets_k": 3,
+            "higgs_quadruplets_ranking": "higgs_mass",
+            "higgs_mass": 125.2,
+            # pseudoscalar pairing of GetPSPairs (min_mass_diff, highest_pair_pt or mass_window), min_mass_diff as GetPS.
+            # The mass hypothesis and width in GeV are only used by mass_window.
+            "ps_pairing_criterion": "min_mass_diff",
+            "ps_mass_hypothesis": 1.5,
+            "ps_mass_width": 0.5,
+            # parameters of the Higgs reconstruction, can be overridden at runtime through HAA_PARAMETERS
+            "higgs_pair_max_deltaR": 0.1,
+            "daughter_iso_cone": 0.4,
+            "daughter_iso_deltabeta": 0.5,
+            "kaon_mass": 0.493677,
+            "pion_mass": 0.13957039,
+            # working points of the scan producers (HiggsSelectionScan, Daughter_IsoScan), one entry per working point.
+            # The pT thresholds are applied on top of min_pfcands_pt.
+            "scan_min_pfcands_pt": "1.0,1.5,2.0,1.0,1.0",
+            "scan_higgs_pair_max_deltaR": "0.1,0.1,0.1,0.05,0.15",
+            "scan_daughter_iso_cone": "0.4,0.4,0.4,0.3,0.4",
             #"pfcands_fromPV_flag": "3",
 #            "higgs_reco_pt_cut": 10.0,
 
@@ -279,6 +320,7 @@ def build_config(
                 }
             ),
             "muon_sf_varation": "nominal",  # "nominal" is nominal, "systup"/"systdown" are up/down variations
+            "flat_corrections_dir": "",  # directory of the flatten_corrections.py tables, "" uses correctionlib
         },
     )    
     
@@ -342,6 +384,7 @@ def build_config(
             ),
             "nom_ele_trigger_sf_name": "h2_scaleFactorsEGamma",
             "syst_ele_trigger_sf_name": "h2_uncertaintiesEGamma",
+            "flat_corrections_dir": "",  # directory of the flatten_corrections.py tables, "" uses correctionlib
         },
     )
 
@@ -354,11 +397,20 @@ def build_config(
         },
     )
 
+    # signal: drop events without a complete H->aa->4h decay before the reconstruction
+    if sample == "Haa":
+        configuration.add_producers(
+            "global",
+            [
+                genparticles.GenDecayTree,
+                genparticles.GenDecayFilter,
+            ],
+        )
     configuration.add_producers(
         "global",
         [
             event.SampleFlags,
-            event.PUweights,
+            pu_weights,
             event.Lumi,
             event.MetFilter,
             #fromnano.copy,
@@ -370,11 +422,14 @@ def build_config(
 #            jets.BasicJetQuantities,
 #            fatjets.FatJetCollection,
 #            fatjets.BasicFatJetQuantities,
-            pfcands.BasePFCands,
+            pfcands.BasePFCandsFused,
+            higgs.HiggsDaughtersPreFilter,
             pfcands.ChargedPFCands,
             pfcands.NeutralPFCands,
             pfcands.PhotonPFCands,
-            pfcands.fromPV
+            pfcands.fromPV,
+            pfcands.PFCandView,
+            pfcands.PFCandGrid,
         ],
     )
     if sample == "data":
@@ -397,16 +452,17 @@ def build_config(
 #            ),
 #        )
 
+    # The Higgs reconstruction only depends on global PF candidate columns, so it
+    # runs once in the global scope and its columns are shared by all scopes.
     configuration.add_producers(
-        scopes,
+        "global",
         [
             higgs.ChargePairs,
             higgs.GoodHiggsDaughtersFilter,
-            higgs.HiggsQuantities,
-            higgsdaughters.dQuantities,
-            higgs.GetPS,
-            higgsdaughters.ps_daughters,
-            higgs.ps_quantities,
+            higgsdaughters.Daughter_IsoGrid,
+            higgs.HiggsCandidate,
+            higgs.HiggsCandidateQuantities,
+            higgs.HiggsCandidateMassHypotheses,
             #higgsdaughters.GetTrueDaughterP4s,
             #higgsdaughters.truth_dQuantities,
             #higgs.ps_masses,
@@ -423,7 +479,7 @@ def build_config(
             pairselection.LVMu2,
             pairquantities.MMDiTauPairQuantities,
             genparticles.MMGenDiTauPairQuantities,
-            scalefactors.MuonIDIsoTrigger_SF,
+            muon_sfs,
         ],
     )
     
@@ -438,7 +494,7 @@ def build_config(
             pairselection.LVEl2,
             pairquantities.EEDiTauPairQuantities,
             genparticles.EEGenDiTauPairQuantities,
-            scalefactors.ElectronIDTrigger_SF
+            electron_sfs
         ],
     )
 
@@ -455,8 +511,8 @@ def build_config(
             pairselection.LVMu2,
             pairquantities.EMDiTauPairQuantities,
             genparticles.EMGenDiTauPairQuantities,
-            scalefactors.ElectronIDTrigger_SF,
-            scalefactors.MuonIDIsoTrigger_SF
+            electron_sfs,
+            muon_sfs
         ],
     )
     if era == "2024":
@@ -464,7 +520,7 @@ def build_config(
             "ee",
             RemoveProducer(
                 producers=[
-                    scalefactors.ElectronIDTrigger_SF,
+                    electron_sfs,
                 ],
                 samples=["Haa", "bkg"],
             )
@@ -473,7 +529,7 @@ def build_config(
             "em",
             RemoveProducer(
                 producers=[
-                    scalefactors.ElectronIDTrigger_SF,
+                    electron_sfs,
                 ],
                 samples=["Haa", "bkg"],
             )
@@ -481,21 +537,21 @@ def build_config(
         configuration.add_producers(
             "ee",
             [
-                scalefactors.Ele_1_ID_SF,
-                scalefactors.Ele_2_ID_SF,
+                electron_id_sfs[0],
+                electron_id_sfs[1],
             ],
         )
         configuration.add_producers(
             "em",
             [
-                scalefactors.Ele_1_ID_SF,
+                electron_id_sfs[0],
             ],
         )
     configuration.add_modification_rule(
         "global",
         RemoveProducer(
             producers=[
-                event.PUweights,
+                pu_weights,
                 ],
             samples=["data"],
         ),
@@ -505,7 +561,7 @@ def build_config(
         RemoveProducer(
             producers=[
                 genparticles.MMGenDiTauPairQuantities,
-                scalefactors.MuonIDIsoTrigger_SF,
+                muon_sfs,
             ],
             samples=["data"],
         ),
@@ -515,8 +571,8 @@ def build_config(
         RemoveProducer(
             producers=[
                 genparticles.EMGenDiTauPairQuantities,
-                scalefactors.ElectronIDTrigger_SF,
-                scalefactors.MuonIDIsoTrigger_SF   
+                electron_sfs,
+                muon_sfs   
             ],
             samples=["data"],
         ),
@@ -526,7 +582,7 @@ def build_config(
         RemoveProducer(
             producers=[
                 genparticles.EEGenDiTauPairQuantities,
-                scalefactors.ElectronIDTrigger_SF
+                electron_sfs
             ],
             samples=["data"],
         ),
@@ -544,6 +600,10 @@ def build_config(
         q.ps_2_mass,
         q.ps_1_deltaR,
         q.ps_2_deltaR,
+        q.H_mass_hypotheses,
+        q.ps_1_mass_hypotheses,
+        q.ps_2_mass_hypotheses,
+        q.daughter_mass_hypotheses,
         #q.ps1Pair,
         #q.ps2Pair,
         #q.higgsdaughters,
@@ -737,154 +797,201 @@ def build_config(
     )
 
 
-    configuration.add_shift(
-        SystematicShift(
-            name="PUUp",
-            shift_config={"global": {"PU_reweighting_variation": "up"}},
-            producers={
-                "global": [
-                    event.PUweights,
-                ],
-            },
+    if weight_variations:
+        configuration.add_outputs(
+            "mm",
+            [
+                q.puweight_up,
+                q.puweight_down,
+                q.id_wgt_mu_1_up,
+                q.id_wgt_mu_1_down,
+                q.id_wgt_mu_2_up,
+                q.id_wgt_mu_2_down,
+                q.iso_wgt_mu_1_up,
+                q.iso_wgt_mu_1_down,
+                q.iso_wgt_mu_2_up,
+                q.iso_wgt_mu_2_down,
+                q.trigger_wgt_mu_1_up,
+                q.trigger_wgt_mu_1_down,
+                q.trigger_wgt_mu_2_up,
+                q.trigger_wgt_mu_2_down,
+            ],
         )
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="PUDown",
-            shift_config={"global": {"PU_reweighting_variation": "down"}},
-            producers={
-                "global": [
-                    event.PUweights,
-                ],
-            },
+        configuration.add_outputs(
+            "ee",
+            [
+                q.puweight_up,
+                q.puweight_down,
+                q.id_wgt_ele_1_up,
+                q.id_wgt_ele_1_down,
+                q.id_wgt_ele_2_up,
+                q.id_wgt_ele_2_down,
+            ],
         )
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonIDUp",
-            shift_config={"mm": {"muon_sf_varation": "systup"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_ID_SF,
-                    scalefactors.Muon_2_ID_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_ID_SF,
-                ],
-            },
+        configuration.add_outputs(
+            "em",
+            [
+                q.puweight_up,
+                q.puweight_down,
+                q.id_wgt_ele_1_up,
+                q.id_wgt_ele_1_down,
+                q.id_wgt_mu_2_up,
+                q.id_wgt_mu_2_down,
+                q.iso_wgt_mu_2_up,
+                q.iso_wgt_mu_2_down,
+                q.trigger_wgt_mu_2_up,
+                q.trigger_wgt_mu_2_down,
+            ],
         )
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonIDDown",
-            shift_config={"mm": {"muon_sf_varation": "systdown"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_ID_SF,
-                    scalefactors.Muon_2_ID_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_ID_SF,
-                ],
-            },
+    else:
+        configuration.add_shift(
+            SystematicShift(
+                name="PUUp",
+                shift_config={"global": {"PU_reweighting_variation": "up"}},
+                producers={
+                    "global": [
+                        event.PUweights,
+                    ],
+                },
+            )
+        )
+        configuration.add_shift(
+            SystematicShift(
+                name="PUDown",
+                shift_config={"global": {"PU_reweighting_variation": "down"}},
+                producers={
+                    "global": [
+                        event.PUweights,
+                    ],
+                },
+            )
+        )
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonIDUp",
+                shift_config={"mm": {"muon_sf_varation": "systup"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_ID_SF,
+                        scalefactors.Muon_2_ID_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_ID_SF,
+                    ],
+                },
+            )
+        )
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonIDDown",
+                shift_config={"mm": {"muon_sf_varation": "systdown"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_ID_SF,
+                        scalefactors.Muon_2_ID_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_ID_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonIsoUp",
-            shift_config={"mm": {"muon_sf_varation": "systup"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_Iso_SF,
-                    scalefactors.Muon_2_Iso_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_Iso_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonIsoUp",
+                shift_config={"mm": {"muon_sf_varation": "systup"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_Iso_SF,
+                        scalefactors.Muon_2_Iso_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_Iso_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonIsoDown",
-            shift_config={"mm": {"muon_sf_varation": "systdown"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_Iso_SF,
-                    scalefactors.Muon_2_Iso_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_Iso_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonIsoDown",
+                shift_config={"mm": {"muon_sf_varation": "systdown"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_Iso_SF,
+                        scalefactors.Muon_2_Iso_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_Iso_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonTriggerUp",
-            shift_config={"mm": {"muon_sf_varation": "systup"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_Trigger_SF,
-                    scalefactors.Muon_2_Trigger_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_Trigger_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonTriggerUp",
+                shift_config={"mm": {"muon_sf_varation": "systup"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_Trigger_SF,
+                        scalefactors.Muon_2_Trigger_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_Trigger_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="MuonTriggerDown",
-            shift_config={"mm": {"muon_sf_varation": "systdown"}},
-            producers={
-                "mm": [
-                    scalefactors.Muon_1_Trigger_SF,
-                    scalefactors.Muon_2_Trigger_SF,
-                ],
-                "em": [
-                    scalefactors.Muon_2_Trigger_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="MuonTriggerDown",
+                shift_config={"mm": {"muon_sf_varation": "systdown"}},
+                producers={
+                    "mm": [
+                        scalefactors.Muon_1_Trigger_SF,
+                        scalefactors.Muon_2_Trigger_SF,
+                    ],
+                    "em": [
+                        scalefactors.Muon_2_Trigger_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="ElectronIDUp",
-            shift_config={"ee": {"ele_sf_varation": "sfup"}},
-            producers={
-                "ee": [
-                    scalefactors.Ele_1_ID_SF,
-                    scalefactors.Ele_2_ID_SF,
-                ],
-                "em": [
-                    scalefactors.Ele_1_ID_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="ElectronIDUp",
+                shift_config={"ee": {"ele_sf_varation": "sfup"}},
+                producers={
+                    "ee": [
+                        scalefactors.Ele_1_ID_SF,
+                        scalefactors.Ele_2_ID_SF,
+                    ],
+                    "em": [
+                        scalefactors.Ele_1_ID_SF,
+                    ],
+                },
+            )
         )
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="ElectronIDDown",
-            shift_config={"ee": {"ele_sf_varation": "sfdown"}},
-            producers={
-                "ee": [
-                    scalefactors.Ele_1_ID_SF,
-                    scalefactors.Ele_2_ID_SF,
-                ],
-                "em": [
-                    scalefactors.Ele_1_ID_SF,
-                ],
-            },
+        configuration.add_shift(
+            SystematicShift(
+                name="ElectronIDDown",
+                shift_config={"ee": {"ele_sf_varation": "sfdown"}},
+                producers={
+                    "ee": [
+                        scalefactors.Ele_1_ID_SF,
+                        scalefactors.Ele_2_ID_SF,
+                    ],
+                    "em": [
+                        scalefactors.Ele_1_ID_SF,
+                    ],
+                },
+            )
         )
-    )
 
 
     #########################
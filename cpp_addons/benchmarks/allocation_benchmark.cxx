@@ -0,0 +1,239 @@
+/**
+ * Heap allocations per event of the cpp_addons column lambdas
+ *
+ * RDataFrame calls the Define lambdas with the column values as lvalues, so every parameter
+ * taken by value (e.g. `const ROOT::RVec<float> pfcand_pt`) is a full copy of the column,
+ * and every Nonzero/Take or vector comparison creates further temporaries. This benchmark
+ * counts the heap allocations (global operator new) of the previous and of the current
+ * versions of some of the lambdas on randomly generated events:
+ *
+ *   - haa::ChargePairsAlgo (column overload)
+ *   - haa::getGenPt
+ *   - physicsobject::jet::VetoOverlappingJetsLooseLeptons (without the debug logging)
+ *   - flags::flagMask
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 allocation_benchmark.cxx $(root-config --cflags --libs) -o allocation_benchmark
+ *   ./allocation_benchmark
+ */
+
+#include "ROOT/RVec.hxx"
+#include <Math/Vector3D.h>
+#include <Math/VectorUtil.h>
+#include <algorithm>
+#include <cstdio>
+#include <cstdlib>
+#include <new>
+#include <random>
+#include <vector>
+
+namespace {
+std::size_t n_allocations = 0;
+}
+
+void *operator new(std::size_t size) {
+  n_allocations++;
+  if (void *ptr = std::malloc(size)) {
+    return ptr;
+  }
+  throw std::bad_alloc();
+}
+
+void operator delete(void *ptr) noexcept { std::free(ptr); }
+void operator delete(void *ptr, std::size_t) noexcept { std::free(ptr); }
+
+namespace {
+
+const float default_float = -10.;
+
+struct Event {
+  ROOT::RVec<float> pfcand_pt, pfcand_eta, pfcand_phi, pfcand_mass;
+  ROOT::RVec<int> pfcand_charge, pfcand_mask;
+  ROOT::RVec<int> genpart_mask;
+  ROOT::RVec<float> genpart_pt;
+  ROOT::RVec<int> lepton_mask;
+  ROOT::RVec<float> lepton_eta, lepton_phi;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.3);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    e.pfcand_pt.push_back(0.5 + pt(rng));
+    e.pfcand_eta.push_back(eta(rng));
+    e.pfcand_phi.push_back(phi(rng));
+    e.pfcand_mass.push_back(0.1396);
+    e.pfcand_charge.push_back(rng() % 2 ? 1 : -1);
+    e.pfcand_mask.push_back(rng() % 4 == 0);
+  }
+  for (int i = 0; i < 200; i++) {
+    e.genpart_mask.push_back(i > 20 && rng() % 10 == 0);
+    e.genpart_pt.push_back(pt(rng));
+  }
+  for (int i = 0; i < 4; i++) {
+    e.lepton_mask.push_back(rng() % 2);
+    e.lepton_eta.push_back(eta(rng));
+    e.lepton_phi.push_back(phi(rng));
+  }
+  return e;
+}
+
+// the body of haa::ChargePairsAlgo is unchanged, only the parameters are taken by reference now
+ROOT::RVec<int> ChargePairs(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+  auto original_pfcand_indices = ROOT::VecOps::Nonzero(pfcand_mask);
+  ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+  if (original_pfcand_indices.size() < 4) {
+    return selected_hadrons;
+  }
+  std::sort(original_pfcand_indices.begin(), original_pfcand_indices.end(), [&pfcand_pt](int a, int b) {
+    return pfcand_pt[a] > pfcand_pt[b];
+  });
+  int countpos = 0;
+  int countneg = 0;
+  ROOT::RVec<int> two_hardest_pos = {-1, -1};
+  ROOT::RVec<int> two_hardest_neg = {-1, -1};
+  for (int i = 0; i < original_pfcand_indices.size(); i++) {
+    if (pfcand_charge[original_pfcand_indices[i]] == 1 && countpos < 2) {
+      two_hardest_pos[countpos] = original_pfcand_indices[i];
+      countpos++;
+    }
+    if (pfcand_charge[original_pfcand_indices[i]] == -1 && countneg < 2) {
+      two_hardest_neg[countneg] = original_pfcand_indices[i];
+      countneg++;
+    }
+  }
+  if (countpos < 2 || countneg < 2) {
+    return selected_hadrons;
+  }
+  selected_hadrons = {two_hardest_pos[0], two_hardest_neg[0], two_hardest_pos[1], two_hardest_neg[1]};
+  return selected_hadrons;
+}
+
+// previous versions
+
+auto charge_pairs_old = [](const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<int> pfcand_charge, const ROOT::RVec<int> pfcand_mask) {
+  return ChargePairs(pfcand_pt, pfcand_charge, pfcand_mask);
+};
+
+auto gen_pt_old = [](const ROOT::RVec<int> genpart_mask, const ROOT::RVec<float> genpart_pt) {
+  auto original_genpart_indices = ROOT::VecOps::Nonzero(genpart_mask);
+  const auto good_pts = ROOT::VecOps::Take(genpart_pt, original_genpart_indices);
+  return good_pts[0];
+};
+
+auto veto_old = [](const ROOT::RVec<float> &jet_eta, const ROOT::RVec<float> &jet_phi, const ROOT::RVec<int> &loose_lepton_mask,
+                   const ROOT::RVec<float> &lepton_eta, const ROOT::RVec<float> &lepton_phi) {
+  const float deltaRmin = 0.4;
+  ROOT::RVec<int> mask(jet_eta.size(), 1);
+  const auto loose_leptons = ROOT::VecOps::Nonzero(loose_lepton_mask);
+  if (loose_leptons.size() == 0) {
+    return mask;
+  }
+  auto loose_lepton_eta = ROOT::VecOps::Take(lepton_eta, loose_leptons);
+  auto loose_lepton_phi = ROOT::VecOps::Take(lepton_phi, loose_leptons);
+  for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+    ROOT::Math::RhoEtaPhiVectorF jet(0, jet_eta.at(idx), jet_phi.at(idx));
+    for (int i = 0; i < loose_lepton_eta.size(); i++) {
+      ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, loose_lepton_eta.at(i), loose_lepton_phi.at(i));
+      if (ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton) < deltaRmin) {
+        mask[idx] = 0;
+        break;
+      }
+    }
+  }
+  return mask;
+};
+
+auto flag_old = [](const ROOT::RVec<int> &mask) { return bool(ROOT::VecOps::Any(mask == 1)); };
+
+// current versions
+
+auto charge_pairs_new = [](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+  return ChargePairs(pfcand_pt, pfcand_charge, pfcand_mask);
+};
+
+auto gen_pt_new = [](const ROOT::RVec<int> &genpart_mask, const ROOT::RVec<float> &genpart_pt) {
+  for (std::size_t i = 0; i < genpart_mask.size(); i++) {
+    if (genpart_mask[i]) {
+      return genpart_pt[i];
+    }
+  }
+  return default_float;
+};
+
+auto veto_new = [](const ROOT::RVec<float> &jet_eta, const ROOT::RVec<float> &jet_phi, const ROOT::RVec<int> &loose_lepton_mask,
+                   const ROOT::RVec<float> &lepton_eta, const ROOT::RVec<float> &lepton_phi) {
+  const float deltaRmin = 0.4;
+  ROOT::RVec<int> mask(jet_eta.size(), 1);
+  if (!ROOT::VecOps::Any(loose_lepton_mask)) {
+    return mask;
+  }
+  for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+    ROOT::Math::RhoEtaPhiVectorF jet(0, jet_eta.at(idx), jet_phi.at(idx));
+    for (std::size_t i = 0; i < loose_lepton_mask.size(); i++) {
+      if (!loose_lepton_mask[i]) {
+        continue;
+      }
+      ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, lepton_eta.at(i), lepton_phi.at(i));
+      if (ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton) < deltaRmin) {
+        mask[idx] = 0;
+        break;
+      }
+    }
+  }
+  return mask;
+};
+
+auto flag_new = [](const ROOT::RVec<int> &mask) {
+  return std::any_of(mask.begin(), mask.end(), [](const int value) { return value == 1; });
+};
+
+template <typename F>
+double AllocationsPerEvent(const std::vector<Event> &events, F &&f) {
+  const std::size_t before = n_allocations;
+  for (const auto &e : events) {
+    f(e);
+  }
+  return double(n_allocations - before) / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 1000;
+  std::printf("%10s %-16s %12s %12s %10s\n", "nPFCands", "lambda", "before", "after", "mismatches");
+  for (const int npfcands : {100, 500, 2000}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, npfcands));
+    }
+    int mismatches[4] = {0, 0, 0, 0};
+    for (const auto &e : events) {
+      mismatches[0] += charge_pairs_old(e.pfcand_pt, e.pfcand_charge, e.pfcand_mask) != charge_pairs_new(e.pfcand_pt, e.pfcand_charge, e.pfcand_mask);
+      mismatches[1] += gen_pt_old(e.genpart_mask, e.genpart_pt) != gen_pt_new(e.genpart_mask, e.genpart_pt);
+      mismatches[2] += ROOT::VecOps::Any(veto_old(e.pfcand_eta, e.pfcand_phi, e.lepton_mask, e.lepton_eta, e.lepton_phi) !=
+                                         veto_new(e.pfcand_eta, e.pfcand_phi, e.lepton_mask, e.lepton_eta, e.lepton_phi));
+      mismatches[3] += flag_old(e.pfcand_mask) != flag_new(e.pfcand_mask);
+    }
+    std::printf("%10d %-16s %12.1f %12.1f %10d\n", npfcands, "ChargePairsAlgo",
+                AllocationsPerEvent(events, [](const Event &e) { charge_pairs_old(e.pfcand_pt, e.pfcand_charge, e.pfcand_mask); }),
+                AllocationsPerEvent(events, [](const Event &e) { charge_pairs_new(e.pfcand_pt, e.pfcand_charge, e.pfcand_mask); }),
+                mismatches[0]);
+    std::printf("%10d %-16s %12.1f %12.1f %10d\n", npfcands, "getGenPt",
+                AllocationsPerEvent(events, [](const Event &e) { gen_pt_old(e.genpart_mask, e.genpart_pt); }),
+                AllocationsPerEvent(events, [](const Event &e) { gen_pt_new(e.genpart_mask, e.genpart_pt); }),
+                mismatches[1]);
+    std::printf("%10d %-16s %12.1f %12.1f %10d\n", npfcands, "VetoOverlapping",
+                AllocationsPerEvent(events, [](const Event &e) { veto_old(e.pfcand_eta, e.pfcand_phi, e.lepton_mask, e.lepton_eta, e.lepton_phi); }),
+                AllocationsPerEvent(events, [](const Event &e) { veto_new(e.pfcand_eta, e.pfcand_phi, e.lepton_mask, e.lepton_eta, e.lepton_phi); }),
+                mismatches[2]);
+    std::printf("%10d %-16s %12.1f %12.1f %10d\n", npfcands, "flagMask",
+                AllocationsPerEvent(events, [](const Event &e) { flag_old(e.pfcand_mask); }),
+                AllocationsPerEvent(events, [](const Event &e) { flag_new(e.pfcand_mask); }),
+                mismatches[3]);
+  }
+  return 0;
+}
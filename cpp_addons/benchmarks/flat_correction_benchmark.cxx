@@ -0,0 +1,149 @@
+/**
+ * Cost of evaluating a binned scale factor with correctionlib and with a flattened table
+ *
+ * scalefactor::muon::variations evaluates the nominal value and the systup and systdown
+ * variations of the muon scale factors. With correctionlib, each of them walks the
+ * correction tree (|η| binning, pT binning, category of the variation) with the inputs
+ * passed as variants. With the table written by flatten_corrections.py
+ * (haa::flat::Table), the bin is looked up once and the three values are read next to
+ * each other.
+ *
+ * The benchmark writes a correction with the layout of the muon POG scale factors and
+ * random values, builds its table in memory, times both evaluations per object and counts
+ * the evaluations for which they differ (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 flat_correction_benchmark.cxx $(root-config --cflags --libs) \
+ *       $(correction config --cflags --ldflags --rpath) -o flat_correction_benchmark
+ *   ./flat_correction_benchmark
+ */
+
+#include "../include/flat_corrections.hxx"
+#include "correction.h"
+#include <chrono>
+#include <cstdio>
+#include <fstream>
+#include <random>
+#include <sstream>
+#include <vector>
+
+namespace {
+
+const std::vector<double> abseta_edges = {0.0, 0.9, 1.2, 2.1, 2.4};
+const std::vector<double> pt_edges = {15.0, 20.0, 25.0, 30.0, 40.0, 50.0, 60.0, 120.0};
+const std::vector<std::string> variations = {"nominal", "systup", "systdown"};
+
+std::string Edges(const std::vector<double> &edges) {
+  std::ostringstream out;
+  out.precision(17);
+  out << "[";
+  for (std::size_t i = 0; i < edges.size(); i++) {
+    out << (i ? ", " : "") << std::showpoint << edges[i];
+  }
+  out << "]";
+  return out.str();
+}
+
+/// correction json in the layout of the muon POG scale factors, values in row-major order
+std::string Correction(const std::vector<double> &values) {
+  std::ostringstream out;
+  out.precision(17);
+  out << R"({"schema_version": 2, "corrections": [{"name": "sf", "version": 1, "inputs": [)"
+      << R"({"name": "abseta", "type": "real"}, {"name": "pt", "type": "real"}, {"name": "scale_factors", "type": "string"}],)"
+      << R"("output": {"name": "weight", "type": "real"}, "data": {"nodetype": "binning", "input": "abseta", "edges": )"
+      << Edges(abseta_edges) << R"(, "flow": "clamp", "content": [)";
+  std::size_t position = 0;
+  for (std::size_t i = 0; i + 1 < abseta_edges.size(); i++) {
+    out << (i ? ", " : "") << R"({"nodetype": "binning", "input": "pt", "edges": )" << Edges(pt_edges)
+        << R"(, "flow": "clamp", "content": [)";
+    for (std::size_t j = 0; j + 1 < pt_edges.size(); j++) {
+      out << (j ? ", " : "") << R"({"nodetype": "category", "input": "scale_factors", "content": [)";
+      for (std::size_t k = 0; k < variations.size(); k++) {
+        out << (k ? ", " : "") << R"({"key": ")" << variations[k] << R"(", "value": )" << values[position++] << "}";
+      }
+      out << "]}";
+    }
+    out << "]}";
+  }
+  out << "]}}]}";
+  return out.str();
+}
+
+/// table of the correction, with the values of correctionlib at the bin centers as in
+/// scalefactor::LoadFlatCorrection
+haa::flat::Table Table(const correction::Correction &correction) {
+  haa::flat::Table table;
+  table.name = "sf";
+  table.variations = variations;
+  int argument = 0;
+  for (const auto &edges : {abseta_edges, pt_edges}) {
+    haa::flat::Axis axis;
+    axis.argument = argument++;
+    axis.uniform = false;
+    axis.n = edges.size() - 1;
+    axis.edges = edges;
+    axis.low = edges.front();
+    axis.high = edges.back();
+    axis.flow = haa::flat::Flow::clamp;
+    axis.flow_value = 0;
+    table.axes.push_back(axis);
+  }
+  table.strides = {variations.size() * (pt_edges.size() - 1), variations.size()};
+  for (int i = 0; i < table.axes[0].n; i++) {
+    for (int j = 0; j < table.axes[1].n; j++) {
+      for (const auto &variation : variations) {
+        table.values.push_back(correction.evaluate({table.axes[0].Center(i), table.axes[1].Center(j), variation}));
+      }
+    }
+  }
+  return table;
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  std::uniform_real_distribution<double> uniform(0.8, 1.2);
+  std::vector<double> values((abseta_edges.size() - 1) * (pt_edges.size() - 1) * variations.size());
+  for (auto &value : values) {
+    value = uniform(rng);
+  }
+  const std::string path = "flat_correction_benchmark.json";
+  std::ofstream(path) << Correction(values);
+  const auto correction = correction::CorrectionSet::from_file(path)->at("sf");
+  const auto table = Table(*correction);
+
+  const int nobjects = 1000000;
+  std::uniform_real_distribution<double> abseta(0, 2.6);
+  std::uniform_real_distribution<double> pt(10, 200);
+  std::vector<std::array<double, 2>> objects(nobjects);
+  for (auto &object : objects) {
+    object = {abseta(rng), pt(rng)};
+  }
+  int mismatches = 0;
+  for (const auto &object : objects) {
+    const auto flat = table.EvaluateAll<3>(object.data());
+    for (int k = 0; k < 3; k++) {
+      mismatches += flat[k] != correction->evaluate({object[0], object[1], variations[k]});
+    }
+  }
+  double checksum = 0;
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &object : objects) {
+    for (int k = 0; k < 3; k++) {
+      checksum += correction->evaluate({object[0], object[1], variations[k]});
+    }
+  }
+  const auto middle = std::chrono::steady_clock::now();
+  for (const auto &object : objects) {
+    const auto flat = table.EvaluateAll<3>(object.data());
+    checksum += flat[0] + flat[1] + flat[2];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  std::printf("%14s %14s %10s\n", "correctionlib", "flat table", "mismatches");
+  std::printf("%11.0f ns %11.0f ns %10d\n",
+              std::chrono::duration<double, std::nano>(middle - start).count() / nobjects,
+              std::chrono::duration<double, std::nano>(stop - middle).count() / nobjects, mismatches);
+  std::printf("(checksum %g)\n", checksum);
+  return 0;
+}
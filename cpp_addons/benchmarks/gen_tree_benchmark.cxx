@@ -0,0 +1,133 @@
+/**
+ * Cost of the generator particle truth with and without the decay tree index
+ *
+ * haa::GetTrueDaughterP4s used to walk the generator particles twice, once for the
+ * pseudoscalar daughters and once for the Higgs boson, reading the pdgId of the mother
+ * also for the particles without mother (index -1). Both now query the decay tree index
+ * gen::DecayTree, which is built once per event by haa::GetGenDecayTree and is shared with
+ * haa::GetTruthDaughterPairs.
+ *
+ * The benchmark times, per event, the previous scans (with a guard for the missing
+ * mothers, which the previous implementation did not have) against building the index and
+ * querying it, as a function of the number of generator particles, and counts the events
+ * in which the daughters or the Higgs boson differ (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 gen_tree_benchmark.cxx $(root-config --cflags --libs) -o gen_tree_benchmark
+ *   ./gen_tree_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <cstdlib>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<int> pdgid, mother;
+  ROOT::RVec<float> pt;
+};
+
+struct Truth {
+  ROOT::RVec<int> daughters;
+  int higgs;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int ngenpart) {
+  // pdgIds as they appear in the pruned generator particles
+  static const int ids[] = {22, 22, 22, 22, 211, -211, 211, -211, 111, 21, 21, 1, -1, 2, -2,
+                            11, -11, 13, -13, 321, -321, 2212, 130, 310, 15, -15, 16, 5, -5, 23};
+  std::uniform_real_distribution<float> uniform(0, 1);
+  Event e;
+  for (int i = 0; i < ngenpart; i++) {
+    e.pdgid.push_back(ids[rng() % 30]);
+    e.mother.push_back(i < 2 ? -1 : static_cast<int>(uniform(rng) * i));
+    e.pt.push_back(50 * uniform(rng));
+  }
+  // H -> H -> aa -> 4 charged kaons
+  e.pdgid[5] = 25;
+  e.pdgid[20] = 25;
+  e.mother[20] = 5;
+  e.pdgid[30] = 9000006;
+  e.pdgid[31] = 9000006;
+  e.mother[30] = 20;
+  e.mother[31] = 20;
+  for (int k = 0; k < 4; k++) {
+    e.pdgid[40 + k] = k % 2 ? -321 : 321;
+    e.mother[40 + k] = k < 2 ? 30 : 31;
+  }
+  return e;
+}
+
+Truth Previous(const Event &e) {
+  Truth truth;
+  std::vector<int> positive;
+  std::vector<int> negative;
+  for (std::size_t i = 0; i < e.pdgid.size(); i++) {
+    const int mother = e.mother[i];
+    if (mother >= 0 && std::abs(e.pdgid[mother]) == 9000006 && e.pdgid[i] > 0) {
+      positive.push_back(i);
+    }
+    if (mother >= 0 && std::abs(e.pdgid[mother]) == 9000006 && e.pdgid[i] < 0) {
+      negative.push_back(i);
+    }
+  }
+  const auto by_pt = [&e](int a, int b) { return e.pt[a] > e.pt[b]; };
+  std::sort(positive.begin(), positive.end(), by_pt);
+  std::sort(negative.begin(), negative.end(), by_pt);
+  truth.daughters = {positive[0], negative[0], positive[1], negative[1]};
+  truth.higgs = -1;
+  for (std::size_t i = 0; i < e.pdgid.size(); i++) {
+    const int mother = e.mother[i];
+    if (mother >= 0 && e.pdgid[mother] == 25) {
+      truth.higgs = mother;
+    }
+  }
+  return truth;
+}
+
+Truth DecayTree(const Event &e) {
+  const auto tree = haa::gen::BuildDecayTree(e.pdgid, e.mother);
+  return {haa::gen::TruthDaughters(tree, e.pt), haa::gen::TruthHiggs(tree)};
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    const auto truth = f(e);
+    checksum += truth.daughters[0] + truth.higgs;
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 20000;
+  long checksum = 0;
+  std::printf("%-10s %14s %14s %10s\n", "ngenpart", "previous", "decay tree", "mismatches");
+  for (const int ngenpart : {50, 100, 200, 400}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, ngenpart));
+    }
+    int mismatches = 0;
+    for (const auto &e : events) {
+      const auto previous = Previous(e);
+      const auto tree = DecayTree(e);
+      mismatches += !ROOT::VecOps::All(previous.daughters == tree.daughters) || previous.higgs != tree.higgs;
+    }
+    const double t_previous = NanosecondsPerEvent(events, Previous, checksum);
+    const double t_tree = NanosecondsPerEvent(events, DecayTree, checksum);
+    std::printf("%-10d %11.0f ns %11.0f ns %10d\n", ngenpart, t_previous, t_tree, mismatches);
+  }
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
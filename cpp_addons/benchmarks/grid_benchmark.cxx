@@ -0,0 +1,142 @@
+/**
+ * Cost of the ΔR searches with and without the η-φ grid
+ *
+ * The daughter isolation and the good pair search of ClosestToHiggsMassAlgo compare
+ * objects in ΔR. Without a spatial index every query loops over the full collection. With
+ * haa::EtaPhiGrid the PF candidates are sorted into cells once per event and each query
+ * only visits the neighbouring cells.
+ *
+ * The benchmark generates events with a varying number of PF candidates and times, per
+ * event:
+ *
+ *   - grid build: BuildEtaPhiGrid over all PF candidates (shared by the consumers)
+ *   - isolation: FillConeSums for four daughters, cone 0.4
+ *   - pair search: FindGoodPairs on the selected candidates, ΔR < 0.1
+ *
+ * and the total with the grid built once. It also counts events for which the grid and the
+ * full-pass results differ (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 grid_benchmark.cxx $(root-config --cflags --libs) -o grid_benchmark
+ *   ./grid_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge, mask;
+  ROOT::RVec<int> charged, neutral, photon, from_pv;
+  ROOT::RVec<int> daughters;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.3);
+  std::uniform_real_distribution<float> uniform(0, 1);
+  // a few collimated candidates, so that good pairs exist
+  std::normal_distribution<float> smear(0, 0.05);
+  const float jet_eta = eta(rng);
+  const float jet_phi = phi(rng);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    const bool collimated = uniform(rng) < 0.02;
+    e.pt.push_back(1.0 + pt(rng));
+    e.eta.push_back(collimated ? jet_eta + smear(rng) : eta(rng));
+    e.phi.push_back(collimated ? haa::DeltaPhi(0, jet_phi + smear(rng)) : phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(rng() % 2 ? 1 : -1);
+    e.mask.push_back(collimated || uniform(rng) < 0.02);
+    const float type = uniform(rng);
+    e.charged.push_back(type < 0.6);
+    e.neutral.push_back(type >= 0.6 && type < 0.75);
+    e.photon.push_back(type >= 0.75);
+    e.from_pv.push_back(uniform(rng) < 0.7);
+  }
+  for (int i = 0; i < 4; i++) {
+    e.daughters.push_back(rng() % npfcands);
+  }
+  return e;
+}
+
+bool SameSums(const haa::iso::ConeSums &a, const haa::iso::ConeSums &b) {
+  return a.charged_hadron_from_pv == b.charged_hadron_from_pv && a.neutral_hadron == b.neutral_hadron &&
+         a.photon == b.photon && a.charged_hadron_not_from_pv == b.charged_hadron_not_from_pv;
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    f(e);
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 2000;
+  const double cell_size = 0.4;
+  double checksum = 0;
+  std::printf("%9s %7s %21s %21s %21s\n", "nPFCands", "grid", "isolation", "pair search", "total");
+  std::printf("%9s %7s %10s %10s %10s %10s %10s %10s %10s\n", "", "build", "full", "grid", "full", "grid",
+              "full", "grid", "mismatch");
+  for (const int npfcands : {100, 300, 1000, 3000}) {
+    std::vector<Event> events;
+    std::vector<haa::PFCandView> views;
+    std::vector<haa::EtaPhiGrid> grids;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, npfcands));
+      const auto &e = events.back();
+      views.push_back(haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask));
+      grids.push_back(haa::BuildEtaPhiGrid(e.eta, e.phi, cell_size));
+    }
+
+    int mismatches = 0;
+    for (int i = 0; i < nevents; i++) {
+      const auto &e = events[i];
+      const auto iso_full = haa::iso::FillConeSums(e.pt, e.eta, e.phi, e.daughters, e.charged, e.neutral, e.photon, e.from_pv, 0.4);
+      const auto iso_grid = haa::iso::FillConeSums(e.pt, e.eta, e.phi, e.daughters, e.charged, e.neutral, e.photon, e.from_pv, 0.4, grids[i]);
+      const bool same_pairs = haa::quadruplets::FindGoodPairs(views[i], 0.1) == haa::quadruplets::FindGoodPairs(views[i], grids[i], 0.1);
+      mismatches += !SameSums(iso_full, iso_grid) || !same_pairs;
+    }
+
+    int n = 0;
+    const double t_build = NanosecondsPerEvent(events, [&](const Event &e) {
+      checksum += haa::BuildEtaPhiGrid(e.eta, e.phi, cell_size).entries.size();
+    });
+    const double t_iso_full = NanosecondsPerEvent(events, [&](const Event &e) {
+      checksum += haa::iso::FillConeSums(e.pt, e.eta, e.phi, e.daughters, e.charged, e.neutral, e.photon, e.from_pv, 0.4).photon[0];
+    });
+    n = 0;
+    const double t_iso_grid = NanosecondsPerEvent(events, [&](const Event &e) {
+      checksum += haa::iso::FillConeSums(e.pt, e.eta, e.phi, e.daughters, e.charged, e.neutral, e.photon, e.from_pv, 0.4, grids[n++]).photon[0];
+    });
+    n = 0;
+    const double t_pairs_full = NanosecondsPerEvent(events, [&](const Event &) {
+      checksum += haa::quadruplets::FindGoodPairs(views[n++], 0.1).size();
+    });
+    n = 0;
+    const double t_pairs_grid = NanosecondsPerEvent(events, [&](const Event &) {
+      checksum += haa::quadruplets::FindGoodPairs(views[n], grids[n], 0.1).size();
+      n++;
+    });
+    const double t_full = t_iso_full + t_pairs_full;
+    const double t_grid = t_build + t_iso_grid + t_pairs_grid;
+    std::printf("%9d %7.0f %10.0f %10.0f %10.0f %10.0f %10.0f %10.0f %10d\n", npfcands, t_build, t_iso_full,
+                t_iso_grid, t_pairs_full, t_pairs_grid, t_full, t_grid, mismatches);
+  }
+  std::printf("times in ns per event (checksum %g)\n", checksum);
+  return 0;
+}
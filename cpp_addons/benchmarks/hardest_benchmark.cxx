@@ -0,0 +1,186 @@
+/**
+ * Cost of finding the hardest PF candidates with and without sorting
+ *
+ * The configured FourHardestPFCands and ChargePairs producers read the hardest candidates
+ * from the PF candidate view (haa::GetPFCandView). The view used to copy the selected
+ * indices, sort all of them by pT and split the sorted list by charge. It now collects the
+ * four hardest candidates and the two hardest of each charge in the pass that applies the
+ * mask, with the fixed-size insertion buffers of haa::HardestByPt.
+ *
+ * The benchmark times, per event, building the view with the full sort and reading the
+ * daughters from the sorted lists against building the current view and reading its
+ * buffers, as a function of the number of selected PF candidates. Both include the
+ * kinematics of the view. It counts the events in which the selected candidates differ
+ * from the sorted lists, and from the mask overloads (haa::FindHardest,
+ * haa::FindHardestByCharge). The pT values are rounded to 0.1 GeV, so that ties occur;
+ * the sort is stable, for equal pT the lower index comes first everywhere (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 hardest_benchmark.cxx $(root-config --cflags --libs) -o hardest_benchmark
+ *   ./hardest_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge, mask;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands, const double selected_fraction) {
+  std::exponential_distribution<float> pt(0.5);
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::uniform_real_distribution<float> uniform(0, 1);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    e.pt.push_back(std::round(10 * (1.0 + pt(rng))) / 10);
+    e.eta.push_back(eta(rng));
+    e.phi.push_back(phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(uniform(rng) < 0.1 ? 0 : (rng() % 2 ? 1 : -1));
+    e.mask.push_back(uniform(rng) < selected_fraction);
+  }
+  return e;
+}
+
+/// the view as it was built before, with all selected candidates sorted by pT
+struct SortedView {
+  haa::PFCandView view;
+  ROOT::RVec<int> sorted_indices;
+  ROOT::RVec<int> positive_indices;
+  ROOT::RVec<int> negative_indices;
+};
+
+SortedView BuildSortedView(const Event &e) {
+  SortedView sorted;
+  auto &view = sorted.view;
+  for (std::size_t i = 0; i < e.mask.size(); i++) {
+    if (e.mask[i]) {
+      view.indices.push_back(i);
+    }
+  }
+  sorted.sorted_indices = view.indices;
+  std::stable_sort(sorted.sorted_indices.begin(), sorted.sorted_indices.end(), [&e](int a, int b) { return e.pt[a] > e.pt[b]; });
+  for (const int idx : sorted.sorted_indices) {
+    if (e.charge[idx] == 1) {
+      sorted.positive_indices.push_back(idx);
+    } else if (e.charge[idx] == -1) {
+      sorted.negative_indices.push_back(idx);
+    }
+  }
+  const std::size_t n = view.indices.size();
+  view.pt.resize(n);
+  view.eta.resize(n);
+  view.phi.resize(n);
+  view.sinphi.resize(n);
+  view.cosphi.resize(n);
+  view.px.resize(n);
+  view.py.resize(n);
+  view.pz.resize(n);
+  view.energy.resize(n);
+  view.charge.resize(n);
+  for (std::size_t k = 0; k < n; k++) {
+    const int idx = view.indices[k];
+    const double pt = e.pt[idx];
+    const double eta = e.eta[idx];
+    const double sinphi = std::sin(e.phi[idx]);
+    const double cosphi = std::cos(e.phi[idx]);
+    const double p = pt * std::cosh(eta);
+    view.pt[k] = e.pt[idx];
+    view.eta[k] = e.eta[idx];
+    view.phi[k] = e.phi[idx];
+    view.sinphi[k] = sinphi;
+    view.cosphi[k] = cosphi;
+    view.px[k] = pt * cosphi;
+    view.py[k] = pt * sinphi;
+    view.pz[k] = pt * std::sinh(eta);
+    view.energy[k] = std::sqrt(p * p + e.mass[idx] * e.mass[idx]);
+    view.charge[k] = e.charge[idx];
+  }
+  return sorted;
+}
+
+haa::PFCandView BuildView(const Event &e) {
+  return haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask);
+}
+
+std::array<int, 4> SortedFourHardest(const SortedView &sorted) {
+  if (sorted.sorted_indices.size() < 4) {
+    return {-1, -1, -1, -1};
+  }
+  return {sorted.sorted_indices[0], sorted.sorted_indices[1], sorted.sorted_indices[2], sorted.sorted_indices[3]};
+}
+
+std::array<int, 4> SortedChargePairs(const SortedView &sorted) {
+  if (sorted.positive_indices.size() < 2 || sorted.negative_indices.size() < 2) {
+    return {-1, -1, -1, -1};
+  }
+  return {sorted.positive_indices[0], sorted.negative_indices[0], sorted.positive_indices[1], sorted.negative_indices[1]};
+}
+
+/// as FourHardestPFCandsAlgo on the view
+std::array<int, 4> FourHardest(const haa::HardestByPt<4> &hardest) {
+  if (!hardest.Full()) {
+    return {-1, -1, -1, -1};
+  }
+  return hardest.indices;
+}
+
+/// as ChargePairsAlgo on the view
+std::array<int, 4> ChargePairs(const haa::HardestByCharge<2> &hardest) {
+  if (!hardest.positive.Full() || !hardest.negative.Full()) {
+    return {-1, -1, -1, -1};
+  }
+  return {hardest.positive.indices[0], hardest.negative.indices[0], hardest.positive.indices[1], hardest.negative.indices[1]};
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += f(e)[0];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 5000;
+  long checksum = 0;
+  std::printf("%-10s %-14s %12s %12s %10s\n", "selected", "algorithm", "sorted view", "view", "mismatches");
+  for (const int nselected : {10, 100, 500, 1000}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, 2000, nselected / 2000.0));
+    }
+    int mismatches_four = 0;
+    int mismatches_pairs = 0;
+    for (const auto &e : events) {
+      const auto sorted = BuildSortedView(e);
+      const auto view = BuildView(e);
+      const auto four = FourHardest(view.hardest);
+      const auto pairs = ChargePairs(view.hardest_by_charge);
+      mismatches_four += four != SortedFourHardest(sorted) || four != FourHardest(haa::FindHardest<4>(e.pt, e.mask));
+      mismatches_pairs += pairs != SortedChargePairs(sorted) || pairs != ChargePairs(haa::FindHardestByCharge<2>(e.pt, e.charge, e.mask));
+    }
+    const double t_four_sort = NanosecondsPerEvent(events, [](const Event &e) { return SortedFourHardest(BuildSortedView(e)); }, checksum);
+    const double t_four_view = NanosecondsPerEvent(events, [](const Event &e) { return FourHardest(BuildView(e).hardest); }, checksum);
+    const double t_pairs_sort = NanosecondsPerEvent(events, [](const Event &e) { return SortedChargePairs(BuildSortedView(e)); }, checksum);
+    const double t_pairs_view = NanosecondsPerEvent(events, [](const Event &e) { return ChargePairs(BuildView(e).hardest_by_charge); }, checksum);
+    std::printf("%-10d %-14s %9.0f ns %9.0f ns %10d\n", nselected, "FourHardest", t_four_sort, t_four_view, mismatches_four);
+    std::printf("%-10d %-14s %9.0f ns %9.0f ns %10d\n", nselected, "ChargePairs", t_pairs_sort, t_pairs_view, mismatches_pairs);
+  }
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
@@ -0,0 +1,198 @@
+/**
+ * Cost of the debug logging in the jet/PF candidate - lepton overlap veto
+ *
+ * physicsobject::jet::VetoOverlappingJetsLooseLeptons logs inside its jet x lepton loop.
+ * With Logger::get(name)->debug(...) every call looks up the logger in the registry (string
+ * construction, mutex, hash map, shared_ptr copy) before the log level is checked, even if
+ * debug output is disabled. With HAA_DEBUG from haa_logging.hxx the calls are removed at
+ * compile time unless HAA_DEBUG_LOGGING is defined.
+ *
+ * The benchmark times three versions of the veto on randomly generated events:
+ *   - reference: no logging statements at all
+ *   - HAA_DEBUG: the current implementation, built without HAA_DEBUG_LOGGING
+ *   - registry lookup: the previous implementation, with a stand-in for Logger::get that
+ *     does the same registry lookup and level check as spdlog with debug disabled
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 logging_benchmark.cxx $(root-config --cflags --libs) -o logging_benchmark
+ *   ./logging_benchmark
+ */
+
+#include "../include/haa_logging.hxx"
+#include "ROOT/RVec.hxx"
+#include <Math/Vector3D.h>
+#include <Math/VectorUtil.h>
+#include <chrono>
+#include <cstdio>
+#include <memory>
+#include <mutex>
+#include <random>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#ifdef HAA_DEBUG_LOGGING
+#error "logging_benchmark measures the release build, compile it without HAA_DEBUG_LOGGING"
+#endif
+
+namespace {
+
+// stand-in for Logger::get and the spdlog registry, debug level disabled
+struct StandInLogger {
+  int level = 2;
+  template <typename... Args>
+  void debug(const char *, const Args &...) const {
+    if (level <= 1) {
+      std::abort();
+    }
+  }
+};
+
+std::mutex registry_mutex;
+std::unordered_map<std::string, std::shared_ptr<StandInLogger>> registry;
+
+std::shared_ptr<StandInLogger> GetLogger(const std::string &name) {
+  std::lock_guard<std::mutex> lock(registry_mutex);
+  auto &logger = registry[name];
+  if (!logger) {
+    logger = std::make_shared<StandInLogger>();
+  }
+  return logger;
+}
+
+struct Event {
+  ROOT::RVec<float> pfcand_eta, pfcand_phi;
+  ROOT::RVec<int> lepton_mask;
+  ROOT::RVec<float> lepton_eta, lepton_phi;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    e.pfcand_eta.push_back(eta(rng));
+    e.pfcand_phi.push_back(phi(rng));
+  }
+  for (int i = 0; i < 4; i++) {
+    e.lepton_mask.push_back(1);
+    e.lepton_eta.push_back(eta(rng));
+    e.lepton_phi.push_back(phi(rng));
+  }
+  return e;
+}
+
+ROOT::RVec<int> VetoReference(const Event &e, const float deltaRmin) {
+  ROOT::RVec<int> mask(e.pfcand_eta.size(), 1);
+  if (!ROOT::VecOps::Any(e.lepton_mask)) {
+    return mask;
+  }
+  for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+    ROOT::Math::RhoEtaPhiVectorF jet(0, e.pfcand_eta.at(idx), e.pfcand_phi.at(idx));
+    for (std::size_t i = 0; i < e.lepton_mask.size(); i++) {
+      if (!e.lepton_mask[i]) {
+        continue;
+      }
+      ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, e.lepton_eta.at(i), e.lepton_phi.at(i));
+      auto deltaR = ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton);
+      if (deltaR < deltaRmin) {
+        mask[idx] = 0;
+        break;
+      }
+    }
+  }
+  return mask;
+}
+
+ROOT::RVec<int> VetoHaaDebug(const Event &e, const float deltaRmin) {
+  HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Checking jets");
+  ROOT::RVec<int> mask(e.pfcand_eta.size(), 1);
+  if (!ROOT::VecOps::Any(e.lepton_mask)) {
+    return mask;
+  }
+  for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+    ROOT::Math::RhoEtaPhiVectorF jet(0, e.pfcand_eta.at(idx), e.pfcand_phi.at(idx));
+    HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Jet:  Eta: {} Phi: {} ", jet.Eta(), jet.Phi());
+    for (std::size_t i = 0; i < e.lepton_mask.size(); i++) {
+      if (!e.lepton_mask[i]) {
+        continue;
+      }
+      ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, e.lepton_eta.at(i), e.lepton_phi.at(i));
+      HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Loose letpon:  Eta: {} Phi: {}", loose_lepton.Eta(), loose_lepton.Phi());
+      auto deltaR = ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton);
+      HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "DeltaR: {}", deltaR);
+      if (deltaR < deltaRmin) {
+        mask[idx] = 0;
+        break;
+      }
+    }
+  }
+  HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "vetomask due to overlap: {}", mask);
+  return mask;
+}
+
+ROOT::RVec<int> VetoRegistryLookup(const Event &e, const float deltaRmin) {
+  GetLogger("VetoOverlappingJetsLooseLeptons")->debug("Checking jets");
+  ROOT::RVec<int> mask(e.pfcand_eta.size(), 1);
+  if (!ROOT::VecOps::Any(e.lepton_mask)) {
+    return mask;
+  }
+  for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+    ROOT::Math::RhoEtaPhiVectorF jet(0, e.pfcand_eta.at(idx), e.pfcand_phi.at(idx));
+    GetLogger("VetoOverlappingJetsLooseLeptons")->debug("Jet:  Eta: {} Phi: {} ", jet.Eta(), jet.Phi());
+    for (std::size_t i = 0; i < e.lepton_mask.size(); i++) {
+      if (!e.lepton_mask[i]) {
+        continue;
+      }
+      ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, e.lepton_eta.at(i), e.lepton_phi.at(i));
+      GetLogger("VetoOverlappingJetsLooseLeptons")->debug("Loose letpon:  Eta: {} Phi: {}", loose_lepton.Eta(), loose_lepton.Phi());
+      auto deltaR = ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton);
+      GetLogger("VetoOverlappingJetsLooseLeptons")->debug("DeltaR: {}", deltaR);
+      if (deltaR < deltaRmin) {
+        mask[idx] = 0;
+        break;
+      }
+    }
+  }
+  GetLogger("VetoOverlappingJetsLooseLeptons")->debug("vetomask due to overlap: {}", mask);
+  return mask;
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += ROOT::VecOps::Sum(f(e, 0.4));
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 2000;
+  std::printf("%10s %14s %14s %18s %10s\n", "nPFCands", "reference", "HAA_DEBUG", "registry lookup", "mismatches");
+  for (const int npfcands : {50, 200, 1000, 4000}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, npfcands));
+    }
+    int mismatches = 0;
+    for (const auto &e : events) {
+      const auto reference = VetoReference(e, 0.4);
+      mismatches += !ROOT::VecOps::All(reference == VetoHaaDebug(e, 0.4));
+      mismatches += !ROOT::VecOps::All(reference == VetoRegistryLookup(e, 0.4));
+    }
+    long checksum = 0;
+    const double t_reference = NanosecondsPerEvent(events, VetoReference, checksum);
+    const double t_haa_debug = NanosecondsPerEvent(events, VetoHaaDebug, checksum);
+    const double t_registry = NanosecondsPerEvent(events, VetoRegistryLookup, checksum);
+    std::printf("%10d %11.0f ns %11.0f ns %15.0f ns %10d\n", npfcands, t_reference, t_haa_debug, t_registry, mismatches);
+    if (checksum == 0) {
+      std::printf("no PF candidate passed the veto\n");
+    }
+  }
+  return 0;
+}
@@ -0,0 +1,106 @@
+/**
+ * Cost of the reco-to-truth matching of the four Higgs daughters
+ *
+ * haa::MatchDaughtersToTruth matches the reco daughters to the truth daughters in the event
+ * loop with matching::BestMatch, which computes the 16 ΔR once and scans the 24 assignments
+ * from a fixed table without data dependent branches. The straightforward implementation
+ * steps through the permutations with std::next_permutation and computes the four ΔR of
+ * each of them.
+ *
+ * The benchmark times, per event, both implementations on randomly generated daughters
+ * (reco daughters smeared around the truth daughters) and counts the events in which the
+ * assignment differs (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 matching_benchmark.cxx $(root-config --cflags --libs) -o matching_benchmark
+ *   ./matching_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  std::array<double, 4> reco_eta, reco_phi, truth_eta, truth_phi;
+};
+
+Event GenerateEvent(std::mt19937 &rng) {
+  std::uniform_real_distribution<double> eta(-2.5, 2.5);
+  std::uniform_real_distribution<double> phi(-M_PI, M_PI);
+  // collimated daughters, reconstructed with a resolution comparable to their separation
+  std::normal_distribution<double> spread(0, 0.05);
+  std::normal_distribution<double> smear(0, 0.01);
+  const double axis_eta = eta(rng);
+  const double axis_phi = phi(rng);
+  std::array<int, 4> order = {0, 1, 2, 3};
+  std::shuffle(order.begin(), order.end(), rng);
+  Event e;
+  for (int i = 0; i < 4; i++) {
+    e.truth_eta[i] = axis_eta + spread(rng);
+    e.truth_phi[i] = haa::DeltaPhi(0, axis_phi + spread(rng));
+  }
+  for (int i = 0; i < 4; i++) {
+    e.reco_eta[i] = e.truth_eta[order[i]] + smear(rng);
+    e.reco_phi[i] = haa::DeltaPhi(0, e.truth_phi[order[i]] + smear(rng));
+  }
+  return e;
+}
+
+std::array<int, 4> PermutationScan(const Event &e) {
+  std::array<int, 4> permutation = {0, 1, 2, 3};
+  std::array<int, 4> best = permutation;
+  double best_sum = std::numeric_limits<double>::max();
+  do {
+    double sum = 0;
+    for (int i = 0; i < 4; i++) {
+      const double deta = e.reco_eta[i] - e.truth_eta[permutation[i]];
+      const double dphi = haa::DeltaPhi(e.reco_phi[i], e.truth_phi[permutation[i]]);
+      sum += std::sqrt(deta * deta + dphi * dphi);
+    }
+    if (sum < best_sum) {
+      best_sum = sum;
+      best = permutation;
+    }
+  } while (std::next_permutation(permutation.begin(), permutation.end()));
+  return best;
+}
+
+std::array<int, 4> BestMatch(const Event &e) {
+  return haa::matching::BestMatch(e.reco_eta, e.reco_phi, e.truth_eta, e.truth_phi).truth;
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += f(e)[0];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 200000;
+  std::vector<Event> events;
+  for (int i = 0; i < nevents; i++) {
+    events.push_back(GenerateEvent(rng));
+  }
+  int mismatches = 0;
+  for (const auto &e : events) {
+    mismatches += PermutationScan(e) != BestMatch(e);
+  }
+  long checksum = 0;
+  const double t_scan = NanosecondsPerEvent(events, PermutationScan, checksum);
+  const double t_best = NanosecondsPerEvent(events, BestMatch, checksum);
+  std::printf("%14s %14s %10s\n", "permutations", "BestMatch", "mismatches");
+  std::printf("%11.0f ns %11.0f ns %10d\n", t_scan, t_best, mismatches);
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
@@ -0,0 +1,156 @@
+/**
+ * Cost of the pseudoscalar pairing of the four Higgs daughters
+ *
+ * haa::GetMinMassDiff used to step through all 24 permutations of the four daughters,
+ * building four PtEtaPhiMVector on each of them, although only 3 distinct pairings exist.
+ * haa::GetPseudoScalars rebuilt both daughter vectors for each of the 6 pairs. Both now
+ * build the four daughters once in Cartesian form (pairing::FourBody) and score the 3
+ * pairings with pairing::BestPairing.
+ *
+ * The benchmark times, per event, the previous implementations against BestPairing for the
+ * minimum mass difference and the highest pair pT, and counts the events in which the
+ * selected first pair differs (has to be 0, the daughters have two charges of each sign).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 pairing_benchmark.cxx $(root-config --cflags --libs) -o pairing_benchmark
+ *   ./pairing_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <Math/Vector4D.h>
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge;
+  ROOT::RVec<int> daughters;
+};
+
+Event GenerateEvent(std::mt19937 &rng) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.3);
+  Event e;
+  for (int i = 0; i < 20; i++) {
+    e.pt.push_back(1.0 + pt(rng));
+    e.eta.push_back(eta(rng));
+    e.phi.push_back(phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(i % 2 ? 1 : -1);
+  }
+  // two daughters of each charge, in random order
+  std::vector<int> candidates = {0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19};
+  std::shuffle(candidates.begin(), candidates.end(), rng);
+  int npositive = 0;
+  int nnegative = 0;
+  for (const int idx : candidates) {
+    int &n = e.charge[idx] > 0 ? npositive : nnegative;
+    if (n < 2) {
+      e.daughters.push_back(idx);
+      n++;
+    }
+  }
+  return e;
+}
+
+std::array<int, 2> PermutationMinMassDiff(const Event &e) {
+  std::array<int, 2> minMassDiffIdxs = {-1, -1};
+  ROOT::RVec<int> daughters = e.daughters;
+  std::sort(daughters.begin(), daughters.end());
+  float minMassDiff = 9999.0;
+  do {
+    if (e.charge[daughters[0]] != e.charge[daughters[1]] && e.charge[daughters[2]] != e.charge[daughters[3]]) {
+      auto daughter_1 = ROOT::Math::PtEtaPhiMVector(e.pt[daughters[0]], e.eta[daughters[0]], e.phi[daughters[0]], e.mass[daughters[0]]);
+      auto daughter_2 = ROOT::Math::PtEtaPhiMVector(e.pt[daughters[1]], e.eta[daughters[1]], e.phi[daughters[1]], e.mass[daughters[1]]);
+      auto daughter_3 = ROOT::Math::PtEtaPhiMVector(e.pt[daughters[2]], e.eta[daughters[2]], e.phi[daughters[2]], e.mass[daughters[2]]);
+      auto daughter_4 = ROOT::Math::PtEtaPhiMVector(e.pt[daughters[3]], e.eta[daughters[3]], e.phi[daughters[3]], e.mass[daughters[3]]);
+      float massDiff = std::abs((daughter_1 + daughter_2).M() - (daughter_3 + daughter_4).M());
+      if (massDiff < minMassDiff) {
+        minMassDiff = massDiff;
+        minMassDiffIdxs = {daughters[0], daughters[1]};
+      }
+    }
+  } while (std::next_permutation(daughters.begin(), daughters.end()));
+  return minMassDiffIdxs;
+}
+
+std::array<int, 2> PairLoopHighestPt(const Event &e) {
+  std::array<int, 2> highPtPairIdxs = {-1, -1};
+  float highPt = 0;
+  for (std::size_t i = 0; i < e.daughters.size(); i++) {
+    for (std::size_t j = i + 1; j < e.daughters.size(); j++) {
+      const int idx_1 = e.daughters[i];
+      const int idx_2 = e.daughters[j];
+      if (e.charge[idx_1] != e.charge[idx_2]) {
+        auto daughter_1 = ROOT::Math::PtEtaPhiMVector(e.pt[idx_1], e.eta[idx_1], e.phi[idx_1], e.mass[idx_1]);
+        auto daughter_2 = ROOT::Math::PtEtaPhiMVector(e.pt[idx_2], e.eta[idx_2], e.phi[idx_2], e.mass[idx_2]);
+        auto ps = daughter_1 + daughter_2;
+        if (ps.Pt() > highPt) {
+          highPt = ps.Pt();
+          highPtPairIdxs = {idx_1, idx_2};
+        }
+      }
+    }
+  }
+  return highPtPairIdxs;
+}
+
+std::array<int, 2> BestPairing(const Event &e, const haa::pairing::Criterion criterion, const bool sorted) {
+  std::array<int, 4> daughters = {e.daughters[0], e.daughters[1], e.daughters[2], e.daughters[3]};
+  if (sorted) {
+    std::sort(daughters.begin(), daughters.end());
+  }
+  const auto best = haa::pairing::BestPairing(
+      haa::pairing::FourBodyFromPFCands(e.pt, e.eta, e.phi, e.mass, e.charge, daughters), criterion);
+  if (!best.Valid()) {
+    return {-1, -1};
+  }
+  return {daughters[best.pairs[0][0]], daughters[best.pairs[0][1]]};
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += f(e)[0];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 200000;
+  std::vector<Event> events;
+  for (int i = 0; i < nevents; i++) {
+    events.push_back(GenerateEvent(rng));
+  }
+  using haa::pairing::Criterion;
+  auto min_mass_diff = [](const Event &e) { return BestPairing(e, Criterion::MinMassDiff, true); };
+  auto highest_pt = [](const Event &e) { return BestPairing(e, Criterion::HighestPairPt, false); };
+
+  int mismatches_mass = 0;
+  int mismatches_pt = 0;
+  for (const auto &e : events) {
+    mismatches_mass += PermutationMinMassDiff(e) != min_mass_diff(e);
+    mismatches_pt += PairLoopHighestPt(e) != highest_pt(e);
+  }
+  long checksum = 0;
+  const double t_mass_old = NanosecondsPerEvent(events, PermutationMinMassDiff, checksum);
+  const double t_mass_new = NanosecondsPerEvent(events, min_mass_diff, checksum);
+  const double t_pt_old = NanosecondsPerEvent(events, PairLoopHighestPt, checksum);
+  const double t_pt_new = NanosecondsPerEvent(events, highest_pt, checksum);
+  std::printf("%-18s %14s %14s %10s\n", "criterion", "previous", "BestPairing", "mismatches");
+  std::printf("%-18s %11.0f ns %11.0f ns %10d\n", "min mass diff", t_mass_old, t_mass_new, mismatches_mass);
+  std::printf("%-18s %11.0f ns %11.0f ns %10d\n", "highest pair pT", t_pt_old, t_pt_new, mismatches_pt);
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
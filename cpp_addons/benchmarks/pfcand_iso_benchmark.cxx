@@ -0,0 +1,172 @@
+/**
+ * Benchmark of the Higgs daughter isolation as a function of nPFCands
+ *
+ * Compares the previous implementation of haa::pfCandIso (four Nonzero calls, Take copies
+ * and one loop per daughter and category) with the single-pass cone-sum kernel
+ * haa::iso::FillConeSums on randomly generated events, and checks that both give the
+ * same isolation values.
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 pfcand_iso_benchmark.cxx $(root-config --cflags --libs) -o pfcand_iso_benchmark
+ *   ./pfcand_iso_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <Math/Vector4D.h>
+#include <Math/VectorUtil.h>
+#include <algorithm>
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> daughters, charged, neutral, photon, fromPV;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.3);
+  std::uniform_int_distribution<int> category(0, 3);
+  std::uniform_int_distribution<int> index(0, npfcands - 1);
+  Event event;
+  for (int i = 0; i < npfcands; i++) {
+    event.pt.push_back(0.5 + pt(rng));
+    event.eta.push_back(eta(rng));
+    event.phi.push_back(phi(rng));
+    event.mass.push_back(0.1396);
+    const int cat = category(rng);
+    event.charged.push_back(cat < 2);
+    event.neutral.push_back(cat == 2);
+    event.photon.push_back(cat == 3);
+    event.fromPV.push_back(cat == 0);
+  }
+  // four collimated charged daughters
+  const int first = index(rng);
+  for (int i = 0; i < 4; i++) {
+    const int idx = (first + 7 * i) % npfcands;
+    event.daughters.push_back(idx);
+    event.charged[idx] = 1;
+    event.eta[idx] = event.eta[first] + 0.02 * i;
+    event.phi[idx] = event.phi[first];
+  }
+  return event;
+}
+
+// previous implementation of the haa::pfCandIso lambda
+ROOT::RVec<float> ReferenceIso(const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<float> pfcand_eta, const ROOT::RVec<float> pfcand_phi, const ROOT::RVec<float> pfcand_mass,
+                               const ROOT::RVec<int> higgsdaughters, const ROOT::RVec<int> pfcand_charged_hadron_mask, const ROOT::RVec<int> pfcand_neutral_hadron_mask,
+                               const ROOT::RVec<int> pfcand_photon_mask, const ROOT::RVec<int> pfcand_fromPV_mask) {
+  ROOT::RVec<float> Rel_isos;
+  auto daughter_pts = ROOT::VecOps::Take(pfcand_pt, higgsdaughters);
+  auto daughter_etas = ROOT::VecOps::Take(pfcand_eta, higgsdaughters);
+  auto daughter_phis = ROOT::VecOps::Take(pfcand_phi, higgsdaughters);
+  ROOT::RVec<float> daughter_masses = {0.493677, 0.493677, 0.493677, 0.493677};
+  auto daughter_p4s = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(daughter_pts, daughter_etas, daughter_phis, daughter_masses);
+
+  auto non_PU_charged_hadron_indices = ROOT::VecOps::Nonzero(pfcand_charged_hadron_mask && pfcand_fromPV_mask);
+  auto neutral_hadron_indices = ROOT::VecOps::Nonzero(pfcand_neutral_hadron_mask);
+  auto photon_indices = ROOT::VecOps::Nonzero(pfcand_photon_mask);
+  auto PU_charged_hadron_indices = ROOT::VecOps::Nonzero(pfcand_charged_hadron_mask && !pfcand_fromPV_mask);
+
+  auto build = [&](const ROOT::RVec<ROOT::RVec<int>::size_type> &indices) {
+    return ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(
+        ROOT::VecOps::Take(pfcand_pt, indices), ROOT::VecOps::Take(pfcand_eta, indices),
+        ROOT::VecOps::Take(pfcand_phi, indices), ROOT::VecOps::Take(pfcand_mass, indices));
+  };
+  auto charged_hadron_p4s_from_pv = build(non_PU_charged_hadron_indices);
+  auto neutral_hadron_p4s = build(neutral_hadron_indices);
+  auto photon_p4s = build(photon_indices);
+  auto charged_hadron_p4s_not_from_pv = build(PU_charged_hadron_indices);
+  auto charged_hadron_pts_from_pv = ROOT::VecOps::Take(pfcand_pt, non_PU_charged_hadron_indices);
+  auto neutral_hadron_pts = ROOT::VecOps::Take(pfcand_pt, neutral_hadron_indices);
+  auto photon_pts = ROOT::VecOps::Take(pfcand_pt, photon_indices);
+  auto charged_hadron_pts_not_from_pv = ROOT::VecOps::Take(pfcand_pt, PU_charged_hadron_indices);
+
+  for (int i = 0; i < daughter_p4s.size(); i++) {
+    float sum_charged_hadron_pt_from_pv = 0;
+    float sum_neutral_hadron_pt = 0;
+    float sum_photon_pt = 0;
+    float sum_charged_hadron_pt_not_from_pv = 0;
+    for (int j = 0; j < charged_hadron_p4s_from_pv.size(); j++) {
+      float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], charged_hadron_p4s_from_pv[j]);
+      if (dR < 0.4 && std::find(higgsdaughters.begin(), higgsdaughters.end(), non_PU_charged_hadron_indices[j]) == higgsdaughters.end()) {
+        sum_charged_hadron_pt_from_pv += charged_hadron_pts_from_pv[j];
+      }
+    }
+    for (int j = 0; j < neutral_hadron_p4s.size(); j++) {
+      float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], neutral_hadron_p4s[j]);
+      if (dR < 0.4) {
+        sum_neutral_hadron_pt += neutral_hadron_pts[j];
+      }
+    }
+    for (int j = 0; j < photon_p4s.size(); j++) {
+      float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], photon_p4s[j]);
+      if (dR < 0.4) {
+        sum_photon_pt += photon_pts[j];
+      }
+    }
+    for (int j = 0; j < charged_hadron_p4s_not_from_pv.size(); j++) {
+      float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], charged_hadron_p4s_not_from_pv[j]);
+      if (dR < 0.4 && std::find(higgsdaughters.begin(), higgsdaughters.end(), PU_charged_hadron_indices[j]) == higgsdaughters.end()) {
+        sum_charged_hadron_pt_not_from_pv += charged_hadron_pts_not_from_pv[j];
+      }
+    }
+    float Rel_iso = (sum_charged_hadron_pt_from_pv + std::max(0.0, sum_neutral_hadron_pt + sum_photon_pt - 0.5 * sum_charged_hadron_pt_not_from_pv)) / daughter_p4s[i].Pt();
+    Rel_isos.push_back(Rel_iso);
+  }
+  return Rel_isos;
+}
+
+ROOT::RVec<float> KernelIso(const Event &e) {
+  ROOT::RVec<float> isos(haa::iso::ndaughters);
+  const auto sums = haa::iso::FillConeSums(e.pt, e.eta, e.phi, e.daughters, e.charged, e.neutral, e.photon, e.fromPV, 0.4);
+  for (int i = 0; i < haa::iso::ndaughters; i++) {
+    isos[i] = haa::iso::RelativeIsolation(sums, i, e.pt[e.daughters[i]], 0.5);
+  }
+  return isos;
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, float &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += f(e)[0];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 2000;
+  std::printf("%10s %16s %16s %10s %12s\n", "nPFCands", "reference [ns]", "kernel [ns]", "speed-up", "mismatches");
+  for (const int npfcands : {50, 100, 200, 500, 1000, 2000, 4000}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, npfcands));
+    }
+    int mismatches = 0;
+    for (const auto &e : events) {
+      const auto ref = ReferenceIso(e.pt, e.eta, e.phi, e.mass, e.daughters, e.charged, e.neutral, e.photon, e.fromPV);
+      const auto kernel = KernelIso(e);
+      for (int i = 0; i < haa::iso::ndaughters; i++) {
+        mismatches += ref[i] != kernel[i];
+      }
+    }
+    float checksum = 0;
+    const double t_ref = NanosecondsPerEvent(events, [](const Event &e) {
+      return ReferenceIso(e.pt, e.eta, e.phi, e.mass, e.daughters, e.charged, e.neutral, e.photon, e.fromPV);
+    }, checksum);
+    const double t_kernel = NanosecondsPerEvent(events, KernelIso, checksum);
+    std::printf("%10d %16.0f %16.0f %10.1f %12d\n", npfcands, t_ref, t_kernel, t_ref / t_kernel, mismatches);
+  }
+  return 0;
+}
@@ -0,0 +1,115 @@
+/**
+ * Time saved by the Higgs daughter pre-filter
+ *
+ * haa::HiggsDaughtersPreFilter drops events without enough selected PF candidates of both
+ * charges before the PF candidate view is built and the daughter algorithms run. The
+ * benchmark generates events with a varying number of selected candidates and compares, for
+ * the ChargePairs and the ClosestToHiggsMass daughter search:
+ *
+ *   - without pre-filter: view + daughter search for every event
+ *   - with pre-filter: CanFormHiggsDaughters for every event, view + search for the passing ones
+ *
+ * It reports the fraction of rejected events, the time per event with and without the
+ * pre-filter, and the number of rejected events for which the daughter search would have
+ * found valid daughters (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 prefilter_benchmark.cxx $(root-config --cflags --libs) -o prefilter_benchmark
+ *   ./prefilter_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge, mask;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands, const double mean_selected) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.3);
+  std::uniform_real_distribution<float> uniform(0, 1);
+  // a few collimated candidates, so that good pairs exist
+  std::normal_distribution<float> smear(0, 0.05);
+  const float jet_eta = eta(rng);
+  const float jet_phi = phi(rng);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    const bool collimated = uniform(rng) < 0.02;
+    e.pt.push_back(1.0 + pt(rng));
+    e.eta.push_back(collimated ? jet_eta + smear(rng) : eta(rng));
+    e.phi.push_back(collimated ? haa::DeltaPhi(0, jet_phi + smear(rng)) : phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(rng() % 2 ? 1 : -1);
+    e.mask.push_back(uniform(rng) < mean_selected / npfcands);
+  }
+  return e;
+}
+
+bool ChargePairs(const haa::PFCandView &view) {
+  return view.hardest_by_charge.positive.Full() && view.hardest_by_charge.negative.Full();
+}
+
+bool ClosestToHiggsMass(const haa::PFCandView &view) {
+  if (view.indices.size() < 4) {
+    return false;
+  }
+  const auto good_pairs = haa::quadruplets::FindGoodPairs(view, 0.1);
+  return haa::quadruplets::LastQuadrupletFromPairs(good_pairs, view.indices.size())[0] >= 0;
+}
+
+template <typename F>
+void Run(const char *name, const std::vector<Event> &events, const int min_per_charge, F &&search) {
+  int rejected = 0;
+  int found = 0;
+  auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    const auto view = haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask);
+    found += search(view);
+  }
+  auto stop = std::chrono::steady_clock::now();
+  const double t_without = std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+
+  int found_with = 0;
+  start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    if (!haa::CanFormHiggsDaughters(e.pt, e.charge, e.mask, 1.0, min_per_charge)) {
+      rejected++;
+      continue;
+    }
+    const auto view = haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask);
+    found_with += search(view);
+  }
+  stop = std::chrono::steady_clock::now();
+  const double t_with = std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+  const int lost = found - found_with;
+
+  std::printf("%-20s %9.1f%% %11.0f ns %11.0f ns %11.0f ns %6d\n", name, 100. * rejected / events.size(), t_without, t_with,
+              t_without - t_with, lost);
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 5000;
+  std::printf("%-20s %10s %14s %14s %14s %6s\n", "algorithm", "rejected", "without", "with", "saved/event", "lost");
+  for (const double mean_selected : {2., 4., 8., 20.}) {
+    std::vector<Event> events;
+    for (int i = 0; i < nevents; i++) {
+      events.push_back(GenerateEvent(rng, 1000, mean_selected));
+    }
+    std::printf("mean number of selected PF candidates: %.0f\n", mean_selected);
+    Run("ChargePairs", events, 2, ChargePairs);
+    Run("ClosestToHiggsMass", events, 1, ClosestToHiggsMass);
+  }
+  return 0;
+}
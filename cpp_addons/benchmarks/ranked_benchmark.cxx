@@ -0,0 +1,216 @@
+/**
+ * Cost of ranking the Higgs quadruplets with a bounded heap
+ *
+ * haa::RankedQuadrupletsAlgo keeps the K best of all quadruplets that contain at least two
+ * good pairs. quadruplets::TopQuadruplets scores every quadruplet as it is built from the
+ * good pairs and pushes it into a heap of size K. The reference lists all accepted
+ * quadruplets, sorts and deduplicates them, scores all of them and sorts by score.
+ *
+ * The benchmark times both for K = 1, 5 and 20 with the three rankings, and counts the
+ * events for which the K quadruplets or their scores differ (has to be 0).
+ *
+ * It also compares the PF candidate indices ClosestToHiggsMassAlgo and RankedQuadrupletsAlgo
+ * read for the same quadruplet positions: ClosestToHiggsMassAlgo takes them from
+ * haa::SortedByPt(view), as the combinatorial algorithm it replaces, RankedQuadrupletsAlgo from
+ * view.indices, the candidates the good pairs were formed of. They agree only if the selected
+ * candidates are stored by decreasing pT, which is counted for events in random order and
+ * for the same events stored by decreasing pT (has to be 0 there).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 ranked_benchmark.cxx $(root-config --cflags --libs) -o ranked_benchmark
+ *   ./ranked_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <numeric>
+#include <random>
+#include <vector>
+
+namespace {
+
+using haa::quadruplets::RankedQuadruplet;
+using haa::quadruplets::Ranking;
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge, mask;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.5);
+  std::uniform_real_distribution<float> uniform(0, 1);
+  // a few collimated candidates, so that good pairs exist
+  std::normal_distribution<float> smear(0, 0.05);
+  const float jet_eta = eta(rng);
+  const float jet_phi = phi(rng);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    const bool collimated = uniform(rng) < 0.02;
+    e.pt.push_back(1.0 + pt(rng));
+    e.eta.push_back(collimated ? jet_eta + smear(rng) : eta(rng));
+    e.phi.push_back(collimated ? haa::DeltaPhi(0, jet_phi + smear(rng)) : phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(rng() % 2 ? 1 : -1);
+    e.mask.push_back(collimated || uniform(rng) < 0.02);
+  }
+  return e;
+}
+
+/// the same event with the PF candidates stored by decreasing pT
+Event SortedByPt(const Event &e) {
+  std::vector<int> order(e.pt.size());
+  std::iota(order.begin(), order.end(), 0);
+  std::stable_sort(order.begin(), order.end(), [&e](int a, int b) { return e.pt[a] > e.pt[b]; });
+  Event sorted;
+  for (const int i : order) {
+    sorted.pt.push_back(e.pt[i]);
+    sorted.eta.push_back(e.eta[i]);
+    sorted.phi.push_back(e.phi[i]);
+    sorted.mass.push_back(e.mass[i]);
+    sorted.charge.push_back(e.charge[i]);
+    sorted.mask.push_back(e.mask[i]);
+  }
+  return sorted;
+}
+
+/// all accepted quadruplets, sorted and without duplicates
+std::vector<std::array<int, 4>> AcceptedQuadruplets(const std::vector<std::pair<int, int>> &good_pairs, const int ncandidates) {
+  std::vector<std::array<int, 4>> quads;
+  for (std::size_t a = 0; a < good_pairs.size(); a++) {
+    for (std::size_t b = a+1; b < good_pairs.size(); b++) {
+      std::array<int, 4> quad = {good_pairs[a].first, good_pairs[a].second, good_pairs[b].first, good_pairs[b].second};
+      std::sort(quad.begin(), quad.end());
+      if (std::unique(quad.begin(), quad.end()) - quad.begin() == 4) {
+        quads.push_back(quad);
+        continue;
+      }
+      for (int x = 0; x < ncandidates; x++) {
+        if (x == quad[0] || x == quad[1] || x == quad[2]) {
+          continue;
+        }
+        std::array<int, 4> completed = {quad[0], quad[1], quad[2], x};
+        std::sort(completed.begin(), completed.end());
+        quads.push_back(completed);
+      }
+    }
+  }
+  std::sort(quads.begin(), quads.end());
+  quads.erase(std::unique(quads.begin(), quads.end()), quads.end());
+  return quads;
+}
+
+/// K best quadruplets from the full list, with the scores of TopQuadruplets
+std::vector<RankedQuadruplet> Reference(const haa::PFCandView &view, const std::vector<std::pair<int, int>> &good_pairs,
+                                        const int k, const Ranking ranking) {
+  std::vector<RankedQuadruplet> ranked;
+  for (const auto &quad : AcceptedQuadruplets(good_pairs, view.indices.size())) {
+    RankedQuadruplet r;
+    r.positions = quad;
+    if (ranking == Ranking::SumPt) {
+      r.score = view.pt[quad[0]] + view.pt[quad[1]] + view.pt[quad[2]] + view.pt[quad[3]];
+      r.key = -r.score;
+    } else {
+      const auto daughters = haa::pairing::FourBodyFromView(view, quad);
+      if (ranking == Ranking::HiggsMass) {
+        r.score = std::abs(daughters.Mass() - 125.);
+      } else {
+        const auto best = haa::pairing::BestPairing(daughters, haa::pairing::Criterion::MinMassDiff);
+        r.score = best.Valid() ? best.score : std::numeric_limits<float>::infinity();
+      }
+      r.key = r.score;
+    }
+    ranked.push_back(r);
+  }
+  std::sort(ranked.begin(), ranked.end(), [](const RankedQuadruplet &a, const RankedQuadruplet &b) {
+    return a.key < b.key || (a.key == b.key && a.positions < b.positions);
+  });
+  if (static_cast<int>(ranked.size()) > k) {
+    ranked.resize(k);
+  }
+  return ranked;
+}
+
+bool Same(const std::vector<RankedQuadruplet> &a, const std::vector<RankedQuadruplet> &b) {
+  if (a.size() != b.size()) {
+    return false;
+  }
+  for (std::size_t i = 0; i < a.size(); i++) {
+    if (a[i].positions != b[i].positions || a[i].score != b[i].score) {
+      return false;
+    }
+  }
+  return true;
+}
+
+/// whether the two mappings of the quadruplet of ClosestToHiggsMassAlgo give the same PF candidates
+bool SameIndices(const Event &e) {
+  const auto view = haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask);
+  const int n = view.indices.size();
+  if (n < 4) {
+    return true;
+  }
+  const auto quad = haa::quadruplets::LastQuadrupletFromPairs(haa::quadruplets::FindGoodPairs(view, 0.1), n);
+  if (quad[0] < 0) {
+    return true;
+  }
+  const auto sorted_indices = haa::SortedByPt(view);
+  std::array<int, 4> closest, ranked;
+  for (int i = 0; i < 4; i++) {
+    closest[i] = sorted_indices[quad[i]];
+    ranked[i] = view.indices[quad[i]];
+  }
+  std::sort(closest.begin(), closest.end());
+  std::sort(ranked.begin(), ranked.end());
+  return closest == ranked;
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 500;
+  std::vector<haa::PFCandView> views;
+  std::vector<std::vector<std::pair<int, int>>> pairs;
+  int differ = 0, differ_sorted = 0;
+  for (int i = 0; i < nevents; i++) {
+    const auto e = GenerateEvent(rng, 1000);
+    differ += !SameIndices(e);
+    differ_sorted += !SameIndices(SortedByPt(e));
+    views.push_back(haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask));
+    pairs.push_back(haa::quadruplets::FindGoodPairs(views.back(), 0.1));
+  }
+  long checksum = 0;
+  std::printf("%-16s %4s %14s %14s %8s %10s\n", "ranking", "K", "reference", "heap", "ratio", "mismatches");
+  const std::vector<std::pair<const char *, Ranking>> rankings = {
+      {"higgs_mass", Ranking::HiggsMass}, {"sum_pt", Ranking::SumPt}, {"pair_mass_diff", Ranking::PairMassDiff}};
+  for (const auto &ranking : rankings) {
+    for (const int k : {1, 5, 20}) {
+      int mismatches = 0;
+      for (int i = 0; i < nevents; i++) {
+        mismatches += !Same(Reference(views[i], pairs[i], k, ranking.second),
+                            haa::quadruplets::TopQuadruplets(views[i], pairs[i], k, ranking.second, 125.));
+      }
+      const auto start = std::chrono::steady_clock::now();
+      for (int i = 0; i < nevents; i++) {
+        checksum += Reference(views[i], pairs[i], k, ranking.second).size();
+      }
+      const auto middle = std::chrono::steady_clock::now();
+      for (int i = 0; i < nevents; i++) {
+        checksum += haa::quadruplets::TopQuadruplets(views[i], pairs[i], k, ranking.second, 125.).size();
+      }
+      const auto stop = std::chrono::steady_clock::now();
+      const double t_reference = std::chrono::duration<double, std::nano>(middle - start).count() / nevents;
+      const double t_heap = std::chrono::duration<double, std::nano>(stop - middle).count() / nevents;
+      std::printf("%-16s %4d %11.0f ns %11.0f ns %8.1f %10d\n", ranking.first, k, t_reference, t_heap, t_reference / t_heap, mismatches);
+    }
+  }
+  std::printf("events with different ClosestToHiggsMassAlgo and RankedQuadrupletsAlgo indices: %d of %d, %d if stored by decreasing pT\n",
+              differ, nevents, differ_sorted);
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
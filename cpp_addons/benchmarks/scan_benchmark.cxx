@@ -0,0 +1,168 @@
+/**
+ * Cost of a working point scan of the Higgs selection
+ *
+ * A scan over the PF candidate pT threshold, the pair ΔR and the isolation cone used to
+ * need one run of the chain per working point: per working point the PF candidate view is
+ * built, the good pairs are searched and the cone sums are filled. quadruplets::LastQuadrupletsScan
+ * and iso::FillConeSumsScan evaluate all working points on one view, with one pair search
+ * and one pass over the PF candidates.
+ *
+ * The benchmark times, per event, N separate evaluations against the scan for N = 1, 3, 6
+ * and 12 working points, and counts the working points for which the daughters or the cone
+ * sums differ (has to be 0).
+ *
+ * Build and run (from cpp_addons/benchmarks):
+ *   g++ -O2 -std=c++17 scan_benchmark.cxx $(root-config --cflags --libs) -o scan_benchmark
+ *   ./scan_benchmark
+ */
+
+#include "../include/haa_kernels.hxx"
+#include "ROOT/RVec.hxx"
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <vector>
+
+namespace {
+
+struct Event {
+  ROOT::RVec<float> pt, eta, phi, mass;
+  ROOT::RVec<int> charge, mask;
+  ROOT::RVec<int> charged, neutral, photon, from_pv;
+};
+
+struct WorkingPoints {
+  std::vector<float> min_pt, max_deltaR, cone;
+};
+
+struct Result {
+  ROOT::RVec<int> daughters;
+  std::vector<haa::iso::ConeSums> sums;
+};
+
+Event GenerateEvent(std::mt19937 &rng, const int npfcands) {
+  std::uniform_real_distribution<float> eta(-2.5, 2.5);
+  std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+  std::exponential_distribution<float> pt(0.5);
+  std::uniform_real_distribution<float> uniform(0, 1);
+  // a few collimated candidates, so that good pairs exist
+  std::normal_distribution<float> smear(0, 0.05);
+  const float jet_eta = eta(rng);
+  const float jet_phi = phi(rng);
+  Event e;
+  for (int i = 0; i < npfcands; i++) {
+    const bool collimated = uniform(rng) < 0.02;
+    e.pt.push_back(1.0 + pt(rng));
+    e.eta.push_back(collimated ? jet_eta + smear(rng) : eta(rng));
+    e.phi.push_back(collimated ? haa::DeltaPhi(0, jet_phi + smear(rng)) : phi(rng));
+    e.mass.push_back(0.1396);
+    e.charge.push_back(rng() % 2 ? 1 : -1);
+    e.mask.push_back(collimated || uniform(rng) < 0.02);
+    const float type = uniform(rng);
+    e.charged.push_back(type < 0.6);
+    e.neutral.push_back(type >= 0.6 && type < 0.75);
+    e.photon.push_back(type >= 0.75);
+    e.from_pv.push_back(uniform(rng) < 0.7);
+  }
+  return e;
+}
+
+WorkingPoints MakeWorkingPoints(const int n) {
+  WorkingPoints wps;
+  for (int w = 0; w < n; w++) {
+    wps.min_pt.push_back(1.0 + 0.5 * (w % 3));
+    wps.max_deltaR.push_back(0.05 + 0.05 * ((w / 3) % 3));
+    wps.cone.push_back(0.3 + 0.1 * ((w / 9) % 2));
+  }
+  return wps;
+}
+
+Result Separate(const Event &e, const WorkingPoints &wps) {
+  Result result;
+  result.daughters.resize(4 * wps.min_pt.size(), -1);
+  for (std::size_t w = 0; w < wps.min_pt.size(); w++) {
+    ROOT::RVec<int> mask(e.mask.size());
+    for (std::size_t i = 0; i < mask.size(); i++) {
+      mask[i] = e.mask[i] && e.pt[i] >= wps.min_pt[w];
+    }
+    const auto view = haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, mask);
+    const int n = view.indices.size();
+    const auto quad = n < 4 ? std::array<int, 4>{-1, -1, -1, -1}
+                            : haa::quadruplets::LastQuadrupletFromPairs(haa::quadruplets::FindGoodPairs(view, wps.max_deltaR[w]), n);
+    if (quad[0] < 0) {
+      result.sums.emplace_back();
+      continue;
+    }
+    const auto sorted_indices = haa::SortedByPt(view);
+    ROOT::RVec<int> daughters(4);
+    for (int i = 0; i < 4; i++) {
+      daughters[i] = sorted_indices[quad[i]];
+      result.daughters[4 * w + i] = daughters[i];
+    }
+    result.sums.push_back(haa::iso::FillConeSums(e.pt, e.eta, e.phi, daughters, e.charged, e.neutral, e.photon, e.from_pv, wps.cone[w]));
+  }
+  return result;
+}
+
+Result Scan(const Event &e, const WorkingPoints &wps) {
+  Result result;
+  result.daughters.resize(4 * wps.min_pt.size(), -1);
+  const auto view = haa::BuildPFCandView(e.pt, e.eta, e.phi, e.mass, e.charge, e.mask);
+  const auto quads = haa::quadruplets::LastQuadrupletsScan(view, wps.min_pt, wps.max_deltaR);
+  const auto sorted_indices = haa::SortedByPt(view);
+  for (std::size_t w = 0; w < quads.size(); w++) {
+    if (quads[w][0] >= 0) {
+      for (int i = 0; i < 4; i++) {
+        result.daughters[4 * w + i] = sorted_indices[quads[w][i]];
+      }
+    }
+  }
+  result.sums = haa::iso::FillConeSumsScan(e.pt, e.eta, e.phi, result.daughters, e.charged, e.neutral, e.photon, e.from_pv, wps.cone);
+  return result;
+}
+
+bool SameSums(const haa::iso::ConeSums &a, const haa::iso::ConeSums &b) {
+  return a.charged_hadron_from_pv == b.charged_hadron_from_pv && a.neutral_hadron == b.neutral_hadron &&
+         a.photon == b.photon && a.charged_hadron_not_from_pv == b.charged_hadron_not_from_pv;
+}
+
+template <typename F>
+double NanosecondsPerEvent(const std::vector<Event> &events, F &&f, long &checksum) {
+  const auto start = std::chrono::steady_clock::now();
+  for (const auto &e : events) {
+    checksum += f(e).daughters[0];
+  }
+  const auto stop = std::chrono::steady_clock::now();
+  return std::chrono::duration<double, std::nano>(stop - start).count() / events.size();
+}
+
+} // namespace
+
+int main() {
+  std::mt19937 rng(42);
+  const int nevents = 2000;
+  std::vector<Event> events;
+  for (int i = 0; i < nevents; i++) {
+    events.push_back(GenerateEvent(rng, 1000));
+  }
+  long checksum = 0;
+  std::printf("%-14s %14s %14s %8s %10s\n", "working points", "separate", "scan", "ratio", "mismatches");
+  for (const int n : {1, 3, 6, 12}) {
+    const auto wps = MakeWorkingPoints(n);
+    int mismatches = 0;
+    for (const auto &e : events) {
+      const auto separate = Separate(e, wps);
+      const auto scan = Scan(e, wps);
+      for (int w = 0; w < n; w++) {
+        const bool same_daughters = ROOT::VecOps::All(separate.daughters == scan.daughters);
+        const bool same_sums = separate.daughters[4 * w] < 0 || SameSums(separate.sums[w], scan.sums[w]);
+        mismatches += !same_daughters || !same_sums;
+      }
+    }
+    const double t_separate = NanosecondsPerEvent(events, [&wps](const Event &e) { return Separate(e, wps); }, checksum);
+    const double t_scan = NanosecondsPerEvent(events, [&wps](const Event &e) { return Scan(e, wps); }, checksum);
+    std::printf("%-14d %11.0f ns %11.0f ns %8.1f %10d\n", n, t_separate, t_scan, t_separate / t_scan, mismatches);
+  }
+  std::printf("(checksum %ld)\n", checksum);
+  return 0;
+}
@@ -1,12 +1,41 @@
 #ifndef GUARDCUSTOMJETS_HXX
 #define GUARDCUSTOMJETS_HXX
 
+#include "haa_kernels.hxx"
 #include "ROOT/RDataFrame.hxx"
+#include "ROOT/RVec.hxx"
+#include <array>
 #include <string>
+#include <vector>
 
 namespace physicsobject {
 namespace jet {
 
+/// (η, φ) positions of the selected objects of one or more collections
+using ObjectPositions = ROOT::RVec<std::array<float, 2>>;
+
+/**
+ * @brief Check whether a position overlaps with any of a list of objects
+ * 
+ * @param eta Pseudorapidity of the position
+ * @param phi Azimuthal angle of the position
+ * @param positions Positions of the objects
+ * @param deltaR2min Squared ΔR below which an overlap is found
+ * 
+ * @return bool true if ΔR² to any of the objects is below deltaR2min
+ */
+inline bool OverlapsAny(const double eta, const double phi, const ObjectPositions &positions,
+                        const double deltaR2min) {
+    for (const auto &position : positions) {
+        const double deta = eta - position[0];
+        const double dphi = haa::DeltaPhi(phi, position[1]);
+        if (deta * deta + dphi * dphi < deltaR2min) {
+            return true;
+        }
+    }
+    return false;
+}
+
 /**
  * @brief Veto jets that overlap with loose leptons within a specified ΔR cone
  * 
@@ -40,6 +69,45 @@ ROOT::RDF::RNode VetoOverlappingJetsLooseLeptons(
     const float &deltaRmin
 );
 
+/**
+ * @brief Gather the (η, φ) positions of the selected objects of several collections
+ * 
+ * @param df Input RDataFrame node
+ * @param output_col Name of the output column containing the ObjectPositions
+ * @param collections Column names (mask, η, φ) of each collection
+ * 
+ * @return ROOT::RDF::RNode Updated RDataFrame with the position list column
+ */
+ROOT::RDF::RNode GatherObjectPositions(
+    ROOT::RDF::RNode df, 
+    const std::string &output_col,
+    const std::vector<std::string> &collections
+);
+
+/**
+ * @brief Veto objects that overlap with any of several object collections
+ * 
+ * Single-pass version of VetoOverlappingJetsLooseLeptons for an arbitrary number of
+ * collections. The objects are compared to the selected objects of all collections
+ * at once and one combined mask is written.
+ * 
+ * @param df Input RDataFrame node
+ * @param output_col Name of the output column containing the combined veto mask
+ * @param inputs Column names: η and φ of the objects to be cleaned, followed by
+ * (mask, η, φ) of each collection to veto against
+ * @param deltaRmin Minimum ΔR distance below which objects are vetoed
+ * 
+ * @return ROOT::RDF::RNode Updated RDataFrame with the combined veto mask column
+ * 
+ * @note The output mask has value 1 for objects to keep, 0 for objects to veto
+ */
+ROOT::RDF::RNode VetoOverlappingObjects(
+    ROOT::RDF::RNode df, 
+    const std::string &output_col,
+    const std::vector<std::string> &inputs, 
+    const float &deltaRmin
+);
+
 } // namespace jet
 } // namespace physicsobject
 #endif /* GUARDCUSTOMJETS_HXX */
@@ -10,11 +10,13 @@ namespace lorentzvector {
     ROOT::RDF::RNode buildKaon(ROOT::RDF::RNode df,
                            const std::vector<std::string> &quantities,
                            const std::string &outputname,
-                           const int &position);
+                           const int &position,
+                           const float &kaon_mass);
     ROOT::RDF::RNode buildFromPFCand(ROOT::RDF::RNode df,
                                  const std::vector<std::string> &obj_quantities,
                                  const int pairindex,
-                                 const std::string &obj_p4_name);
+                                 const std::string &obj_p4_name,
+                                 const float &kaon_mass);
 }
 
 #endif /* GUARD_CUSTOM_LORENTZVECTOR_H */
\ No newline at end of file
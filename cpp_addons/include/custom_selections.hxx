@@ -0,0 +1,42 @@
+#ifndef GUARD_CUSTOM_SELECTIONS_HXX
+#define GUARD_CUSTOM_SELECTIONS_HXX
+
+#include "ROOT/RDataFrame.hxx"
+#include <string>
+#include <vector>
+
+namespace physicsobject {
+namespace pfcand {
+
+/**
+ * @brief Fused base selection of PF candidates
+ *
+ * Applies the pdgId, pT, |η| and mass window cuts and the overlap veto against loose
+ * objects of BasePFCands in one pass, cheapest cut first. A candidate failing a cut is not
+ * evaluated further, so the ΔR veto only runs for candidates passing all kinematic cuts.
+ *
+ * @param df Input RDataFrame node
+ * @param output_mask Name of the output column containing the selection mask
+ * @param output_indices Name of the output column containing the indices of the selected candidates
+ * @param inputs Column names: pdgId, pT, η, φ and mass of the PF candidates, followed by
+ * (mask, η, φ) of each collection to veto against
+ * @param pdgids Accepted pdgIds
+ * @param min_pt Minimum pT
+ * @param max_eta Maximum |η|
+ * @param min_mass Minimum mass
+ * @param max_mass Maximum mass
+ * @param deltaRmin Minimum ΔR to the loose objects
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the mask and index columns
+ */
+ROOT::RDF::RNode FusedSelection(ROOT::RDF::RNode df, const std::string &output_mask,
+                                const std::string &output_indices,
+                                const std::vector<std::string> &inputs,
+                                const std::vector<int> &pdgids, const float &min_pt,
+                                const float &max_eta, const float &min_mass,
+                                const float &max_mass, const float &deltaRmin);
+
+} // namespace pfcand
+} // namespace physicsobject
+
+#endif /* GUARD_CUSTOM_SELECTIONS_HXX */
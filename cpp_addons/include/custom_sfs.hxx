@@ -1,17 +1,64 @@
-#ifndef GUARD_SCALEFACTORSEXT_H
-#define GUARD_SCALEFACTORSEXT_H
+#ifndef GUARD_SCALEFACTORSEXT_HXX
+#define GUARD_SCALEFACTORSEXT_HXX
 
+#include "../../../../include/utility/CorrectionManager.hxx"
+#include "flat_corrections.hxx"
 #include "ROOT/RDataFrame.hxx"
+#include "correction.h"
+#include <array>
+#include <memory>
 #include <string>
+#include <vector>
 
 namespace scalefactor {
+    /// Nominal, up and down value of a scale factor, evaluated together once per event
+    using Variations = std::array<double, 3>;
+    /// Positions in scalefactor::Variations
+    enum Variation { nominal = 0, up = 1, down = 2 };
+
+    std::shared_ptr<const haa::flat::Table> LoadFlatCorrection(const correction::Correction *evaluator,
+                         const std::string &flat_dir, const std::vector<std::string> &variations,
+                         const std::size_t narguments);
+    ROOT::RDF::RNode ProjectVariations(ROOT::RDF::RNode df, const std::string &variations,
+                         const std::string &nom_output, const std::string &output_up,
+                         const std::string &output_down);
     namespace electron {
-        ROOT::RDF::RNode trigger(ROOT::RDF::RNode df, const std::string &nom_trigger_output, 
+        ROOT::RDF::RNode trigger(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output,
+                         const std::string &nom_trigger_output, 
                          const std::string &trigger_output_up, const std::string &trigger_output_down, 
                          const std::string &pt, const std::string &eta, const std::string &nom_sf_file, 
                          const std::string &nom_triggerAlgorithm, const std::string &syst_sf_file, 
-                         const std::string &syst_triggerAlgorithm);
+                         const std::string &syst_triggerAlgorithm, const std::string &flat_dir);
+        ROOT::RDF::RNode id_variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &pt, const std::string &eta, const std::string &phi,
+                         const std::string &year_id, const std::string &wp,
+                         const std::string &sf_file, const std::string &sf_name,
+                         const std::string &nom_variation, const std::string &up_variation,
+                         const std::string &down_variation);
+    }
+    namespace muon {
+        ROOT::RDF::RNode variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &pt, const std::string &eta,
+                         const std::string &sf_file, const std::string &sf_name,
+                         const std::string &flat_dir);
+    }
+    namespace pileup {
+        ROOT::RDF::RNode variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &true_pileup, const std::string &sf_file,
+                         const std::string &sf_name, const std::string &flat_dir,
+                         const int &validate);
     }
 }
 
-#endif // GUARD_SCALEFACTORSEXT_H
+#endif // GUARD_SCALEFACTORSEXT_HXX
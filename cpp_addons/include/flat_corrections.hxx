@@ -0,0 +1,242 @@
+#ifndef GUARD_FLAT_CORRECTIONS_H
+#define GUARD_FLAT_CORRECTIONS_H
+
+#include <algorithm>
+#include <array>
+#include <cstddef>
+#include <istream>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+/// Flattened lookup tables of binned correctionlib corrections, written by
+/// flatten_corrections.py and read by the scale factor producers in custom_sfs.cxx.
+
+namespace haa {
+
+namespace flat {
+
+/// Handling of values outside of the binning of an axis, as the flow of correctionlib
+enum class Flow { clamp, error, value };
+
+/**
+ * @brief Binning of one input of a flattened correction
+ *
+ * Bin i covers [edge i, edge i + 1). The bin is found with the same arithmetic as
+ * correctionlib: directly from the value for uniform binnings, with a binary search of
+ * the edges otherwise.
+ */
+struct Axis {
+  /// position of the input in the arguments of Table::Find
+  int argument;
+  bool uniform;
+  int n;
+  double low;
+  double high;
+  /// n + 1 bin edges, only for non-uniform binnings
+  std::vector<double> edges;
+  Flow flow;
+  /// value of the correction outside of the binning for Flow::value
+  double flow_value;
+
+  /// bin of x, -1 outside of the binning for Flow::value
+  int Bin(const double x) const {
+    if (x < low || x >= high) {
+      if (flow == Flow::clamp) {
+        return x < low ? 0 : n - 1;
+      }
+      if (flow == Flow::error) {
+        throw std::runtime_error("flat::Axis: value " + std::to_string(x) + " outside of the binning");
+      }
+      return -1;
+    }
+    if (uniform) {
+      return std::min(static_cast<int>((x - low) / (high - low) * n), n - 1);
+    }
+    return static_cast<int>(std::upper_bound(edges.begin(), edges.end(), x) - edges.begin()) - 1;
+  }
+  /// center of bin i
+  double Center(const int i) const {
+    if (uniform) {
+      return low + (i + 0.5) * (high - low) / n;
+    }
+    return 0.5 * (edges[i] + edges[i + 1]);
+  }
+};
+
+/// Input of the correction a table was flattened from, in the order of the correction
+struct Input {
+  enum Role { argument, variation, fixed };
+  std::string name;
+  /// "real", "int" or "string", as in correctionlib
+  std::string type;
+  Role role;
+  /// value the input was fixed to by the converter, for Role::fixed
+  std::string value;
+};
+
+/**
+ * @brief Binned correction flattened into a dense array
+ *
+ * Written by flatten_corrections.py from a correctionlib correction whose nodes are
+ * binnings, multibinnings and categories. The string inputs are fixed or enumerate the
+ * variations (e.g. nominal, up, down), the numeric inputs become the arguments of Find.
+ * The values of all variations of a bin are contiguous, so that the nominal value and
+ * its variations are read with a single lookup.
+ */
+struct Table {
+  std::string name;
+  std::vector<Input> inputs;
+  std::vector<std::string> variations;
+  std::vector<Axis> axes;
+  /// number of values between two consecutive bins of each axis
+  std::vector<std::size_t> strides;
+  std::vector<double> values;
+
+  /**
+   * @brief Position of the values of the bin of the arguments
+   *
+   * @param arguments numeric inputs of the correction, in the order of the correction
+   * @param flow_value set to the value of the correction if the position is -1
+   *
+   * @return position in values of the first variation, -1 outside of the binning of an
+   * axis with Flow::value
+   */
+  long Find(const double *arguments, double &flow_value) const {
+    std::size_t position = 0;
+    for (std::size_t i = 0; i < axes.size(); i++) {
+      const int bin = axes[i].Bin(arguments[axes[i].argument]);
+      if (bin < 0) {
+        flow_value = axes[i].flow_value;
+        return -1;
+      }
+      position += bin * strides[i];
+    }
+    return position;
+  }
+  /// value of one variation of the correction
+  double Evaluate(const double *arguments, const int variation = 0) const {
+    double flow_value = 0;
+    const long position = Find(arguments, flow_value);
+    return position < 0 ? flow_value : values[position + variation];
+  }
+  /// values of the first K variations of the correction
+  template <std::size_t K> std::array<double, K> EvaluateAll(const double *arguments) const {
+    std::array<double, K> result;
+    double flow_value = 0;
+    const long position = Find(arguments, flow_value);
+    for (std::size_t k = 0; k < K; k++) {
+      result[k] = position < 0 ? flow_value : values[position + k];
+    }
+    return result;
+  }
+};
+
+/**
+ * @brief Read a table written by flatten_corrections.py
+ *
+ * @param in stream with the table
+ *
+ * @return the table, throws std::runtime_error if the stream is not a valid table
+ */
+inline Table Read(std::istream &in) {
+  const auto fail = [](const std::string &what) {
+    throw std::runtime_error("flat::Read: " + what);
+  };
+  const auto read_flow = [&in, &fail](Axis &axis) {
+    std::string flow;
+    in >> flow;
+    axis.flow_value = 0;
+    if (flow == "clamp") {
+      axis.flow = Flow::clamp;
+    } else if (flow == "error") {
+      axis.flow = Flow::error;
+    } else if (flow == "value") {
+      axis.flow = Flow::value;
+      in >> axis.flow_value;
+    } else {
+      fail("unknown flow " + flow);
+    }
+  };
+  std::string keyword;
+  int version = 0;
+  if (!(in >> keyword >> version) || keyword != "flat_correction" || version != 1) {
+    fail("not a flat correction (version 1)");
+  }
+  Table table;
+  std::size_t nvalues = 0;
+  while (in >> keyword) {
+    if (keyword == "name") {
+      in >> table.name;
+    } else if (keyword == "input") {
+      Input input;
+      std::string role;
+      in >> input.name >> input.type >> role;
+      if (role == "argument") {
+        input.role = Input::argument;
+      } else if (role == "variation") {
+        input.role = Input::variation;
+      } else if (role == "fixed") {
+        input.role = Input::fixed;
+        in >> input.value;
+      } else {
+        fail("unknown role " + role + " of input " + input.name);
+      }
+      table.inputs.push_back(input);
+    } else if (keyword == "variations") {
+      std::size_t n = 0;
+      in >> n;
+      table.variations.resize(n);
+      for (auto &variation : table.variations) {
+        in >> variation;
+      }
+    } else if (keyword == "axis") {
+      Axis axis;
+      std::string binning;
+      in >> axis.argument >> binning >> axis.n;
+      if (binning == "uniform") {
+        axis.uniform = true;
+        in >> axis.low >> axis.high;
+      } else if (binning == "edges") {
+        axis.uniform = false;
+        axis.edges.resize(axis.n + 1);
+        for (auto &edge : axis.edges) {
+          in >> edge;
+        }
+        axis.low = axis.edges.front();
+        axis.high = axis.edges.back();
+      } else {
+        fail("unknown binning " + binning);
+      }
+      read_flow(axis);
+      table.axes.push_back(axis);
+    } else if (keyword == "values") {
+      in >> nvalues;
+      table.values.resize(nvalues);
+      for (auto &value : table.values) {
+        in >> value;
+      }
+    } else {
+      fail("unknown keyword " + keyword);
+    }
+    if (in.fail()) {
+      fail("malformed " + keyword);
+    }
+  }
+  // row-major bins, the variations of a bin are contiguous
+  std::size_t stride = table.variations.size();
+  table.strides.resize(table.axes.size());
+  for (int i = table.axes.size() - 1; i >= 0; i--) {
+    table.strides[i] = stride;
+    stride *= table.axes[i].n;
+  }
+  if (table.variations.empty() || stride != nvalues) {
+    fail("number of values of " + table.name + " does not match its binning");
+  }
+  return table;
+}
+
+} // namespace flat
+} // namespace haa
+
+#endif /* GUARD_FLAT_CORRECTIONS_H */
@@ -12,20 +12,66 @@
 
 namespace haa {
 
-ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, 
+ROOT::RDF::RNode GetPFCandView(ROOT::RDF::RNode df,
+			       const std::string &str_pfcand_pt,
+			       const std::string &str_pfcand_eta,
+			       const std::string &str_pfcand_phi,
+			       const std::string &str_pfcand_mass,
+			       const std::string &str_pfcand_charge,
+			       const std::string &str_pfcand_mask,
+			       const std::string &str_pfcand_view);
+
+ROOT::RDF::RNode GetEtaPhiGrid(ROOT::RDF::RNode df,
+			       const std::string &str_eta,
+			       const std::string &str_phi,
+			       const std::string &str_grid,
+			       const float &cell_size);
+
+ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df,
 					const std::string &str_pfcand_pt,
 					const std::string &str_pfcand_eta,
 					const std::string &str_pfcand_phi,
 					const std::string &str_pfcand_mass,
 					const std::string &str_pfcand_charge,
 					const std::string &str_pfcand_mask,
-					const std::string &str_daughteridx);
+					const std::string &str_daughteridx,
+					const float &max_deltaR);
+
+ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df,
+					const std::string &str_pfcand_view,
+					const std::string &str_daughteridx,
+					const float &max_deltaR);
+
+ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df,
+					const std::string &str_pfcand_view,
+					const std::string &str_pfcand_grid,
+					const std::string &str_daughteridx,
+					const float &max_deltaR);
+
+ROOT::RDF::RNode RankedQuadrupletsAlgo(ROOT::RDF::RNode df,
+				       const std::string &str_pfcand_view,
+				       const std::string &str_quadruplets,
+				       const std::string &str_scores,
+				       const int &k,
+				       const std::string &ranking,
+				       const float &higgs_mass,
+				       const float &max_deltaR);
+
+ROOT::RDF::RNode ClosestToHiggsMassScan(ROOT::RDF::RNode df,
+					const std::string &str_pfcand_view,
+					const std::string &str_daughteridxs,
+					const std::vector<float> &min_pt,
+					const std::vector<float> &max_deltaR);
 
 ROOT::RDF::RNode FourHardestPFCandsAlgo(ROOT::RDF::RNode df,
 					const std::string &str_pfcand_pt,
 					const std::string &str_pfcand_mask,
 					const std::string &str_daughteridx);
 
+ROOT::RDF::RNode FourHardestPFCandsAlgo(ROOT::RDF::RNode df,
+					const std::string &str_pfcand_view,
+					const std::string &str_daughteridx);
+
 ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df,
 				 const std::string &str_pfcand_pt,
 				 const std::string &str_pfcand_eta,
@@ -34,7 +80,19 @@ ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df,
 				 const std::string &str_pfcand_charge,
 				 const std::string &str_pfcand_mask,
 				 const std::string &str_daughteridx);
-  
+
+ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df,
+				 const std::string &str_pfcand_view,
+				 const std::string &str_daughteridx);
+
+ROOT::RDF::RNode HiggsDaughtersPreFilter(ROOT::RDF::RNode df,
+					 const std::string &filtername,
+					 const std::string &str_pfcand_pt,
+					 const std::string &str_pfcand_charge,
+					 const std::string &str_pfcand_mask,
+					 const float &min_pt,
+					 const int &min_per_charge);
+
 ROOT::RDF::RNode GetHiggsP4(ROOT::RDF::RNode df, 
 			    const std::string &str_d1_p4, 
 			    const std::string &str_d2_p4,
@@ -42,10 +100,17 @@ ROOT::RDF::RNode GetHiggsP4(ROOT::RDF::RNode df,
 			    const std::string &str_d4_p4, 
 			    const std::string &str_H_p4);
 		
+ROOT::RDF::RNode GetGenDecayTree(ROOT::RDF::RNode df, 
+				 const std::string &str_genpart_pdgid, 
+				 const std::string &str_genpart_motheridx, 
+				 const std::string &str_gen_decay_tree);
+
+ROOT::RDF::RNode GenDecayComplete(ROOT::RDF::RNode df, 
+				  const std::string &str_gen_decay_tree, 
+				  const std::string &str_gen_decay_complete);
+
 ROOT::RDF::RNode GetTrueDaughterP4s(ROOT::RDF::RNode df, 
-				    const std::string &str_ngenpart, 
-				    const std::string &str_genpart_pdgid,
-				    const std::string &str_genpart_genpartidxmother, 
+				    const std::string &str_gen_decay_tree, 
 				    const std::string &str_genpart_pt,
 				    const std::string &str_genpart_eta, 
 				    const std::string &str_genpart_phi,
@@ -57,9 +122,24 @@ ROOT::RDF::RNode GetTrueDaughterP4s(ROOT::RDF::RNode df,
 				    const std::string &str_truth_d4_p4,
 				    const std::string &str_truth_h_p4); 
 
-ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &str_truth_daughters, const std::string &str_genpart_pdgid, const std::string &str_genpart_motheridx, 
+ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &str_truth_daughters, const std::string &str_gen_decay_tree, 
                const std::string &str_truth_ps1, const std::string &str_truth_ps2);
 
+ROOT::RDF::RNode MatchDaughtersToTruth(ROOT::RDF::RNode df, 
+				       const std::string &str_d1_p4, 
+				       const std::string &str_d2_p4,
+				       const std::string &str_d3_p4, 
+				       const std::string &str_d4_p4, 
+				       const std::string &str_truth_d1_p4,
+				       const std::string &str_truth_d2_p4, 
+				       const std::string &str_truth_d3_p4, 
+				       const std::string &str_truth_d4_p4,
+				       const std::string &str_match,
+				       const std::string &str_match_indices, 
+				       const std::string &str_match_deltaR,
+				       const std::string &str_fully_matched, 
+				       const float &max_deltaR);
+
 ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df, 
 					const std::string &daughterIdx, 
 					const std::string &str_pfcand_pt, 
@@ -71,6 +151,12 @@ ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df,
 					const std::string &str_highPtPair, 
 					const std::string &str_lowPtPair);
 
+ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df,
+				  const std::string &daughterIdx,
+				  const std::string &str_pfcand_view,
+				  const std::string &str_highPtPair,
+				  const std::string &str_lowPtPair);
+
 ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df, 
 					const std::string &daughterIdx, 
 					const std::string &str_pfcand_pt, 
@@ -82,6 +168,21 @@ ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df,
 					const std::string &str_ps1Pair, 
                     const std::string &str_ps2Pair);
 
+ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df,
+				const std::string &daughterIdx,
+				const std::string &str_pfcand_view,
+				const std::string &str_ps1Pair,
+				const std::string &str_ps2Pair);
+
+ROOT::RDF::RNode GetPseudoScalarPairs(ROOT::RDF::RNode df,
+				      const std::string &daughterIdx,
+				      const std::string &str_pfcand_view,
+				      const std::string &str_ps1Pair,
+				      const std::string &str_ps2Pair,
+				      const std::string &criterion,
+				      const float &ps_mass,
+				      const float &ps_mass_width);
+
 ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df, 
 					const std::string &str_pf_cand_iso, 
 					const std::string &str_pfcand_pt, 
@@ -92,7 +193,55 @@ ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df,
 					const std::string &str_pfcand_charged_hadron_mask, 
 					const std::string &str_pfcand_neutral_hadron_mask, 
 					const std::string &str_pfcand_photon_mask, 
-					const std::string &str_pfcand_fromPV_mask); 
+					const std::string &str_pfcand_fromPV_mask,
+					const float &cone,
+					const float &deltabeta_factor);
+
+ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df,
+			   const std::string &str_pf_cand_iso,
+			   const std::string &str_pfcand_pt,
+			   const std::string &str_pfcand_eta,
+			   const std::string &str_pfcand_phi,
+			   const std::string &str_pfcand_mass,
+			   const std::string &str_higgsdaughters,
+			   const std::string &str_pfcand_charged_hadron_mask,
+			   const std::string &str_pfcand_neutral_hadron_mask,
+			   const std::string &str_pfcand_photon_mask,
+			   const std::string &str_pfcand_fromPV_mask,
+			   const std::string &str_pfcand_grid,
+			   const float &cone,
+			   const float &deltabeta_factor);
+
+ROOT::RDF::RNode pfCandIsoScan(ROOT::RDF::RNode df,
+			       const std::string &str_pf_cand_iso,
+			       const std::string &str_pfcand_pt,
+			       const std::string &str_pfcand_eta,
+			       const std::string &str_pfcand_phi,
+			       const std::string &str_pfcand_mass,
+			       const std::string &str_higgsdaughters,
+			       const std::string &str_pfcand_charged_hadron_mask,
+			       const std::string &str_pfcand_neutral_hadron_mask,
+			       const std::string &str_pfcand_photon_mask,
+			       const std::string &str_pfcand_fromPV_mask,
+			       const std::vector<float> &cones,
+			       const float &deltabeta_factor);
+
+ROOT::RDF::RNode GetHiggsCandidate(ROOT::RDF::RNode df,
+				   const std::string &str_higgsdaughters,
+				   const std::string &str_pfcand_view,
+				   const std::string &str_daughter_isos,
+				   const std::string &str_pfcand_mass,
+				   const std::string &str_higgs_candidate,
+				   const float &kaon_mass,
+				   const float &pion_mass);
+
+ROOT::RDF::RNode UnpackHiggsCandidate(ROOT::RDF::RNode df,
+				      const std::string &str_higgs_candidate,
+				      const std::vector<std::string> &outputs);
+
+ROOT::RDF::RNode UnpackMassHypotheses(ROOT::RDF::RNode df,
+				      const std::string &str_higgs_candidate,
+				      const std::vector<std::string> &outputs);
 
 ROOT::RDF::RNode getGenPt(ROOT::RDF::RNode df, const std::string &str_genpart_mask, const std::string &str_genpart_pt, const std::string &str_gen_pt);
 
@@ -0,0 +1,1598 @@
+#ifndef GUARD_HAA_KERNELS_H
+#define GUARD_HAA_KERNELS_H
+
+#include "ROOT/RVec.hxx"
+#include <algorithm>
+#include <array>
+#include <cmath>
+#include <cstddef>
+#include <limits>
+#include <numeric>
+#include <utility>
+#include <vector>
+
+/// Per-event kernels used by the haa:: producers. They only depend on ROOT and can be
+/// used directly, e.g. in the benchmarks in cpp_addons/benchmarks.
+
+namespace haa {
+
+/**
+ * @brief Azimuthal difference phi2 - phi1 wrapped into (-π, π]
+ *
+ * Same convention as ROOT::Math::VectorUtil::DeltaPhi.
+ */
+inline double DeltaPhi(const double phi1, const double phi2) {
+  double dphi = phi2 - phi1;
+  if (dphi > M_PI) {
+    dphi -= 2.0 * M_PI;
+  } else if (dphi <= -M_PI) {
+    dphi += 2.0 * M_PI;
+  }
+  return dphi;
+}
+
+/**
+ * @brief The k hardest entries of a collection, collected in one pass
+ *
+ * Fixed-size buffer kept sorted by decreasing pT with insertion: an entry that is not
+ * harder than the current k-th one costs one comparison. This replaces sorting all
+ * selected indices when only the first few are needed. For equal pT the entry inserted
+ * first stays in front.
+ */
+template <int K>
+struct HardestByPt {
+  /// indices sorted by decreasing pT, the first n are valid
+  std::array<int, K> indices;
+  std::array<float, K> pt;
+  int n = 0;
+
+  void Insert(const int idx, const float value) {
+    if (n == K && !(value > pt[K - 1])) {
+      return;
+    }
+    int pos = n < K ? n++ : K - 1;
+    while (pos > 0 && value > pt[pos - 1]) {
+      indices[pos] = indices[pos - 1];
+      pt[pos] = pt[pos - 1];
+      pos--;
+    }
+    indices[pos] = idx;
+    pt[pos] = value;
+  }
+
+  bool Full() const { return n == K; }
+};
+
+/// The k hardest positive and k hardest negative entries of a collection
+template <int K>
+struct HardestByCharge {
+  HardestByPt<K> positive;
+  HardestByPt<K> negative;
+};
+
+/**
+ * @brief Per-event view of the selected PF candidates
+ *
+ * Structure of arrays holding everything the Higgs reconstruction algorithms need about
+ * the PF candidates passing a selection mask, so that the mask, the hardest candidates and
+ * the kinematics are only evaluated once per event. The selected candidates are not sorted
+ * by pT, SortedByPt gives that order for the algorithms that need it. The kinematic arrays
+ * are compact: entry k belongs to the PF candidate indices[k], i.e. they are in mask order.
+ */
+struct PFCandView {
+  /// selected PF candidate indices in mask (ascending) order
+  ROOT::RVec<int> indices;
+  /// the four hardest selected PF candidates, sorted by decreasing pT
+  HardestByPt<4> hardest;
+  /// the two hardest selected PF candidates with charge +1 and with charge -1
+  HardestByCharge<2> hardest_by_charge;
+  ROOT::RVec<float> pt;
+  ROOT::RVec<float> eta;
+  ROOT::RVec<float> phi;
+  /// derived quantities are kept in double precision, pair masses are computed from them
+  ROOT::RVec<double> sinphi;
+  ROOT::RVec<double> cosphi;
+  ROOT::RVec<double> px;
+  ROOT::RVec<double> py;
+  ROOT::RVec<double> pz;
+  ROOT::RVec<double> energy;
+  ROOT::RVec<int> charge;
+
+  /**
+   * @brief Position of a PF candidate in the compact arrays
+   *
+   * @param pfcand_index Index in the PF candidate collection
+   *
+   * @return int Position, -1 if the PF candidate is not selected
+   */
+  int Position(const int pfcand_index) const {
+    const auto it = std::lower_bound(indices.begin(), indices.end(), pfcand_index);
+    if (it == indices.end() || *it != pfcand_index) {
+      return -1;
+    }
+    return it - indices.begin();
+  }
+};
+
+/**
+ * @brief Build the PF candidate view of one event
+ *
+ * The hardest candidates are collected with HardestByPt in the same pass that applies the
+ * mask, so they are identical to the ones of FindHardest and FindHardestByCharge (for equal
+ * pT the lower index comes first).
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_eta PF candidate pseudorapidities
+ * @param pfcand_phi PF candidate azimuthal angles
+ * @param pfcand_mass PF candidate masses
+ * @param pfcand_charge PF candidate charges
+ * @param pfcand_mask PF candidate selection mask
+ *
+ * @return PFCandView view of the selected PF candidates
+ */
+inline PFCandView BuildPFCandView(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta,
+                                  const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass,
+                                  const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+  PFCandView view;
+  for (std::size_t i = 0; i < pfcand_mask.size(); i++) {
+    if (!pfcand_mask[i]) {
+      continue;
+    }
+    view.indices.push_back(i);
+    view.hardest.Insert(i, pfcand_pt[i]);
+    if (pfcand_charge[i] == 1) {
+      view.hardest_by_charge.positive.Insert(i, pfcand_pt[i]);
+    } else if (pfcand_charge[i] == -1) {
+      view.hardest_by_charge.negative.Insert(i, pfcand_pt[i]);
+    }
+  }
+  const std::size_t n = view.indices.size();
+
+  view.pt.resize(n);
+  view.eta.resize(n);
+  view.phi.resize(n);
+  view.sinphi.resize(n);
+  view.cosphi.resize(n);
+  view.px.resize(n);
+  view.py.resize(n);
+  view.pz.resize(n);
+  view.energy.resize(n);
+  view.charge.resize(n);
+  for (std::size_t k = 0; k < n; k++) {
+    const int idx = view.indices[k];
+    const double pt = pfcand_pt[idx];
+    const double eta = pfcand_eta[idx];
+    const double phi = pfcand_phi[idx];
+    const double mass = pfcand_mass[idx];
+    const double sinphi = std::sin(phi);
+    const double cosphi = std::cos(phi);
+    const double p = pt * std::cosh(eta);
+    view.pt[k] = pfcand_pt[idx];
+    view.eta[k] = pfcand_eta[idx];
+    view.phi[k] = pfcand_phi[idx];
+    view.sinphi[k] = sinphi;
+    view.cosphi[k] = cosphi;
+    view.px[k] = pt * cosphi;
+    view.py[k] = pt * sinphi;
+    view.pz[k] = pt * std::sinh(eta);
+    view.energy[k] = std::sqrt(p * p + mass * mass);
+    view.charge[k] = pfcand_charge[idx];
+  }
+  return view;
+}
+
+/**
+ * @brief Selected PF candidate indices of a view, sorted by decreasing pT
+ *
+ * Needed by the algorithms that map quadruplet positions to the pT-ordered candidate list
+ * (ClosestToHiggsMassAlgo, ClosestToHiggsMassScan). They call it only for events in which a
+ * quadruplet was found. For equal pT the lower index comes first, as in HardestByPt.
+ *
+ * @param view PF candidate view
+ *
+ * @return ROOT::RVec<int> PF candidate indices sorted by decreasing pT
+ */
+inline ROOT::RVec<int> SortedByPt(const PFCandView &view) {
+  const std::size_t n = view.indices.size();
+  ROOT::RVec<int> positions(n);
+  std::iota(positions.begin(), positions.end(), 0);
+  std::stable_sort(positions.begin(), positions.end(), [&view](int a, int b) {
+    return view.pt[a] > view.pt[b];
+  });
+  ROOT::RVec<int> sorted(n);
+  for (std::size_t k = 0; k < n; k++) {
+    sorted[k] = view.indices[positions[k]];
+  }
+  return sorted;
+}
+
+/**
+ * @brief Binned η-φ grid of a collection, used as spatial index for ΔR queries
+ *
+ * The objects are sorted into square cells of at least cell_size in η and φ, with the φ
+ * cells wrapping around at ±π. A cone query of radius r only visits the cells within r
+ * of the cone axis, so its cost scales with the local object density instead of with the
+ * collection size. The cells are stored in compressed form: the objects of cell c are
+ * entries[cell_start[c]] ... entries[cell_start[c+1] - 1], in ascending index order.
+ */
+struct EtaPhiGrid {
+  double cell_size = 0;
+  double eta_min = 0;
+  /// cell width in φ, 2π / n_phi >= cell_size
+  double phi_width = 0;
+  int n_eta = 0;
+  int n_phi = 0;
+  ROOT::RVec<int> cell_start;
+  ROOT::RVec<int> entries;
+
+  int EtaCell(const double eta) const {
+    const int cell = std::floor((eta - eta_min) / cell_size);
+    return std::min(std::max(cell, 0), n_eta - 1);
+  }
+
+  int PhiCell(const double phi) const {
+    const int cell = std::floor((phi + M_PI) / phi_width);
+    if (cell >= 0 && cell < n_phi) {
+      return cell;
+    }
+    return ((cell % n_phi) + n_phi) % n_phi;
+  }
+
+  /**
+   * @brief Call f(index) for every object in the cells within a radius of a position
+   *
+   * The visited objects are a superset of the objects with ΔR < radius, the caller has to
+   * apply the distance cut. Objects are visited cell by cell, not in index order.
+   *
+   * @param eta Pseudorapidity of the cone axis
+   * @param phi Azimuthal angle of the cone axis
+   * @param radius Cone radius
+   * @param f Callable taking the object index
+   */
+  template <typename F>
+  void ForEachCandidate(const double eta, const double phi, const double radius, F &&f) const {
+    if (entries.empty()) {
+      return;
+    }
+    // small margin, so that float rounding at the cone boundary never skips a cell
+    const double r = radius * (1 + 1e-6);
+    const int eta_first = EtaCell(eta - r);
+    const int eta_last = EtaCell(eta + r);
+    const int k = std::ceil(r / phi_width);
+    const int phi_center = PhiCell(phi);
+    const bool all_phi = 2 * k + 1 >= n_phi;
+    const int phi_first = all_phi ? 0 : phi_center - k;
+    const int phi_last = all_phi ? n_phi - 1 : phi_center + k;
+    for (int ie = eta_first; ie <= eta_last; ie++) {
+      for (int ip = phi_first; ip <= phi_last; ip++) {
+        const int cell = ie * n_phi + ((ip % n_phi) + n_phi) % n_phi;
+        for (int e = cell_start[cell]; e < cell_start[cell + 1]; e++) {
+          f(entries[e]);
+        }
+      }
+    }
+  }
+};
+
+/**
+ * @brief Build the η-φ grid of a collection
+ *
+ * @param eta Pseudorapidities of the objects
+ * @param phi Azimuthal angles of the objects
+ * @param cell_size Minimum cell size, should be the largest cone radius that is queried
+ *
+ * @return EtaPhiGrid grid over all objects of the collection
+ */
+inline EtaPhiGrid BuildEtaPhiGrid(const ROOT::RVec<float> &eta, const ROOT::RVec<float> &phi, const double cell_size) {
+  EtaPhiGrid grid;
+  grid.cell_size = cell_size;
+  grid.n_phi = std::max(1, static_cast<int>(2 * M_PI / cell_size));
+  grid.phi_width = 2 * M_PI / grid.n_phi;
+  if (eta.empty()) {
+    grid.n_eta = 1;
+    grid.cell_start.assign(grid.n_phi + 1, 0);
+    return grid;
+  }
+  const auto eta_range = std::minmax_element(eta.begin(), eta.end());
+  grid.eta_min = *eta_range.first;
+  grid.n_eta = static_cast<int>((*eta_range.second - grid.eta_min) / cell_size) + 1;
+
+  // counting sort of the object indices by cell
+  ROOT::RVec<int> cells(eta.size());
+  grid.cell_start.assign(grid.n_eta * grid.n_phi + 1, 0);
+  for (std::size_t i = 0; i < eta.size(); i++) {
+    cells[i] = grid.EtaCell(eta[i]) * grid.n_phi + grid.PhiCell(phi[i]);
+    grid.cell_start[cells[i] + 1]++;
+  }
+  for (std::size_t c = 1; c < grid.cell_start.size(); c++) {
+    grid.cell_start[c] += grid.cell_start[c - 1];
+  }
+  grid.entries.resize(eta.size());
+  ROOT::RVec<int> fill(grid.cell_start.begin(), grid.cell_start.end() - 1);
+  for (std::size_t i = 0; i < eta.size(); i++) {
+    grid.entries[fill[cells[i]]++] = i;
+  }
+  return grid;
+}
+
+/**
+ * @brief Check whether the selected PF candidates can give four Higgs daughters
+ *
+ * Counts the selected positive and negative candidates above a pT threshold and stops as
+ * soon as enough of both are found. No sorting and no pair search are done, so the check
+ * can run as an event filter in front of the Higgs daughter algorithms.
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_charge PF candidate charges
+ * @param pfcand_mask PF candidate selection mask
+ * @param min_pt Minimum daughter pT
+ * @param min_per_charge Minimum number of candidates of each charge
+ *
+ * @return bool true if at least min_per_charge positive, min_per_charge negative and four
+ * candidates in total pass
+ *
+ * @note ChargePairsAlgo needs two candidates of each charge, ClosestToHiggsMassAlgo only one
+ * (two good pairs can share a candidate)
+ */
+inline bool CanFormHiggsDaughters(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge,
+                                  const ROOT::RVec<int> &pfcand_mask, const float min_pt, const int min_per_charge) {
+  int npositive = 0;
+  int nnegative = 0;
+  for (std::size_t i = 0; i < pfcand_mask.size(); i++) {
+    if (!pfcand_mask[i] || pfcand_pt[i] < min_pt) {
+      continue;
+    }
+    if (pfcand_charge[i] == 1) {
+      npositive++;
+    } else if (pfcand_charge[i] == -1) {
+      nnegative++;
+    } else {
+      continue;
+    }
+    if (npositive >= min_per_charge && nnegative >= min_per_charge && npositive + nnegative >= 4) {
+      return true;
+    }
+  }
+  return false;
+}
+
+/**
+ * @brief Find the k hardest selected PF candidates in one pass, without sorting
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_mask PF candidate selection mask
+ *
+ * @return HardestByPt<K> the k hardest selected candidates, fewer if fewer are selected
+ */
+template <int K>
+inline HardestByPt<K> FindHardest(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_mask) {
+  HardestByPt<K> hardest;
+  for (std::size_t i = 0; i < pfcand_mask.size(); i++) {
+    if (pfcand_mask[i]) {
+      hardest.Insert(i, pfcand_pt[i]);
+    }
+  }
+  return hardest;
+}
+
+/**
+ * @brief Find the k hardest selected PF candidates of each charge in one pass, without sorting
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_charge PF candidate charges, only +1 and -1 are collected
+ * @param pfcand_mask PF candidate selection mask
+ *
+ * @return HardestByCharge<K> the k hardest selected candidates of each charge
+ */
+template <int K>
+inline HardestByCharge<K> FindHardestByCharge(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge,
+                                              const ROOT::RVec<int> &pfcand_mask) {
+  HardestByCharge<K> hardest;
+  for (std::size_t i = 0; i < pfcand_mask.size(); i++) {
+    if (!pfcand_mask[i]) {
+      continue;
+    }
+    if (pfcand_charge[i] == 1) {
+      hardest.positive.Insert(i, pfcand_pt[i]);
+    } else if (pfcand_charge[i] == -1) {
+      hardest.negative.Insert(i, pfcand_pt[i]);
+    }
+  }
+  return hardest;
+}
+
+namespace quadruplets {
+
+/**
+ * @brief List all opposite-charge pairs of the selected PF candidates within a ΔR cone
+ *
+ * Same as the FindGoodPairs overload on four-momenta in haa.cxx, but reading η, φ and
+ * charge from the compact arrays of a PFCandView. Positions refer to the view arrays (mask order).
+ *
+ * @param view PF candidate view
+ * @param max_deltaR Maximum ΔR between the two candidates of a pair
+ *
+ * @return std::vector<std::pair<int, int>> Positions of the good pairs
+ */
+inline std::vector<std::pair<int, int>> FindGoodPairs(const PFCandView &view, const double max_deltaR) {
+  std::vector<std::pair<int, int>> pairs;
+  const int n = view.indices.size();
+  for (int i = 0; i < n; i++) {
+    for (int j = i+1; j < n; j++) {
+      const double dphi = DeltaPhi(view.phi[i], view.phi[j]);
+      const double deta = view.eta[j] - view.eta[i];
+      float DeltaR = std::sqrt(dphi * dphi + deta * deta);
+      if (DeltaR < max_deltaR && view.charge[i] != view.charge[j]) {
+        pairs.emplace_back(i, j);
+      }
+    }
+  }
+  return pairs;
+}
+
+/**
+ * @brief Find the last quadruplet in combination order that contains at least two good pairs
+ *
+ * A quadruplet is accepted if at least two of its six pairs are good pairs. Instead of
+ * enumerating all C(N,4) quadruplets, every accepted quadruplet is built from two good
+ * pairs: disjoint pairs give the quadruplet directly, pairs sharing one candidate give a
+ * triplet which is completed with the highest remaining position. Of all accepted
+ * quadruplets the lexicographically largest one is returned, which is the one the
+ * combinatorial scan (ROOT::VecOps::Combinations order) would have kept last.
+ *
+ * The smallest position of a quadruplet is at most the first position of both of its pairs.
+ * The pairs are therefore combined in decreasing order of their first position, and the
+ * search stops as soon as this bound is below the smallest position of the best quadruplet.
+ *
+ * @param good_pairs Good pairs as returned by FindGoodPairs, sorted
+ * @param ncandidates Number of candidates the positions refer to
+ *
+ * @return std::array<int, 4> Sorted positions of the quadruplet, {-1, -1, -1, -1} if none is found
+ *
+ * @note The cost scales at most with the square of the number of good pairs
+ */
+inline std::array<int, 4> LastQuadrupletFromPairs(const std::vector<std::pair<int, int>> &good_pairs, const int ncandidates) {
+  std::array<int, 4> best = {-1, -1, -1, -1};
+  for (std::size_t a = good_pairs.size(); a-- > 0;) {
+    if (best[0] >= 0 && good_pairs[a].first < best[0]) {
+      break;
+    }
+    for (std::size_t b = a; b-- > 0;) {
+      if (best[0] >= 0 && good_pairs[b].first < best[0]) {
+        break;
+      }
+      std::array<int, 4> quad = {good_pairs[a].first, good_pairs[a].second, good_pairs[b].first, good_pairs[b].second};
+      std::sort(quad.begin(), quad.end());
+      auto last = std::unique(quad.begin(), quad.end());
+      if (last - quad.begin() == 3) {
+        int x = ncandidates - 1;
+        while (x == quad[0] || x == quad[1] || x == quad[2]) {
+          x--;
+        }
+        quad[3] = x;
+        std::sort(quad.begin(), quad.end());
+      }
+      if (best[0] < 0 || quad > best) {
+        best = quad;
+      }
+    }
+  }
+  return best;
+}
+
+/**
+ * @brief List all opposite-charge pairs of the selected PF candidates within a ΔR cone, using the η-φ grid
+ *
+ * Same result as FindGoodPairs on the view, but the partners of each candidate are only
+ * searched in the neighbouring grid cells. The pairs are sorted afterwards, so they are in
+ * the same lexicographic order.
+ *
+ * @param view PF candidate view
+ * @param grid η-φ grid of all PF candidates, with a cell size of at least max_deltaR
+ * @param max_deltaR Maximum ΔR between the two candidates of a pair
+ *
+ * @return std::vector<std::pair<int, int>> Positions of the good pairs
+ */
+inline std::vector<std::pair<int, int>> FindGoodPairs(const PFCandView &view, const EtaPhiGrid &grid, const double max_deltaR) {
+  std::vector<std::pair<int, int>> pairs;
+  const int n = view.indices.size();
+  // the grid covers all PF candidates, most visited candidates are not selected
+  std::vector<int> position(grid.entries.size(), -1);
+  for (int k = 0; k < n; k++) {
+    position[view.indices[k]] = k;
+  }
+  for (int i = 0; i < n; i++) {
+    grid.ForEachCandidate(view.eta[i], view.phi[i], max_deltaR, [&](const int pfcand_index) {
+      const int j = position[pfcand_index];
+      if (j <= i) {
+        return;
+      }
+      const double dphi = DeltaPhi(view.phi[i], view.phi[j]);
+      const double deta = view.eta[j] - view.eta[i];
+      float DeltaR = std::sqrt(dphi * dphi + deta * deta);
+      if (DeltaR < max_deltaR && view.charge[i] != view.charge[j]) {
+        pairs.emplace_back(i, j);
+      }
+    });
+  }
+  std::sort(pairs.begin(), pairs.end());
+  return pairs;
+}
+
+} // namespace quadruplets
+
+namespace pairing {
+
+/// Criterion by which the pairings of four daughters into two pseudoscalar candidates are ranked
+enum class Criterion {
+  /// smallest |m(pair 1) - m(pair 2)|
+  MinMassDiff,
+  /// highest pT of a single pair, this pair is returned first
+  HighestPairPt,
+  /// smallest χ² of both pair masses with respect to a common mass hypothesis
+  MassWindowChi2,
+};
+
+/// The three ways to split four daughters into two pairs, as daughter positions (0-3)
+constexpr std::array<std::array<std::array<int, 2>, 2>, 3> Pairings = {{
+    {{{0, 1}, {2, 3}}},
+    {{{0, 2}, {1, 3}}},
+    {{{0, 3}, {1, 2}}},
+}};
+
+/**
+ * @brief Cartesian four-momenta and charges of four daughters
+ *
+ * Built once per event, so that scoring the pairings only needs additions.
+ */
+struct FourBody {
+  std::array<double, 4> px;
+  std::array<double, 4> py;
+  std::array<double, 4> pz;
+  std::array<double, 4> energy;
+  std::array<int, 4> charge;
+
+  /// Invariant mass of two daughters, negative for space-like sums as ROOT::Math::LorentzVector::M
+  double PairMass(const std::array<int, 2> &pair) const {
+    const double x = px[pair[0]] + px[pair[1]];
+    const double y = py[pair[0]] + py[pair[1]];
+    const double z = pz[pair[0]] + pz[pair[1]];
+    const double t = energy[pair[0]] + energy[pair[1]];
+    const double m2 = t * t - x * x - y * y - z * z;
+    return m2 >= 0 ? std::sqrt(m2) : -std::sqrt(-m2);
+  }
+
+  /// Transverse momentum of two daughters
+  double PairPt(const std::array<int, 2> &pair) const {
+    const double x = px[pair[0]] + px[pair[1]];
+    const double y = py[pair[0]] + py[pair[1]];
+    return std::sqrt(x * x + y * y);
+  }
+
+  /// Invariant mass of all four daughters
+  double Mass() const {
+    const double x = px[0] + px[1] + px[2] + px[3];
+    const double y = py[0] + py[1] + py[2] + py[3];
+    const double z = pz[0] + pz[1] + pz[2] + pz[3];
+    const double t = energy[0] + energy[1] + energy[2] + energy[3];
+    const double m2 = t * t - x * x - y * y - z * z;
+    return m2 >= 0 ? std::sqrt(m2) : -std::sqrt(-m2);
+  }
+};
+
+/**
+ * @brief Four daughters from the cached Cartesian components of a PF candidate view
+ *
+ * @param view PF candidate view
+ * @param positions Positions of the four daughters in the view arrays
+ *
+ * @return FourBody daughters in the order of positions
+ */
+inline FourBody FourBodyFromView(const PFCandView &view, const std::array<int, 4> &positions) {
+  FourBody daughters;
+  for (int i = 0; i < 4; i++) {
+    const int pos = positions[i];
+    daughters.px[i] = view.px[pos];
+    daughters.py[i] = view.py[pos];
+    daughters.pz[i] = view.pz[pos];
+    daughters.energy[i] = view.energy[pos];
+    daughters.charge[i] = view.charge[pos];
+  }
+  return daughters;
+}
+
+/**
+ * @brief Four daughters from the PF candidate columns
+ *
+ * Uses the same conversion to Cartesian components as BuildPFCandView.
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_eta PF candidate pseudorapidities
+ * @param pfcand_phi PF candidate azimuthal angles
+ * @param pfcand_mass PF candidate masses
+ * @param pfcand_charge PF candidate charges
+ * @param indices PF candidate indices of the four daughters
+ *
+ * @return FourBody daughters in the order of indices
+ */
+inline FourBody FourBodyFromPFCands(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta,
+                                    const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass,
+                                    const ROOT::RVec<int> &pfcand_charge, const std::array<int, 4> &indices) {
+  FourBody daughters;
+  for (int i = 0; i < 4; i++) {
+    const int idx = indices[i];
+    const double pt = pfcand_pt[idx];
+    const double eta = pfcand_eta[idx];
+    const double phi = pfcand_phi[idx];
+    const double mass = pfcand_mass[idx];
+    const double p = pt * std::cosh(eta);
+    daughters.px[i] = pt * std::cos(phi);
+    daughters.py[i] = pt * std::sin(phi);
+    daughters.pz[i] = pt * std::sinh(eta);
+    daughters.energy[i] = std::sqrt(p * p + mass * mass);
+    daughters.charge[i] = pfcand_charge[idx];
+  }
+  return daughters;
+}
+
+/**
+ * @brief Best opposite-charge pairing of four daughters
+ */
+struct FourBodyPairing {
+  /// daughter positions (0-3) of the two pairs, {{-1, -1}, {-1, -1}} if no pairing is found
+  std::array<std::array<int, 2>, 2> pairs = {{{-1, -1}, {-1, -1}}};
+  /// masses of the two pairs
+  std::array<double, 2> mass = {0, 0};
+  /// score of the pairing, lower is better (|Δm|, -pT of the leading pair or χ²)
+  float score = 0;
+
+  bool Valid() const { return pairs[0][0] >= 0; }
+};
+
+/**
+ * @brief Score the three opposite-charge pairings of four daughters and return the best one
+ *
+ * Only pairings in which both pairs have opposite charges are considered. The pairings are
+ * visited in the order of Pairings and a later pairing has to score strictly better to
+ * replace an earlier one. Within each pair the positions are ascending. The pair holding
+ * the first daughter is returned first, except for HighestPairPt, where the pair with the
+ * higher pT is returned first.
+ *
+ * @param daughters Cartesian four-momenta and charges of the four daughters
+ * @param criterion Criterion the pairings are ranked by
+ * @param mass_hypothesis Pseudoscalar mass the pair masses are compared to (MassWindowChi2 only)
+ * @param mass_width Mass resolution used in the χ² (MassWindowChi2 only)
+ *
+ * @return FourBodyPairing best pairing, invalid if no opposite-charge pairing exists
+ *
+ * @note As in GetMinMassDiff, pairings with |Δm| >= 9999 are not accepted, and as in
+ * GetPseudoScalars the leading pair needs a pT above 0
+ */
+inline FourBodyPairing BestPairing(const FourBody &daughters, const Criterion criterion, const double mass_hypothesis = 0,
+                                   const double mass_width = 1) {
+  FourBodyPairing best;
+  float best_score = std::numeric_limits<float>::infinity();
+  if (criterion == Criterion::MinMassDiff) {
+    best_score = 9999.0;
+  } else if (criterion == Criterion::HighestPairPt) {
+    best_score = 0;
+  }
+
+  for (const auto &pairing : Pairings) {
+    auto pairs = pairing;
+    if (daughters.charge[pairs[0][0]] == daughters.charge[pairs[0][1]] ||
+        daughters.charge[pairs[1][0]] == daughters.charge[pairs[1][1]]) {
+      continue;
+    }
+    std::array<double, 2> mass = {daughters.PairMass(pairs[0]), daughters.PairMass(pairs[1])};
+    double score = 0;
+    if (criterion == Criterion::MinMassDiff) {
+      score = static_cast<float>(std::abs(mass[0] - mass[1]));
+    } else if (criterion == Criterion::HighestPairPt) {
+      const double pt_first = daughters.PairPt(pairs[0]);
+      const double pt_second = daughters.PairPt(pairs[1]);
+      if (pt_second > pt_first) {
+        std::swap(pairs[0], pairs[1]);
+        std::swap(mass[0], mass[1]);
+      }
+      score = -std::max(pt_first, pt_second);
+    } else {
+      const double pull_first = (mass[0] - mass_hypothesis) / mass_width;
+      const double pull_second = (mass[1] - mass_hypothesis) / mass_width;
+      score = pull_first * pull_first + pull_second * pull_second;
+    }
+    if (score < best_score) {
+      best_score = score;
+      best.pairs = pairs;
+      best.mass = mass;
+      best.score = best_score;
+    }
+  }
+  return best;
+}
+
+/**
+ * @brief The two daughters that are not part of the given pair, in daughter order
+ *
+ * @param daughterIdx PF candidate indices of the four daughters
+ * @param pair PF candidate indices of the first pair
+ *
+ * @return std::array<int, 2> PF candidate indices of the second pair
+ */
+inline std::array<int, 2> Partners(const ROOT::RVec<int> &daughterIdx, const std::array<int, 2> &pair) {
+  std::array<int, 2> partners = {-1, -1};
+  for (auto idx : daughterIdx) {
+    if (idx != pair[0] && idx != pair[1]) {
+      if (partners[0] == -1) {
+        partners[0] = idx;
+      } else {
+        partners[1] = idx;
+      }
+    }
+  }
+  return partners;
+}
+
+} // namespace pairing
+
+namespace quadruplets {
+
+/// Score the accepted quadruplets are ranked by
+enum class Ranking {
+  /// |m4 - m_H|, lowest first
+  HiggsMass,
+  /// scalar sum of the four pT, highest first
+  SumPt,
+  /// |m12 - m34| of the opposite-charge pairing with the smallest mass difference, lowest first
+  PairMassDiff,
+};
+
+/**
+ * @brief Quadruplet with its score
+ */
+struct RankedQuadruplet {
+  /// sorted positions in the PF candidate view
+  std::array<int, 4> positions;
+  /// score as defined by the ranking, e.g. |m4 - m_H| in GeV
+  float score;
+  /// score oriented such that lower is better
+  float key;
+};
+
+/**
+ * @brief Whether a pair of good pairs is the one a quadruplet is counted for
+ *
+ * Any two good pairs within a quadruplet give the quadruplet when they are combined as in
+ * TopQuadruplets, so it is produced once for every such combination. It is only counted for
+ * its first two good pairs in the order of good_pairs, which are looked up among the six
+ * pairs of the quadruplet (listed in lexicographic order, like good_pairs).
+ *
+ * @param quad Sorted positions of the quadruplet
+ * @param good_pairs Good pairs as returned by FindGoodPairs, sorted
+ * @param first First good pair the quadruplet was built from
+ * @param second Second good pair the quadruplet was built from, after first in good_pairs
+ *
+ * @return bool True if first and second are the first two good pairs of the quadruplet
+ */
+inline bool IsCanonical(const std::array<int, 4> &quad, const std::vector<std::pair<int, int>> &good_pairs,
+                        const std::pair<int, int> &first, const std::pair<int, int> &second) {
+  int found = 0;
+  for (int i = 0; i < 4; i++) {
+    for (int j = i+1; j < 4; j++) {
+      const std::pair<int, int> pair = {quad[i], quad[j]};
+      if (!std::binary_search(good_pairs.begin(), good_pairs.end(), pair)) {
+        continue;
+      }
+      if (pair != (found == 0 ? first : second)) {
+        return false;
+      }
+      if (++found == 2) {
+        return true;
+      }
+    }
+  }
+  return false;
+}
+
+/**
+ * @brief The K best quadruplets of the selected PF candidates
+ *
+ * Accepts the quadruplets that contain at least two good pairs, as LastQuadrupletFromPairs:
+ * disjoint good pairs give one quadruplet, good pairs sharing a candidate give a triplet
+ * that is completed with each of the remaining candidates. Every quadruplet is scored as it
+ * is built and pushed into a bounded heap of the K best, duplicates are skipped with
+ * IsCanonical, so the memory does not grow with the number of accepted quadruplets.
+ * Quadruplets with equal scores are ordered by their positions, so the result does not
+ * depend on the order in which the quadruplets are visited.
+ *
+ * @param view PF candidate view
+ * @param good_pairs Good pairs as returned by FindGoodPairs, sorted
+ * @param k Number of quadruplets to keep
+ * @param ranking Score the quadruplets are ranked by
+ * @param higgs_mass Higgs mass used by Ranking::HiggsMass
+ *
+ * @return std::vector<RankedQuadruplet> At most k quadruplets, best first
+ *
+ * @note For Ranking::PairMassDiff, quadruplets without an opposite-charge pairing get an
+ * infinite score
+ */
+inline std::vector<RankedQuadruplet> TopQuadruplets(const PFCandView &view, const std::vector<std::pair<int, int>> &good_pairs,
+                                                    const int k, const Ranking ranking, const double higgs_mass) {
+  auto better = [](const RankedQuadruplet &a, const RankedQuadruplet &b) {
+    return a.key < b.key || (a.key == b.key && a.positions < b.positions);
+  };
+  // heap ordered by better, the top is the worst of the kept quadruplets
+  std::vector<RankedQuadruplet> heap;
+  if (k <= 0) {
+    return heap;
+  }
+  heap.reserve(k);
+  auto push = [&](const std::array<int, 4> &quad) {
+    RankedQuadruplet ranked;
+    ranked.positions = quad;
+    if (ranking == Ranking::SumPt) {
+      ranked.score = view.pt[quad[0]] + view.pt[quad[1]] + view.pt[quad[2]] + view.pt[quad[3]];
+      ranked.key = -ranked.score;
+    } else {
+      const auto daughters = pairing::FourBodyFromView(view, quad);
+      if (ranking == Ranking::HiggsMass) {
+        ranked.score = std::abs(daughters.Mass() - higgs_mass);
+      } else {
+        const auto best = pairing::BestPairing(daughters, pairing::Criterion::MinMassDiff);
+        ranked.score = best.Valid() ? best.score : std::numeric_limits<float>::infinity();
+      }
+      ranked.key = ranked.score;
+    }
+    if (static_cast<int>(heap.size()) < k) {
+      heap.push_back(ranked);
+      std::push_heap(heap.begin(), heap.end(), better);
+    } else if (better(ranked, heap.front())) {
+      std::pop_heap(heap.begin(), heap.end(), better);
+      heap.back() = ranked;
+      std::push_heap(heap.begin(), heap.end(), better);
+    }
+  };
+  const int ncandidates = view.indices.size();
+  for (std::size_t a = 0; a < good_pairs.size(); a++) {
+    for (std::size_t b = a+1; b < good_pairs.size(); b++) {
+      std::array<int, 4> quad = {good_pairs[a].first, good_pairs[a].second, good_pairs[b].first, good_pairs[b].second};
+      std::sort(quad.begin(), quad.end());
+      if (std::unique(quad.begin(), quad.end()) - quad.begin() == 4) {
+        if (IsCanonical(quad, good_pairs, good_pairs[a], good_pairs[b])) {
+          push(quad);
+        }
+        continue;
+      }
+      for (int x = 0; x < ncandidates; x++) {
+        if (x == quad[0] || x == quad[1] || x == quad[2]) {
+          continue;
+        }
+        std::array<int, 4> completed = {quad[0], quad[1], quad[2], x};
+        std::sort(completed.begin(), completed.end());
+        if (IsCanonical(completed, good_pairs, good_pairs[a], good_pairs[b])) {
+          push(completed);
+        }
+      }
+    }
+  }
+  std::sort_heap(heap.begin(), heap.end(), better);
+  return heap;
+}
+
+/**
+ * @brief Selected quadruplets for several working points of the PF candidate pT threshold and the pair ΔR
+ *
+ * For each working point w, gives the quadruplet ClosestToHiggsMassAlgo would select on a view
+ * built with the additional requirement pT >= min_pt[w] and a pair cone max_deltaR[w]. The
+ * good pairs are only searched once, with the widest cone of all working points, and are
+ * reused by every working point. A working point keeps the pairs of its candidates within its
+ * cone, with the positions renumbered among its candidates, which keeps their order. Since the
+ * candidates passing a pT threshold are the first ones of the pT-ordered list, the returned
+ * positions can be read from SortedByPt(view) as for a single working point.
+ *
+ * @param view PF candidate view, built with a pT threshold not above any of min_pt
+ * @param min_pt Minimum PF candidate pT of each working point
+ * @param max_deltaR Maximum ΔR of a good pair of each working point
+ *
+ * @return std::vector<std::array<int, 4>> Per working point, the positions of the quadruplet in
+ * SortedByPt(view), {-1, -1, -1, -1} if none is found
+ *
+ * @note min_pt and max_deltaR need to have the same size
+ */
+inline std::vector<std::array<int, 4>> LastQuadrupletsScan(const PFCandView &view, const std::vector<float> &min_pt,
+                                                           const std::vector<float> &max_deltaR) {
+  std::vector<std::array<int, 4>> quads(min_pt.size(), {-1, -1, -1, -1});
+  const int n = view.indices.size();
+  if (n < 4 || min_pt.empty()) {
+    return quads;
+  }
+  const float widest = *std::max_element(max_deltaR.begin(), max_deltaR.end());
+
+  struct ScanPair {
+    int first;
+    int second;
+    float deltaR;
+  };
+  std::vector<ScanPair> pairs;
+  for (int i = 0; i < n; i++) {
+    for (int j = i+1; j < n; j++) {
+      const double dphi = DeltaPhi(view.phi[i], view.phi[j]);
+      const double deta = view.eta[j] - view.eta[i];
+      float DeltaR = std::sqrt(dphi * dphi + deta * deta);
+      if (DeltaR < widest && view.charge[i] != view.charge[j]) {
+        pairs.push_back({i, j, DeltaR});
+      }
+    }
+  }
+
+  std::vector<int> position(n);
+  std::vector<std::pair<int, int>> good_pairs;
+  for (std::size_t w = 0; w < min_pt.size(); w++) {
+    int ncandidates = 0;
+    for (int k = 0; k < n; k++) {
+      position[k] = view.pt[k] >= min_pt[w] ? ncandidates++ : -1;
+    }
+    if (ncandidates < 4) {
+      continue;
+    }
+    good_pairs.clear();
+    for (const auto &pair : pairs) {
+      if (pair.deltaR < max_deltaR[w] && position[pair.first] >= 0 && position[pair.second] >= 0) {
+        good_pairs.emplace_back(position[pair.first], position[pair.second]);
+      }
+    }
+    quads[w] = LastQuadrupletFromPairs(good_pairs, ncandidates);
+  }
+  return quads;
+}
+
+} // namespace quadruplets
+
+/// Daughter mass hypotheses, in the order of the mass hypothesis dimension of HiggsCandidate
+enum MassHypothesis : int {
+  /// charged pion mass for all daughters
+  PionMass,
+  /// charged kaon mass for all daughters
+  KaonMass,
+  /// PF candidate masses as stored in the nanoAOD
+  NanoAODMass,
+  nMassHypotheses,
+};
+
+/**
+ * @brief Reconstructed Higgs candidate of one event
+ *
+ * Plain struct holding the four daughters, the Higgs four-momentum and the two pseudoscalar
+ * pairs, filled by haa::GetHiggsCandidate and read by the accessor columns of
+ * haa::UnpackHiggsCandidate and haa::UnpackMassHypotheses. Daughters are in the order of the
+ * Higgs daughter indices, the pseudoscalar daughters are PF candidate indices.
+ */
+struct HiggsCandidate {
+  std::array<int, 4> daughters;
+  std::array<float, 4> daughter_pt;
+  std::array<float, 4> daughter_eta;
+  std::array<float, 4> daughter_phi;
+  std::array<float, 4> daughter_mass;
+  std::array<float, 4> daughter_iso;
+  float pt;
+  float eta;
+  float phi;
+  float mass;
+  std::array<std::array<int, 2>, 2> ps_daughters;
+  std::array<float, 2> ps_mass;
+  std::array<float, 2> ps_deltaR;
+  /// daughter, Higgs and pseudoscalar masses for each MassHypothesis
+  std::array<std::array<float, 4>, nMassHypotheses> hypothesis_daughter_mass;
+  std::array<float, nMassHypotheses> hypothesis_mass;
+  std::array<std::array<float, 2>, nMassHypotheses> hypothesis_ps_mass;
+};
+
+namespace iso {
+
+/// Number of Higgs daughters the isolation is computed for
+constexpr int ndaughters = 4;
+
+/**
+ * @brief pT sums of the four isolation categories in the cones of the four daughters
+ */
+struct ConeSums {
+  std::array<float, ndaughters> charged_hadron_from_pv{};
+  std::array<float, ndaughters> neutral_hadron{};
+  std::array<float, ndaughters> photon{};
+  std::array<float, ndaughters> charged_hadron_not_from_pv{};
+};
+
+/**
+ * @brief Fill the isolation cone sums of the four daughters in one pass over the PF candidates
+ *
+ * Every PF candidate is classified once (charged hadron from PV, charged hadron not from PV,
+ * neutral hadron, photon) and its squared ΔR to the four daughters is compared to the squared
+ * cone size. Charged hadrons that are themselves daughters are not added to any sum. The sums
+ * are filled in PF candidate order and no memory is allocated.
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_eta PF candidate pseudorapidities
+ * @param pfcand_phi PF candidate azimuthal angles
+ * @param daughters Indices of the four daughters in the PF candidate collection
+ * @param charged_hadron_mask Charged hadron mask
+ * @param neutral_hadron_mask Neutral hadron mask
+ * @param photon_mask Photon mask
+ * @param fromPV_mask Primary vertex association mask
+ * @param cone Isolation cone size in ΔR
+ *
+ * @return ConeSums pT sums per category and daughter
+ *
+ * @note All daughter indices have to be valid PF candidate indices
+ */
+inline ConeSums FillConeSums(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta,
+                             const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<int> &daughters,
+                             const ROOT::RVec<int> &charged_hadron_mask, const ROOT::RVec<int> &neutral_hadron_mask,
+                             const ROOT::RVec<int> &photon_mask, const ROOT::RVec<int> &fromPV_mask,
+                             const double cone) {
+  ConeSums sums;
+  std::array<int, ndaughters> daughter_idx;
+  std::array<double, ndaughters> daughter_eta;
+  std::array<double, ndaughters> daughter_phi;
+  for (int i = 0; i < ndaughters; i++) {
+    daughter_idx[i] = daughters[i];
+    daughter_eta[i] = pfcand_eta[daughters[i]];
+    daughter_phi[i] = pfcand_phi[daughters[i]];
+  }
+  const double cone2 = cone * cone;
+
+  for (std::size_t j = 0; j < pfcand_pt.size(); j++) {
+    const int idx = j;
+    const bool is_daughter = idx == daughter_idx[0] || idx == daughter_idx[1] ||
+                             idx == daughter_idx[2] || idx == daughter_idx[3];
+    const bool charged = charged_hadron_mask[j] && !is_daughter;
+    const bool neutral = neutral_hadron_mask[j];
+    const bool photon = photon_mask[j];
+    if (!charged && !neutral && !photon) {
+      continue;
+    }
+    const bool from_pv = fromPV_mask[j];
+    const double eta = pfcand_eta[j];
+    const double phi = pfcand_phi[j];
+    const float pt = pfcand_pt[j];
+    for (int i = 0; i < ndaughters; i++) {
+      const double deta = eta - daughter_eta[i];
+      const double dphi = DeltaPhi(daughter_phi[i], phi);
+      if (deta * deta + dphi * dphi >= cone2) {
+        continue;
+      }
+      if (charged && from_pv) {
+        sums.charged_hadron_from_pv[i] += pt;
+      }
+      if (charged && !from_pv) {
+        sums.charged_hadron_not_from_pv[i] += pt;
+      }
+      if (neutral) {
+        sums.neutral_hadron[i] += pt;
+      }
+      if (photon) {
+        sums.photon[i] += pt;
+      }
+    }
+  }
+  return sums;
+}
+
+/**
+ * @brief Fill the isolation cone sums of the four daughters, using the η-φ grid
+ *
+ * Same result as FillConeSums, but for each daughter only the PF candidates in the
+ * neighbouring grid cells are considered. They are added in PF candidate order, so the
+ * float sums are identical to the ones of the full pass.
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_eta PF candidate pseudorapidities
+ * @param pfcand_phi PF candidate azimuthal angles
+ * @param daughters Indices of the four daughters in the PF candidate collection
+ * @param charged_hadron_mask Charged hadron mask
+ * @param neutral_hadron_mask Neutral hadron mask
+ * @param photon_mask Photon mask
+ * @param fromPV_mask Primary vertex association mask
+ * @param cone Isolation cone size in ΔR
+ * @param grid η-φ grid of all PF candidates, with a cell size of at least cone
+ *
+ * @return ConeSums pT sums per category and daughter
+ *
+ * @note All daughter indices have to be valid PF candidate indices
+ */
+inline ConeSums FillConeSums(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta,
+                             const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<int> &daughters,
+                             const ROOT::RVec<int> &charged_hadron_mask, const ROOT::RVec<int> &neutral_hadron_mask,
+                             const ROOT::RVec<int> &photon_mask, const ROOT::RVec<int> &fromPV_mask,
+                             const double cone, const EtaPhiGrid &grid) {
+  ConeSums sums;
+  const double cone2 = cone * cone;
+  std::vector<int> neighbours;
+  for (int i = 0; i < ndaughters; i++) {
+    const double daughter_eta = pfcand_eta[daughters[i]];
+    const double daughter_phi = pfcand_phi[daughters[i]];
+    neighbours.clear();
+    grid.ForEachCandidate(daughter_eta, daughter_phi, cone, [&neighbours](const int j) { neighbours.push_back(j); });
+    std::sort(neighbours.begin(), neighbours.end());
+    for (const int j : neighbours) {
+      const bool is_daughter = j == daughters[0] || j == daughters[1] || j == daughters[2] || j == daughters[3];
+      const bool charged = charged_hadron_mask[j] && !is_daughter;
+      const bool neutral = neutral_hadron_mask[j];
+      const bool photon = photon_mask[j];
+      if (!charged && !neutral && !photon) {
+        continue;
+      }
+      const double deta = static_cast<double>(pfcand_eta[j]) - daughter_eta;
+      const double dphi = DeltaPhi(daughter_phi, pfcand_phi[j]);
+      if (deta * deta + dphi * dphi >= cone2) {
+        continue;
+      }
+      const bool from_pv = fromPV_mask[j];
+      const float pt = pfcand_pt[j];
+      if (charged && from_pv) {
+        sums.charged_hadron_from_pv[i] += pt;
+      }
+      if (charged && !from_pv) {
+        sums.charged_hadron_not_from_pv[i] += pt;
+      }
+      if (neutral) {
+        sums.neutral_hadron[i] += pt;
+      }
+      if (photon) {
+        sums.photon[i] += pt;
+      }
+    }
+  }
+  return sums;
+}
+
+/**
+ * @brief Fill the isolation cone sums for several working points in one pass over the PF candidates
+ *
+ * Working point w has the four daughters daughters[4w] to daughters[4w+3] and the cone size
+ * cones[w]. The working points usually share most of their daughters, so the squared ΔR of
+ * every PF candidate is computed once per distinct daughter and looked up by the working
+ * points. PF candidates outside the η band spanned by the daughters and the widest cone are
+ * skipped before any ΔR is computed.
+ * The sums of each working point are the ones FillConeSums gives for its daughters and cone.
+ *
+ * @param pfcand_pt PF candidate transverse momenta
+ * @param pfcand_eta PF candidate pseudorapidities
+ * @param pfcand_phi PF candidate azimuthal angles
+ * @param daughters Indices of the four daughters of each working point, one after the other
+ * @param charged_hadron_mask Charged hadron mask
+ * @param neutral_hadron_mask Neutral hadron mask
+ * @param photon_mask Photon mask
+ * @param fromPV_mask Primary vertex association mask
+ * @param cones Isolation cone size in ΔR of each working point
+ *
+ * @return std::vector<ConeSums> pT sums per working point
+ *
+ * @note Working points with an invalid daughter index get empty sums
+ */
+inline std::vector<ConeSums> FillConeSumsScan(const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta,
+                                              const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<int> &daughters,
+                                              const ROOT::RVec<int> &charged_hadron_mask, const ROOT::RVec<int> &neutral_hadron_mask,
+                                              const ROOT::RVec<int> &photon_mask, const ROOT::RVec<int> &fromPV_mask,
+                                              const std::vector<float> &cones) {
+  const std::size_t nwp = cones.size();
+  std::vector<ConeSums> sums(nwp);
+
+  // distinct daughters of all valid working points, and the slot of each daughter of a working point
+  std::vector<int> distinct_idx;
+  std::vector<double> distinct_eta;
+  std::vector<double> distinct_phi;
+  std::vector<std::size_t> wps;
+  std::vector<std::array<int, ndaughters>> wp_idx;
+  std::vector<std::array<int, ndaughters>> wp_slot;
+  std::vector<double> wp_cone2;
+  double widest_cone = 0;
+  const int npfcands = pfcand_pt.size();
+  for (std::size_t w = 0; w < nwp && ndaughters * w + 3 < daughters.size(); w++) {
+    std::array<int, ndaughters> idx;
+    bool valid = true;
+    for (int i = 0; i < ndaughters; i++) {
+      idx[i] = daughters[ndaughters * w + i];
+      valid = valid && idx[i] >= 0 && idx[i] < npfcands;
+    }
+    if (!valid) {
+      continue;
+    }
+    std::array<int, ndaughters> slot;
+    for (int i = 0; i < ndaughters; i++) {
+      const auto it = std::find(distinct_idx.begin(), distinct_idx.end(), idx[i]);
+      slot[i] = it - distinct_idx.begin();
+      if (it == distinct_idx.end()) {
+        distinct_idx.push_back(idx[i]);
+        distinct_eta.push_back(pfcand_eta[idx[i]]);
+        distinct_phi.push_back(pfcand_phi[idx[i]]);
+      }
+    }
+    const double cone = cones[w];
+    wps.push_back(w);
+    wp_idx.push_back(idx);
+    wp_slot.push_back(slot);
+    wp_cone2.push_back(cone * cone);
+    widest_cone = std::max(widest_cone, cone);
+  }
+  if (wps.empty()) {
+    return sums;
+  }
+
+  // η band around all daughters, candidates outside of it are in none of the cones (with a
+  // margin against rounding)
+  const double widest_cone2 = widest_cone * widest_cone;
+  const double min_eta = *std::min_element(distinct_eta.begin(), distinct_eta.end()) - widest_cone - 1e-6;
+  const double max_eta = *std::max_element(distinct_eta.begin(), distinct_eta.end()) + widest_cone + 1e-6;
+  std::vector<double> deltaR2(distinct_idx.size());
+  for (int j = 0; j < npfcands; j++) {
+    const bool charged_hadron = charged_hadron_mask[j];
+    const bool neutral = neutral_hadron_mask[j];
+    const bool photon = photon_mask[j];
+    if (!charged_hadron && !neutral && !photon) {
+      continue;
+    }
+    const double eta = pfcand_eta[j];
+    if (eta <= min_eta || eta >= max_eta) {
+      continue;
+    }
+    const double phi = pfcand_phi[j];
+    bool close = false;
+    for (std::size_t d = 0; d < distinct_idx.size(); d++) {
+      const double deta = eta - distinct_eta[d];
+      const double dphi = DeltaPhi(distinct_phi[d], phi);
+      deltaR2[d] = deta * deta + dphi * dphi;
+      close = close || deltaR2[d] < widest_cone2;
+    }
+    if (!close) {
+      continue;
+    }
+    const bool from_pv = fromPV_mask[j];
+    const float pt = pfcand_pt[j];
+    for (std::size_t k = 0; k < wps.size(); k++) {
+      const auto &idx = wp_idx[k];
+      const bool is_daughter = j == idx[0] || j == idx[1] || j == idx[2] || j == idx[3];
+      const bool charged = charged_hadron && !is_daughter;
+      if (!charged && !neutral && !photon) {
+        continue;
+      }
+      auto &wp_sums = sums[wps[k]];
+      for (int i = 0; i < ndaughters; i++) {
+        if (deltaR2[wp_slot[k][i]] >= wp_cone2[k]) {
+          continue;
+        }
+        if (charged && from_pv) {
+          wp_sums.charged_hadron_from_pv[i] += pt;
+        }
+        if (charged && !from_pv) {
+          wp_sums.charged_hadron_not_from_pv[i] += pt;
+        }
+        if (neutral) {
+          wp_sums.neutral_hadron[i] += pt;
+        }
+        if (photon) {
+          wp_sums.photon[i] += pt;
+        }
+      }
+    }
+  }
+  return sums;
+}
+
+/**
+ * @brief Δβ-corrected relative isolation of one daughter
+ *
+ * iso = (charged from PV + max(0, neutral + photon - Δβ factor * charged not from PV)) / pT
+ *
+ * @param sums Cone sums as returned by FillConeSums
+ * @param daughter Position of the daughter (0-3)
+ * @param daughter_pt Transverse momentum of the daughter
+ * @param deltabeta_factor Factor applied to the pileup charged hadron sum
+ *
+ * @return float Relative isolation
+ */
+inline float RelativeIsolation(const ConeSums &sums, const int daughter, const double daughter_pt,
+                               const double deltabeta_factor) {
+  return (sums.charged_hadron_from_pv[daughter] +
+          std::max(0.0, sums.neutral_hadron[daughter] + sums.photon[daughter] -
+                            deltabeta_factor * sums.charged_hadron_not_from_pv[daughter])) /
+         daughter_pt;
+}
+
+} // namespace iso
+
+namespace gen {
+
+/// PDG ID of the pseudoscalar in the signal samples
+constexpr int pseudoscalar_pdgid = 9000006;
+/// PDG ID of the Higgs boson
+constexpr int higgs_pdgid = 25;
+
+/**
+ * @brief Per-event index of the generator particle decay tree
+ *
+ * Built once per event from the pdgId and mother index columns, so that the truth
+ * producers query it instead of walking the generator particles themselves. The children
+ * are stored in compressed form: the children of particle i are
+ * children[child_start[i]] ... children[child_start[i+1] - 1], in ascending index order.
+ * The particles of each pdgId are found through a small open addressing hash table and are
+ * chained in ascending index order. Mother indices outside the collection (-1 for the
+ * initial particles) are stored as -1, such particles are nobody's child.
+ */
+struct DecayTree {
+  /// mother index of each particle, -1 if there is none
+  ROOT::RVec<int> mother;
+  /// pdgId of each particle
+  ROOT::RVec<int> pdgid;
+  ROOT::RVec<int> child_start;
+  ROOT::RVec<int> children;
+  /// hash table slots: pdgId and first particle with this pdgId, -1 for an empty slot
+  ROOT::RVec<int> slot_pdgid;
+  ROOT::RVec<int> slot_first;
+  /// next particle with the same pdgId, -1 for the last one
+  ROOT::RVec<int> next_same_pdgid;
+
+  /// Range of consecutive particle indices, iterable with range-based for
+  struct Range {
+    const int *first;
+    const int *last;
+    const int *begin() const { return first; }
+    const int *end() const { return last; }
+    std::size_t size() const { return last - first; }
+  };
+
+  /// Chain of the particles with the same pdgId, iterable with range-based for
+  struct Chain {
+    struct iterator {
+      const int *next;
+      int idx;
+      int operator*() const { return idx; }
+      iterator &operator++() {
+        idx = next[idx];
+        return *this;
+      }
+      bool operator!=(const iterator &other) const { return idx != other.idx; }
+    };
+    const int *next;
+    int first;
+    iterator begin() const { return {next, first}; }
+    iterator end() const { return {next, -1}; }
+  };
+
+  /// Hash table slot of a pdgId: the slot holding it or the empty slot where it would be
+  int Slot(const int id) const {
+    const unsigned int mask = slot_pdgid.size() - 1;
+    unsigned int slot = (static_cast<unsigned int>(id) * 2654435761u) & mask;
+    while (slot_first[slot] >= 0 && slot_pdgid[slot] != id) {
+      slot = (slot + 1) & mask;
+    }
+    return slot;
+  }
+
+  /**
+   * @brief Children of a particle
+   *
+   * @param idx Particle index
+   *
+   * @return Range children in ascending index order, empty for an invalid index
+   */
+  Range Children(const int idx) const {
+    if (idx < 0 || idx >= static_cast<int>(mother.size())) {
+      return {children.data(), children.data()};
+    }
+    return {children.data() + child_start[idx], children.data() + child_start[idx + 1]};
+  }
+
+  /**
+   * @brief All particles with a given pdgId
+   *
+   * @param id pdgId, the sign is taken into account
+   *
+   * @return Chain particle indices in ascending order
+   */
+  Chain Particles(const int id) const {
+    return {next_same_pdgid.data(), slot_first[Slot(id)]};
+  }
+};
+
+/**
+ * @brief Build the decay tree index of one event
+ *
+ * One pass counts the children of each particle and fills the pdgId table, a second one
+ * places the children, so the children end up in ascending index order without sorting.
+ *
+ * @param genpart_pdgid Generator particle PDG IDs
+ * @param genpart_motheridx Generator particle mother indices
+ *
+ * @return DecayTree decay tree index of the event
+ */
+inline DecayTree BuildDecayTree(const ROOT::RVec<int> &genpart_pdgid, const ROOT::RVec<int> &genpart_motheridx) {
+  DecayTree tree;
+  const int n = genpart_pdgid.size();
+  tree.pdgid = genpart_pdgid;
+  tree.mother.resize(n);
+  // counts are shifted by two entries, placing the children below then shifts the
+  // offsets back by one, so that child_start[i] is the first child of particle i
+  tree.child_start.assign(n + 2, 0);
+  for (int i = 0; i < n; i++) {
+    const int mother = genpart_motheridx[i];
+    tree.mother[i] = (mother >= 0 && mother < n) ? mother : -1;
+    if (tree.mother[i] >= 0) {
+      tree.child_start[tree.mother[i] + 2]++;
+    }
+  }
+  for (int i = 2; i < n + 2; i++) {
+    tree.child_start[i] += tree.child_start[i - 1];
+  }
+  tree.children.resize(tree.child_start[n + 1]);
+  for (int i = 0; i < n; i++) {
+    if (tree.mother[i] >= 0) {
+      tree.children[tree.child_start[tree.mother[i] + 1]++] = i;
+    }
+  }
+  tree.child_start.pop_back();
+
+  // at most half of the slots are used
+  int nslots = 16;
+  while (nslots < 2 * n) {
+    nslots *= 2;
+  }
+  tree.slot_pdgid.assign(nslots, 0);
+  tree.slot_first.assign(nslots, -1);
+  tree.next_same_pdgid.resize(n);
+  // backwards, so that the chains are in ascending index order
+  for (int i = n - 1; i >= 0; i--) {
+    const int slot = tree.Slot(genpart_pdgid[i]);
+    tree.slot_pdgid[slot] = genpart_pdgid[i];
+    tree.next_same_pdgid[i] = tree.slot_first[slot];
+    tree.slot_first[slot] = i;
+  }
+  return tree;
+}
+
+/**
+ * @brief Truth Higgs daughters: the charged children of the pseudoscalars
+ *
+ * The two hardest children with positive and with negative pdgId are kept (see
+ * HardestByPt), the daughters are returned in the order {pos[0], neg[0], pos[1], neg[1]}.
+ *
+ * @param tree Decay tree index of the event
+ * @param genpart_pt Generator particle transverse momenta
+ *
+ * @return ROOT::RVec<int> the four daughter indices, all -1 if there are fewer than two of each sign
+ */
+inline ROOT::RVec<int> TruthDaughters(const DecayTree &tree, const ROOT::RVec<float> &genpart_pt) {
+  std::vector<int> children;
+  for (const int id : {-pseudoscalar_pdgid, pseudoscalar_pdgid}) {
+    for (const int ps : tree.Particles(id)) {
+      const auto range = tree.Children(ps);
+      children.insert(children.end(), range.begin(), range.end());
+    }
+  }
+  std::sort(children.begin(), children.end());
+  HardestByPt<2> positive;
+  HardestByPt<2> negative;
+  for (const int idx : children) {
+    if (tree.pdgid[idx] > 0) {
+      positive.Insert(idx, genpart_pt[idx]);
+    } else if (tree.pdgid[idx] < 0) {
+      negative.Insert(idx, genpart_pt[idx]);
+    }
+  }
+  if (!positive.Full() || !negative.Full()) {
+    return {-1, -1, -1, -1};
+  }
+  return {positive.indices[0], negative.indices[0], positive.indices[1], negative.indices[1]};
+}
+
+/**
+ * @brief Check that the event has a complete H→aa→4 hadrons decay
+ *
+ * Same condition as TruthDaughters, without sorting: the pseudoscalars have at least two
+ * children with positive and two with negative pdgId.
+ *
+ * @param tree Decay tree index of the event
+ *
+ * @return bool true if TruthDaughters finds the four daughters
+ */
+inline bool HasCompleteDecay(const DecayTree &tree) {
+  int npositive = 0;
+  int nnegative = 0;
+  for (const int id : {-pseudoscalar_pdgid, pseudoscalar_pdgid}) {
+    for (const int ps : tree.Particles(id)) {
+      for (const int child : tree.Children(ps)) {
+        npositive += tree.pdgid[child] > 0;
+        nnegative += tree.pdgid[child] < 0;
+      }
+    }
+  }
+  return npositive >= 2 && nnegative >= 2;
+}
+
+/**
+ * @brief Truth Higgs boson: the Higgs with the highest child index
+ *
+ * In a chain of Higgs copies this is the last copy, i.e. the one that decays.
+ *
+ * @param tree Decay tree index of the event
+ *
+ * @return int index of the Higgs boson, -1 if there is none with children
+ */
+inline int TruthHiggs(const DecayTree &tree) {
+  int higgs = -1;
+  int last_child = -1;
+  for (const int h : tree.Particles(higgs_pdgid)) {
+    const auto children = tree.Children(h);
+    if (children.size() > 0 && *(children.end() - 1) > last_child) {
+      last_child = *(children.end() - 1);
+      higgs = h;
+    }
+  }
+  return higgs;
+}
+
+} // namespace gen
+
+namespace matching {
+
+/// The 24 assignments of the four reco daughters to the four truth daughters, entry i of
+/// an assignment is the truth daughter of reco daughter i
+constexpr std::array<std::array<int, 4>, 24> assignments = {{
+    {0, 1, 2, 3}, {0, 1, 3, 2}, {0, 2, 1, 3}, {0, 2, 3, 1}, {0, 3, 1, 2}, {0, 3, 2, 1},
+    {1, 0, 2, 3}, {1, 0, 3, 2}, {1, 2, 0, 3}, {1, 2, 3, 0}, {1, 3, 0, 2}, {1, 3, 2, 0},
+    {2, 0, 1, 3}, {2, 0, 3, 1}, {2, 1, 0, 3}, {2, 1, 3, 0}, {2, 3, 0, 1}, {2, 3, 1, 0},
+    {3, 0, 1, 2}, {3, 0, 2, 1}, {3, 1, 0, 2}, {3, 1, 2, 0}, {3, 2, 0, 1}, {3, 2, 1, 0},
+}};
+
+/// Result of the reco-to-truth matching of the four daughters
+struct DaughterMatch {
+  /// truth daughter (0-3) matched to each reco daughter
+  std::array<int, 4> truth;
+  /// ΔR between each reco daughter and its truth daughter
+  std::array<float, 4> deltaR;
+};
+
+/**
+ * @brief Optimal one-to-one ΔR matching of four reco daughters to four truth daughters
+ *
+ * All 24 assignments are scored with the sum of the four ΔR, the smallest sum wins. The
+ * 16 ΔR values are computed once, the assignments are scanned without data dependent
+ * branches. For equal sums the first assignment in lexicographic order is kept.
+ *
+ * @param reco_eta Pseudorapidities of the reco daughters
+ * @param reco_phi Azimuthal angles of the reco daughters
+ * @param truth_eta Pseudorapidities of the truth daughters
+ * @param truth_phi Azimuthal angles of the truth daughters
+ *
+ * @return DaughterMatch assignment with the smallest ΔR sum
+ */
+inline DaughterMatch BestMatch(const std::array<double, 4> &reco_eta, const std::array<double, 4> &reco_phi,
+                               const std::array<double, 4> &truth_eta, const std::array<double, 4> &truth_phi) {
+  std::array<std::array<double, 4>, 4> deltaR;
+  for (int i = 0; i < 4; i++) {
+    for (int j = 0; j < 4; j++) {
+      const double deta = reco_eta[i] - truth_eta[j];
+      const double dphi = DeltaPhi(reco_phi[i], truth_phi[j]);
+      deltaR[i][j] = std::sqrt(deta * deta + dphi * dphi);
+    }
+  }
+  int best = 0;
+  double best_sum = std::numeric_limits<double>::max();
+  for (int k = 0; k < 24; k++) {
+    const auto &a = assignments[k];
+    const double sum = deltaR[0][a[0]] + deltaR[1][a[1]] + deltaR[2][a[2]] + deltaR[3][a[3]];
+    const bool better = sum < best_sum;
+    best = better ? k : best;
+    best_sum = better ? sum : best_sum;
+  }
+  DaughterMatch match;
+  match.truth = assignments[best];
+  for (int i = 0; i < 4; i++) {
+    match.deltaR[i] = deltaR[i][match.truth[i]];
+  }
+  return match;
+}
+
+} // namespace matching
+} // namespace haa
+
+#endif /* GUARD_HAA_KERNELS_H */
@@ -0,0 +1,69 @@
+#ifndef GUARD_HAA_LOGGING_H
+#define GUARD_HAA_LOGGING_H
+
+#include <cstdlib>
+#include <sstream>
+#include <string>
+
+/// Debug logging for the per-event code in cpp_addons.
+///
+/// HAA_DEBUG(module, fmt, args...) replaces Logger::get(module)->debug(fmt, args...) inside
+/// the Define lambdas. By default it expands to an empty statement: neither the logger lookup
+/// nor the arguments are evaluated. Compiling with -DHAA_DEBUG_LOGGING turns the messages on
+/// for the modules listed in the environment variable HAA_DEBUG_MODULES (comma separated
+/// logger names, or "all"), e.g.
+///
+///   HAA_DEBUG_MODULES=VetoOverlappingJetsLooseLeptons,lorentzvectors ./analysis ...
+///
+/// The module list is read once per call site. The messages are still subject to the log
+/// level of the Logger.
+
+#ifdef HAA_DEBUG_LOGGING
+
+#include "../../../../include/utility/Logger.hxx"
+
+namespace haa {
+namespace logging {
+
+/**
+ * @brief Check whether debug logging is switched on for a module
+ *
+ * @param module Logger name of the module
+ *
+ * @return bool true if HAA_DEBUG_MODULES is "all" or contains the module
+ */
+inline bool ModuleEnabled(const std::string &module) {
+  const char *modules = std::getenv("HAA_DEBUG_MODULES");
+  if (modules == nullptr) {
+    return false;
+  }
+  std::stringstream stream(modules);
+  std::string name;
+  while (std::getline(stream, name, ',')) {
+    if (name == "all" || name == module) {
+      return true;
+    }
+  }
+  return false;
+}
+
+} // namespace logging
+} // namespace haa
+
+#define HAA_DEBUG(module, ...)                                                       \
+  do {                                                                               \
+    static const bool haa_debug_enabled = haa::logging::ModuleEnabled(module);       \
+    if (haa_debug_enabled) {                                                         \
+      Logger::get(module)->debug(__VA_ARGS__);                                       \
+    }                                                                                \
+  } while (0)
+
+#else
+
+#define HAA_DEBUG(module, ...) \
+  do {                         \
+  } while (0)
+
+#endif /* HAA_DEBUG_LOGGING */
+
+#endif /* GUARD_HAA_LOGGING_H */
@@ -0,0 +1,70 @@
+#ifndef GUARD_HAA_PARAMETERS_H
+#define GUARD_HAA_PARAMETERS_H
+
+#include "../../../../include/utility/Logger.hxx"
+#include <cstdlib>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+
+/// Runtime overrides of the haa:: algorithm parameters.
+///
+/// The parameters of the Higgs reconstruction (e.g. higgs_pair_max_deltaR,
+/// daughter_iso_cone) are set in the config and compiled into the executable through the
+/// {param} placeholders of the producers. For working point scans they can be overridden
+/// when the executable is run, without regenerating and recompiling, through the
+/// environment variable HAA_PARAMETERS (comma separated name=value pairs, names as in the
+/// config), e.g.
+///
+///   HAA_PARAMETERS=higgs_pair_max_deltaR=0.15,daughter_iso_cone=0.3 ./analysis ...
+///
+/// The overrides are applied once, when the RDataFrame graph is set up, so they cost
+/// nothing per event. Every override is logged.
+
+namespace haa {
+namespace parameters {
+
+/**
+ * @brief Value of a parameter, taking the runtime override into account
+ *
+ * @param name Name of the parameter, as in the config
+ * @param value Value from the config
+ *
+ * @return float Value from HAA_PARAMETERS if the parameter is listed there, the config value otherwise
+ *
+ * @note Throws std::invalid_argument if the override is not a number
+ */
+inline float Get(const std::string &name, const float value) {
+  const char *overrides = std::getenv("HAA_PARAMETERS");
+  if (overrides == nullptr) {
+    return value;
+  }
+  std::stringstream stream(overrides);
+  std::string entry;
+  while (std::getline(stream, entry, ',')) {
+    const auto separator = entry.find('=');
+    if (separator == std::string::npos || entry.substr(0, separator) != name) {
+      continue;
+    }
+    const std::string text = entry.substr(separator + 1);
+    std::size_t parsed = 0;
+    float override_value = 0;
+    try {
+      override_value = std::stof(text, &parsed);
+    } catch (const std::exception &) {
+      parsed = 0;
+    }
+    if (parsed == 0 || parsed != text.size()) {
+      Logger::get("haa::parameters")->error("Cannot read value '{}' of parameter {} in HAA_PARAMETERS", text, name);
+      throw std::invalid_argument("HAA_PARAMETERS: invalid value for " + name);
+    }
+    Logger::get("haa::parameters")->info("Overriding {} = {} with {} from HAA_PARAMETERS", name, value, override_value);
+    return override_value;
+  }
+  return value;
+}
+
+} // namespace parameters
+} // namespace haa
+
+#endif /* GUARD_HAA_PARAMETERS_H */
@@ -8,6 +8,7 @@
 #include "RooWorkspace.h"
 #include "TFile.h"
 #include "correction.h"
+#include <algorithm>
 
 namespace flags {
 /**
@@ -29,10 +30,11 @@ namespace flags {
  */
     ROOT::RDF::RNode flagMask(ROOT::RDF::RNode df, const std::string &flagname,
                                const std::string &maskname){
-                                using namespace ROOT::VecOps;
                                 return df.Define(
                                     flagname,
-                                    [](const ROOT::RVec<int> &mask) { return bool(Any(mask == 1)); },
+                                    [](const ROOT::RVec<int> &mask) {
+                                        return std::any_of(mask.begin(), mask.end(), [](const int value) { return value == 1; });
+                                    },
                                     {maskname}
                                 );
                                };
@@ -2,6 +2,8 @@
 #define GUARDCUSTOMJETS_H
 
 #include "../include/custom_jets.hxx"
+#include "../include/haa_kernels.hxx"
+#include "../include/haa_logging.hxx"
 #include "../../../../include/defaults.hxx"
 #include "../../../../include/utility/CorrectionManager.hxx"
 #include "../../../../include/utility/Logger.hxx"
@@ -13,7 +15,9 @@
 #include <Math/Vector3D.h>
 #include <Math/Vector4D.h>
 #include <Math/VectorUtil.h>
+#include <array>
 #include <cmath>
+#include <stdexcept>
 #include <typeinfo>
 
 /// Namespace for custom jet operations
@@ -58,39 +62,145 @@ VetoOverlappingJetsLooseLeptons(ROOT::RDF::RNode df, const std::string &output_c
 				   const ROOT::RVec<int> &loose_lepton_mask,
 				   const ROOT::RVec<float> &lepton_eta,
 				   const ROOT::RVec<float> &lepton_phi) {
-			 Logger::get("VetoOverlappingJetsLooseLeptons")->debug("Checking jets");
+			 HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Checking jets");
 			 ROOT::RVec<int> mask(jet_eta.size(), 1);
-			 const auto loose_leptons = ROOT::VecOps::Nonzero(loose_lepton_mask);
-			 if (loose_leptons.size() == 0) {
+			 if (!ROOT::VecOps::Any(loose_lepton_mask)) {
 			   return mask;
 			 }
-			 auto loose_lepton_eta = ROOT::VecOps::Take(lepton_eta, loose_leptons);
-			 auto loose_lepton_phi = ROOT::VecOps::Take(lepton_phi, loose_leptons);
 			 for (std::size_t idx = 0; idx < mask.size(); ++idx) {
 			   ROOT::Math::RhoEtaPhiVectorF jet(0, jet_eta.at(idx), jet_phi.at(idx));
-			   Logger::get("VetoOverlappingJetsLooseLeptons")
-			     ->debug("Jet:  Eta: {} Phi: {} ", jet.Eta(), jet.Phi());
-			   for (int i = 0; i < loose_lepton_eta.size(); i++) {
-			     ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, loose_lepton_eta.at(i), loose_lepton_phi.at(i));
-			     Logger::get("VetoOverlappingJetsLooseLeptons")
-			       ->debug("Loose letpon:  Eta: {} Phi: {}", loose_lepton.Eta(), loose_lepton.Phi());
+			   HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Jet:  Eta: {} Phi: {} ", jet.Eta(), jet.Phi());
+			   // loose leptons are read in place from the lepton columns
+			   for (std::size_t i = 0; i < loose_lepton_mask.size(); i++) {
+			     if (!loose_lepton_mask[i]) {
+			       continue;
+			     }
+			     ROOT::Math::RhoEtaPhiVectorF loose_lepton(0, lepton_eta.at(i), lepton_phi.at(i));
+			     HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "Loose letpon:  Eta: {} Phi: {}", loose_lepton.Eta(), loose_lepton.Phi());
 			     auto deltaR = ROOT::Math::VectorUtil::DeltaR(jet, loose_lepton);
-			     Logger::get("VetoOverlappingJetsLooseLeptons")
-			       ->debug("DeltaR: {}", deltaR);
+			     HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "DeltaR: {}", deltaR);
 			     if (deltaR < deltaRmin) {
 			       mask[idx] = 0;
 			       break;
 			     }
 			   }
 			 }
-			 Logger::get("VetoOverlappingJetsLooseLeptons")
-			 ->debug("vetomask due to overlap: {}", mask);
+			 HAA_DEBUG("VetoOverlappingJetsLooseLeptons", "vetomask due to overlap: {}", mask);
 			 return mask;
 		       },
 		       {jet_eta, jet_phi, loose_lepton_mask, lepton_eta, lepton_phi});
   return df1;
 }
 
+/**
+ * @brief Gather the (η, φ) positions of the selected objects of several collections
+ *
+ * The selected objects of all collections are collected into one short list, with one
+ * Define per collection. The list is meant to be compared to a large collection, e.g. the
+ * PF candidates, in a single pass with OverlapsAny.
+ *
+ * @param df Input RDataFrame node
+ * @param output_col Name of the output column containing the ObjectPositions
+ * @param collections Column names (mask, η, φ) of each collection
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the position list column
+ *
+ * @note The intermediate lists are stored in the columns <output_col>_<n>
+ * @note Throws std::invalid_argument if the columns are not (mask, η, φ) triplets
+ */
+ROOT::RDF::RNode
+GatherObjectPositions(ROOT::RDF::RNode df, const std::string &output_col,
+		      const std::vector<std::string> &collections) {
+  if (collections.empty() || collections.size() % 3 != 0) {
+    Logger::get("GatherObjectPositions")
+      ->error("Expected (mask, eta, phi) per collection, got {} columns", collections.size());
+    throw std::invalid_argument("GatherObjectPositions: wrong number of input columns");
+  }
+  auto add_positions = [](const ROOT::RVec<int> &mask, const ROOT::RVec<float> &eta,
+			  const ROOT::RVec<float> &phi, const ObjectPositions &previous) {
+    ObjectPositions all = previous;
+    for (std::size_t i = 0; i < mask.size(); i++) {
+      if (mask[i]) {
+	all.push_back({eta.at(i), phi.at(i)});
+      }
+    }
+    return all;
+  };
+  auto df1 = df;
+  std::string positions = "";
+  for (std::size_t first = 0; first < collections.size(); first += 3) {
+    const bool last = first + 3 == collections.size();
+    const std::string collection_positions = last ? output_col : output_col + "_" + std::to_string(first / 3);
+    if (positions.empty()) {
+      df1 = df1.Define(
+		       collection_positions,
+		       [add_positions](const ROOT::RVec<int> &mask, const ROOT::RVec<float> &eta,
+				       const ROOT::RVec<float> &phi) {
+			 return add_positions(mask, eta, phi, ObjectPositions());
+		       },
+		       {collections[first], collections[first + 1], collections[first + 2]});
+    } else {
+      df1 = df1.Define(collection_positions, add_positions,
+		       {collections[first], collections[first + 1], collections[first + 2], positions});
+    }
+    positions = collection_positions;
+  }
+  return df1;
+}
+
+/**
+ * @brief Veto objects that overlap with any of several object collections
+ *
+ * Generalisation of VetoOverlappingJetsLooseLeptons to an arbitrary number of collections,
+ * e.g. loose electrons, muons and photons. The selected objects of all collections are first
+ * gathered with GatherObjectPositions. The objects to be cleaned (typically the PF
+ * candidates) are then checked against this list in a single pass, comparing the squared ΔR
+ * to the squared cone size, and one combined mask is written. This replaces one veto mask
+ * per collection plus their combination with CombineMasks.
+ *
+ * @param df Input RDataFrame node
+ * @param output_col Name of the output column containing the combined veto mask
+ * @param inputs Column names: η and φ of the objects to be cleaned, followed by
+ * (mask, η, φ) of each collection to veto against
+ * @param deltaRmin Minimum ΔR distance below which objects are vetoed
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the combined veto mask column
+ *
+ * @note The output mask has value 1 for objects to keep, 0 for objects to veto
+ * @note The gathered positions are stored in the column <output_col>_vetoobjects
+ * @note Throws std::invalid_argument if the inputs are not η, φ and at least one (mask, η, φ) triplet
+ */
+ROOT::RDF::RNode
+VetoOverlappingObjects(ROOT::RDF::RNode df, const std::string &output_col,
+		       const std::vector<std::string> &inputs, const float &deltaRmin) {
+  if (inputs.size() < 5 || (inputs.size() - 2) % 3 != 0) {
+    Logger::get("VetoOverlappingObjects")
+      ->error("Expected eta, phi and (mask, eta, phi) per collection, got {} columns", inputs.size());
+    throw std::invalid_argument("VetoOverlappingObjects: wrong number of input columns");
+  }
+  const std::string positions = output_col + "_vetoobjects";
+  auto df1 = GatherObjectPositions(df, positions, std::vector<std::string>(inputs.begin() + 2, inputs.end()));
+
+  const double deltaR2min = double(deltaRmin) * double(deltaRmin);
+  return df1.Define(
+		    output_col,
+		    [deltaR2min](const ROOT::RVec<float> &obj_eta, const ROOT::RVec<float> &obj_phi,
+				 const ObjectPositions &veto_positions) {
+		      ROOT::RVec<int> mask(obj_eta.size(), 1);
+		      if (veto_positions.empty()) {
+			return mask;
+		      }
+		      for (std::size_t idx = 0; idx < mask.size(); ++idx) {
+			if (OverlapsAny(obj_eta[idx], obj_phi[idx], veto_positions, deltaR2min)) {
+			  mask[idx] = 0;
+			}
+		      }
+		      HAA_DEBUG("VetoOverlappingObjects", "vetomask due to overlap: {}", mask);
+		      return mask;
+		    },
+		    {inputs[0], inputs[1], positions});
+}
+
 }
 }
 #endif
\ No newline at end of file
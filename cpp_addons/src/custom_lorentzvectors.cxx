@@ -3,6 +3,8 @@
 
 #include "../../../../include/defaults.hxx"
 #include "../../../../include/utility/Logger.hxx"
+#include "../include/haa_logging.hxx"
+#include "../include/haa_parameters.hxx"
 #include "ROOT/RDataFrame.hxx"
 #include "ROOT/RVec.hxx"
 #include <Math/Vector4D.h>
@@ -15,7 +17,7 @@ namespace lorentzvector {
      * @brief Build a kaon four-momentum vector from a PF candidate with fixed kaon mass
      * 
      * This function constructs a Lorentz vector for a kaon by taking kinematic quantities
-     * (pt, eta, phi) from a PF candidate and assigning the PDG kaon mass (0.493677 GeV).
+     * (pt, eta, phi) from a PF candidate and assigning the kaon mass (PDG value 0.493677 GeV).
      * PF candidates are typically assigned the pion mass by default, so this function
      * corrects the mass assumption for kaon candidates.
      * 
@@ -23,46 +25,45 @@ namespace lorentzvector {
      * @param quantities Vector of column names containing: [pair indices, pts, etas, phis, masses]
      * @param outputname Name of the output column containing the kaon four-vector
      * @param position Index within the pair vector to identify which PF candidate to use
+     * @param kaon_mass Mass assigned to the kaon, can be overridden at runtime as kaon_mass (see haa_parameters.hxx)
      * 
      * @return ROOT::RDF::RNode Updated RDataFrame with the new kaon four-vector column
      * 
      * @note If the index is out of range, a dummy vector with default_float values is returned
-     * @note The kaon mass is hardcoded to 0.493677 GeV (PDG value)
      */
     ROOT::RDF::RNode buildKaon(ROOT::RDF::RNode df,
                                const std::vector<std::string> &quantities,
                                const std::string &outputname,
-                               const int &position) {
+                               const int &position,
+                               const float &kaon_mass) {
+    const float mass = haa::parameters::Get("kaon_mass", kaon_mass);
     auto df1 = df.Define(
         outputname,
-        [position, outputname](
+        [position, outputname, mass](
             const ROOT::RVec<int> &pair, const ROOT::RVec<float> &pts,
             const ROOT::RVec<float> &etas, const ROOT::RVec<float> &phis,
             const ROOT::RVec<float> &masses) {
             // the index of the particle is stored in the pair vector
             ROOT::Math::PtEtaPhiMVector p4;
-            Logger::get("lorentzvectors")
-                ->debug("starting to build 4vector {}!", outputname);
+            HAA_DEBUG("lorentzvectors", "starting to build 4vector {}!", outputname);
             try {
                 const int index = pair.at(position);
-                Logger::get("lorentzvectors")->debug("pair {}", pair);
-                Logger::get("lorentzvectors")->debug("pts {}", pts);
-                Logger::get("lorentzvectors")->debug("etas {}", etas);
-                Logger::get("lorentzvectors")->debug("phis {}", phis);
-                //Logger::get("lorentzvectors")->debug("masses {}", masses);
-                Logger::get("lorentzvectors")->debug("Index {}", index);
+                HAA_DEBUG("lorentzvectors", "pair {}", pair);
+                HAA_DEBUG("lorentzvectors", "pts {}", pts);
+                HAA_DEBUG("lorentzvectors", "etas {}", etas);
+                HAA_DEBUG("lorentzvectors", "phis {}", phis);
+                //HAA_DEBUG("lorentzvectors", "masses {}", masses);
+                HAA_DEBUG("lorentzvectors", "Index {}", index);
 
                 p4 = ROOT::Math::PtEtaPhiMVector(pts.at(index), etas.at(index),
                                                  phis.at(index),
-                                                 0.493677);
+                                                 mass);
             } catch (const std::out_of_range &e) {
                 p4 = ROOT::Math::PtEtaPhiMVector(default_float, default_float,
                                                  default_float, default_float);
-                Logger::get("lorentzvectors")
-                    ->debug("Index not found, retuning dummy vector !");
+                HAA_DEBUG("lorentzvectors", "Index not found, retuning dummy vector !");
             }
-            Logger::get("lorentzvectors")
-                ->debug("P4 - Particle {} : {}", position, p4);
+            HAA_DEBUG("lorentzvectors", "P4 - Particle {} : {}", position, p4);
             return p4;
         },
         quantities);
@@ -73,13 +74,14 @@ namespace lorentzvector {
      * 
      * This is a convenience wrapper around buildKaon() that constructs a Lorentz vector
      * from PF candidate kinematic quantities. It provides logging of the input quantities
-     * and delegates to buildKaon() for the actual four-vector construction with fixed
-     * kaon mass (0.493677 GeV).
+     * and delegates to buildKaon() for the actual four-vector construction with the
+     * kaon mass.
      * 
      * @param df Input RDataFrame node
      * @param obj_quantities Vector of column names containing: [pair indices, pts, etas, phis, masses]
      * @param pairindex Index within the pair vector to identify which PF candidate to use
      * @param obj_p4_name Name of the output column containing the four-vector
+     * @param kaon_mass Mass assigned to the PF candidate
      * 
      * @return ROOT::RDF::RNode Updated RDataFrame with the new four-vector column
      * 
@@ -88,12 +90,13 @@ namespace lorentzvector {
      */
     ROOT::RDF::RNode buildFromPFCand(ROOT::RDF::RNode df,
                        const std::vector<std::string> &obj_quantities,
-                       const int pairindex, const std::string &obj_p4_name) {
+                       const int pairindex, const std::string &obj_p4_name,
+                       const float &kaon_mass) {
     Logger::get("lorentzvector")->debug("Building {}", obj_p4_name);
     for (auto i : obj_quantities)
         Logger::get("lorentzvector")->debug("Used object quantities {}", i);
     return lorentzvector::buildKaon(df, obj_quantities, obj_p4_name,
-                                         pairindex);
+                                         pairindex, kaon_mass);
     } 
 }
 #endif /* GUARD_CUSTOM_LORENTZVECTOR_H */
\ No newline at end of file
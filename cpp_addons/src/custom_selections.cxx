@@ -0,0 +1,101 @@
+#ifndef GUARD_CUSTOM_SELECTIONS_H
+#define GUARD_CUSTOM_SELECTIONS_H
+
+#include "../include/custom_selections.hxx"
+#include "../include/custom_jets.hxx"
+#include "../include/haa_logging.hxx"
+#include "../../../../include/utility/Logger.hxx"
+#include "ROOT/RDataFrame.hxx"
+#include "ROOT/RVec.hxx"
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
+
+/// The fused selections apply the same comparisons as the individual cut producers they
+/// replace: CutMin (value >= cut), CutMax (value < cut), CutAbsMax (|value| < cut),
+/// CutQuantity (value in list) and AntiCutRawID (value < cut).
+namespace physicsobject {
+namespace pfcand {
+
+/**
+ * @brief Fused base selection of PF candidates
+ *
+ * Applies the cuts of BasePFCands in one pass over the PF candidates, ordered by cost:
+ * pdgId, pT, |η|, mass window and finally the ΔR veto against the loose objects. A candidate
+ * failing a cut is not evaluated further, so the ΔR veto, the only cut looping over other
+ * objects, only runs for candidates passing all kinematic cuts. Instead of one mask per cut
+ * combined with CombineMasks, a single mask and the list of selected indices are written.
+ *
+ * @param df Input RDataFrame node
+ * @param output_mask Name of the output column containing the selection mask
+ * @param output_indices Name of the output column containing the indices of the selected candidates
+ * @param inputs Column names: pdgId, pT, η, φ and mass of the PF candidates, followed by
+ * (mask, η, φ) of each collection to veto against
+ * @param pdgids Accepted pdgIds
+ * @param min_pt Minimum pT
+ * @param max_eta Maximum |η|
+ * @param min_mass Minimum mass
+ * @param max_mass Maximum mass
+ * @param deltaRmin Minimum ΔR to the loose objects
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the mask and index columns
+ *
+ * @note The selected indices are in ascending order, i.e. Nonzero of the mask
+ * @note The loose object positions are stored in the column <output_mask>_vetoobjects
+ * @note Throws std::invalid_argument if the inputs are not the five PF candidate columns
+ * and at least one (mask, η, φ) triplet
+ */
+ROOT::RDF::RNode FusedSelection(ROOT::RDF::RNode df, const std::string &output_mask,
+                                const std::string &output_indices,
+                                const std::vector<std::string> &inputs,
+                                const std::vector<int> &pdgids, const float &min_pt,
+                                const float &max_eta, const float &min_mass,
+                                const float &max_mass, const float &deltaRmin) {
+  if (inputs.size() < 8 || (inputs.size() - 5) % 3 != 0) {
+    Logger::get("PFCandFusedSelection")
+      ->error("Expected pdgId, pt, eta, phi, mass and (mask, eta, phi) per collection, got {} columns", inputs.size());
+    throw std::invalid_argument("pfcand::FusedSelection: wrong number of input columns");
+  }
+  const std::string positions = output_mask + "_vetoobjects";
+  auto df1 = jet::GatherObjectPositions(df, positions, std::vector<std::string>(inputs.begin() + 5, inputs.end()));
+
+  const double deltaR2min = double(deltaRmin) * double(deltaRmin);
+  auto selection = [pdgids, min_pt, max_eta, min_mass, max_mass, deltaR2min](
+		     const ROOT::RVec<int> &pdgid, const ROOT::RVec<float> &pt,
+		     const ROOT::RVec<float> &eta, const ROOT::RVec<float> &phi,
+		     const ROOT::RVec<float> &mass, const jet::ObjectPositions &veto_positions) {
+    ROOT::RVec<int> indices;
+    for (std::size_t i = 0; i < pt.size(); i++) {
+      if (std::find(pdgids.begin(), pdgids.end(), pdgid[i]) == pdgids.end()) {
+	continue;
+      }
+      if (pt[i] < min_pt || std::abs(eta[i]) >= max_eta) {
+	continue;
+      }
+      if (mass[i] < min_mass || mass[i] >= max_mass) {
+	continue;
+      }
+      if (jet::OverlapsAny(eta[i], phi[i], veto_positions, deltaR2min)) {
+	continue;
+      }
+      indices.push_back(i);
+    }
+    HAA_DEBUG("PFCandFusedSelection", "selected PF candidates: {}", indices);
+    return indices;
+  };
+  return df1.Define(output_indices, selection, {inputs[0], inputs[1], inputs[2], inputs[3], inputs[4], positions})
+    .Define(output_mask,
+	    [](const ROOT::RVec<int> &indices, const ROOT::RVec<float> &pt) {
+	      ROOT::RVec<int> mask(pt.size(), 0);
+	      for (const int idx : indices) {
+		mask[idx] = 1;
+	      }
+	      return mask;
+	    },
+	    {output_indices, inputs[1]});
+}
+
+} // namespace pfcand
+} // namespace physicsobject
+
+#endif /* GUARD_CUSTOM_SELECTIONS_H */
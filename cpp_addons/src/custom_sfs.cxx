@@ -1,71 +1,488 @@
 #ifndef GUARD_SCALEFACTORSEXT_H
 #define GUARD_SCALEFACTORSEXT_H
 
+#include "../include/custom_sfs.hxx"
+#include "../../../../include/utility/CorrectionManager.hxx"
 #include "../../../../include/utility/Logger.hxx"
+#include "../include/flat_corrections.hxx"
+#include "../include/haa_logging.hxx"
+#include "../include/haa_parameters.hxx"
 #include "../../../../include/utility/RooFunctorThreadsafe.hxx"
 #include "ROOT/RDataFrame.hxx"
 #include "RooFunctor.h"
 #include "RooWorkspace.h"
 #include "TFile.h"
 #include "correction.h"
+#include <array>
+#include <chrono>
+#include <cmath>
+#include <fstream>
+#include <memory>
+#include <stdexcept>
 
 namespace scalefactor {
+    /**
+     * @brief Define the nominal, up and down scale factor columns from a variations column
+     *
+     * The columns are projections of the variations column, so the corrections are
+     * evaluated only once per event for all three of them.
+     *
+     * @param df input dataframe
+     * @param variations name of the variations column (scalefactor::Variations)
+     * @param nom_output name of the nominal scale factor column
+     * @param output_up name of the scale factor column shifted up
+     * @param output_down name of the scale factor column shifted down
+     * @return a dataframe with the three scale factor columns
+     */
+    ROOT::RDF::RNode ProjectVariations(ROOT::RDF::RNode df, const std::string &variations,
+                         const std::string &nom_output, const std::string &output_up,
+                         const std::string &output_down){
+                            auto project = [](const int i){
+                                return [i](const Variations &sf){ return sf[i]; };
+                            };
+                            return df.Define(nom_output, project(nominal), {variations})
+                                     .Define(output_up, project(up), {variations})
+                                     .Define(output_down, project(down), {variations});
+    }
+
+    /**
+     * @brief Load the flattened lookup table of a correction and check it against correctionlib
+     *
+     * The table is read from flat_dir/<correction name>.flat, written by
+     * flatten_corrections.py. The values of the bins are taken from the correction at the
+     * bin centers, then the table is compared with the correction at the bin centers and
+     * lower edges, and below and above the binning of every axis, for all variations. The
+     * results have to be identical, otherwise the run is stopped.
+     *
+     * @param evaluator correction the table was flattened from
+     * @param flat_dir directory of the tables, empty to use correctionlib
+     * @param variations expected variations of the table, in this order
+     * @param narguments expected number of numeric inputs of the correction
+     * @return the table, nullptr if flat_dir is empty
+     */
+    std::shared_ptr<const haa::flat::Table> LoadFlatCorrection(const correction::Correction *evaluator,
+                         const std::string &flat_dir, const std::vector<std::string> &variations,
+                         const std::size_t narguments){
+                            if (flat_dir.empty()){
+                                return nullptr;
+                            }
+                            auto logger = Logger::get("flatCorrection");
+                            const std::string path = flat_dir + "/" + evaluator->name() + ".flat";
+                            std::ifstream file(path);
+                            if (!file){
+                                logger->error("Cannot open the flattened correction {}", path);
+                                throw std::runtime_error("Cannot open the flattened correction " + path);
+                            }
+                            auto table = std::make_shared<haa::flat::Table>(haa::flat::Read(file));
+                            const auto fail = [&logger, &path](const std::string &what){
+                                logger->error("{}: {}", path, what);
+                                throw std::runtime_error(path + ": " + what);
+                            };
+                            if (table->name != evaluator->name() || table->inputs.size() != evaluator->inputs().size()){
+                                fail("the inputs do not match the correction " + evaluator->name());
+                            }
+                            std::size_t ntable_arguments = 0;
+                            for (std::size_t i = 0; i < table->inputs.size(); i++){
+                                if (table->inputs[i].name != evaluator->inputs()[i].name()){
+                                    fail("input " + table->inputs[i].name + " does not match the correction");
+                                }
+                                ntable_arguments += table->inputs[i].role == haa::flat::Input::argument;
+                            }
+                            if (ntable_arguments != narguments || table->variations != variations){
+                                fail("the arguments or variations do not match the producer");
+                            }
+                            // correctionlib inputs at the given arguments for variation k
+                            std::vector<correction::Variable::Type> inputs(table->inputs.size());
+                            const auto set_inputs = [&table, &inputs, &variations](const std::vector<double> &arguments,
+                                                                                   const std::size_t k){
+                                std::size_t argument = 0;
+                                for (std::size_t i = 0; i < table->inputs.size(); i++){
+                                    const auto &input = table->inputs[i];
+                                    if (input.role == haa::flat::Input::argument){
+                                        if (input.type == "int"){
+                                            inputs[i] = static_cast<int>(arguments[argument++]);
+                                        } else {
+                                            inputs[i] = arguments[argument++];
+                                        }
+                                    } else if (input.role == haa::flat::Input::variation){
+                                        inputs[i] = variations[k];
+                                    } else if (input.type == "int"){
+                                        inputs[i] = std::stoi(input.value);
+                                    } else {
+                                        inputs[i] = input.value;
+                                    }
+                                }
+                            };
+                            // calls f(arguments) for all combinations of the points of the axes
+                            const auto for_each_point = [&table, narguments](const std::vector<std::vector<double>> &points,
+                                                                             const auto &f){
+                                std::vector<double> arguments(narguments, 0.);
+                                std::vector<std::size_t> point(table->axes.size(), 0);
+                                while (true){
+                                    for (std::size_t a = 0; a < table->axes.size(); a++){
+                                        arguments[table->axes[a].argument] = points[a][point[a]];
+                                    }
+                                    f(arguments);
+                                    std::size_t a = 0;
+                                    while (a < point.size() && ++point[a] == points[a].size()){
+                                        point[a++] = 0;
+                                    }
+                                    if (a == point.size()){
+                                        return;
+                                    }
+                                }
+                            };
+                            // The values are taken from correctionlib at the bin centers. The json parser
+                            // of correctionlib can round decimal numbers differently from the converter
+                            // in the last bit, so the values of the file only have to agree to 1e-12.
+                            std::vector<std::vector<double>> centers(table->axes.size());
+                            for (std::size_t a = 0; a < table->axes.size(); a++){
+                                for (int i = 0; i < table->axes[a].n; i++){
+                                    centers[a].push_back(table->axes[a].Center(i));
+                                }
+                            }
+                            for_each_point(centers, [&](const std::vector<double> &arguments){
+                                double flow_value = 0;
+                                const long position = table->Find(arguments.data(), flow_value);
+                                for (std::size_t k = 0; k < variations.size(); k++){
+                                    set_inputs(arguments, k);
+                                    const double expected = evaluator->evaluate(inputs);
+                                    if (std::abs(table->values[position + k] - expected) > 1e-12 * std::max(1., std::abs(expected))){
+                                        fail("differs from correctionlib (" + std::to_string(table->values[position + k])
+                                             + " instead of " + std::to_string(expected) + ")");
+                                    }
+                                    table->values[position + k] = expected;
+                                }
+                            });
+                            // identical results at the bin centers, the lower edges and both sides of each axis
+                            std::vector<std::vector<double>> points(table->axes.size());
+                            for (std::size_t a = 0; a < table->axes.size(); a++){
+                                const auto &axis = table->axes[a];
+                                for (int i = 0; i < axis.n; i++){
+                                    points[a].push_back(axis.Center(i));
+                                    points[a].push_back(axis.uniform ? axis.low + i * (axis.high - axis.low) / axis.n
+                                                                     : axis.edges[i]);
+                                }
+                                if (axis.flow != haa::flat::Flow::error){
+                                    points[a].push_back(axis.low - (axis.high - axis.low));
+                                    points[a].push_back(axis.high);
+                                    points[a].push_back(axis.high + (axis.high - axis.low));
+                                }
+                            }
+                            std::size_t nchecked = 0;
+                            for_each_point(points, [&](const std::vector<double> &arguments){
+                                for (std::size_t k = 0; k < variations.size(); k++){
+                                    set_inputs(arguments, k);
+                                    const double expected = evaluator->evaluate(inputs);
+                                    const double flattened = table->Evaluate(arguments.data(), k);
+                                    if (flattened != expected){
+                                        fail("differs from correctionlib (" + std::to_string(flattened) + " instead of "
+                                             + std::to_string(expected) + ")");
+                                    }
+                                    nchecked++;
+                                }
+                            });
+                            logger->debug("Loaded {}, identical to correctionlib in {} points", path, nchecked);
+                            return table;
+    }
+
     namespace electron {
-        ROOT::RDF::RNode trigger(ROOT::RDF::RNode df, const std::string &nom_trigger_output, 
+        /**
+         * @brief Electron trigger scale factor with its up and down shifts
+         *
+         * The nominal scale factor and its uncertainty are read from two correctionlib
+         * files. They are loaded through the correction manager of the executable, which
+         * parses each file only once and hands the same correction to every producer
+         * (e.g. the trigger scale factors of both electrons). Both corrections are evaluated
+         * once per event into the variations column, the up and down shifts are the nominal
+         * scale factor plus and minus the uncertainty.
+         *
+         * @param df input dataframe
+         * @param correctionManager correction manager of the executable
+         * @param variations_output name of the variations column (scalefactor::Variations)
+         * @param nom_trigger_output name of the nominal scale factor column
+         * @param trigger_output_up name of the scale factor column shifted up
+         * @param trigger_output_down name of the scale factor column shifted down
+         * @param pt name of the electron pt column
+         * @param eta name of the electron eta column
+         * @param nom_sf_file correctionlib file of the nominal scale factor
+         * @param nom_triggerAlgorithm name of the nominal scale factor correction
+         * @param syst_sf_file correctionlib file of the uncertainty
+         * @param syst_triggerAlgorithm name of the uncertainty correction
+         * @param flat_dir directory of the flattened lookup tables of the corrections
+         * (see LoadFlatCorrection), empty to evaluate them with correctionlib
+         * @return a dataframe with the variations and the three scale factor columns
+         */
+        ROOT::RDF::RNode trigger(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output,
+                         const std::string &nom_trigger_output, 
                          const std::string &trigger_output_up, const std::string &trigger_output_down, 
                          const std::string &pt, const std::string &eta, const std::string &nom_sf_file, 
                          const std::string &nom_triggerAlgorithm, const std::string &syst_sf_file, 
-                         const std::string &syst_triggerAlgorithm){
+                         const std::string &syst_triggerAlgorithm, const std::string &flat_dir){
                             Logger::get("electronTriggerSF")
                                 ->debug("Setting up functions for electron trigger sf");
-                            auto evaluator_nom = correction::CorrectionSet::from_file(nom_sf_file)->at(nom_triggerAlgorithm);
-                            auto evaluator_syst = correction::CorrectionSet::from_file(syst_sf_file)->at(syst_triggerAlgorithm);
+                            const auto start = std::chrono::steady_clock::now();
+                            auto evaluator_nom = correctionManager.loadCorrection(nom_sf_file, nom_triggerAlgorithm);
+                            auto evaluator_syst = correctionManager.loadCorrection(syst_sf_file, syst_triggerAlgorithm);
+                            auto table_nom = LoadFlatCorrection(evaluator_nom, flat_dir, {"-"}, 2);
+                            auto table_syst = LoadFlatCorrection(evaluator_syst, flat_dir, {"-"}, 2);
+                            Logger::get("electronTriggerSF")
+                                ->debug("Loaded {} and {} in {} ms", nom_triggerAlgorithm, syst_triggerAlgorithm,
+                                        std::chrono::duration<double, std::milli>(
+                                            std::chrono::steady_clock::now() - start).count());
                             auto df1 = df.Define(
-                                nom_trigger_output,
-                                [evaluator_nom](const float &pt,
-                                                const float &eta){
-                                                   double sf = 1;
-                                                    Logger::get("electronTriggerSF")
-                                                        ->debug("Electron - pt {}, eta {}", pt, eta);
-                                                    if (pt >= 0.0){
-                                                        sf = evaluator_nom->evaluate({eta, pt});
-                                                    }
-                                                    Logger::get("electronTriggerSF")->debug("Trigger - sf {}", sf);
-                                                    return sf;
-                                },
-                                {pt, eta}       
-                            );
-                            auto df2 = df1.Define(
-                                trigger_output_up,
-                                [evaluator_nom, evaluator_syst](const float &pt,
-                                                                const float &eta){
-                                                                    double sf = 1;
+                                variations_output,
+                                [evaluator_nom, evaluator_syst, table_nom, table_syst](const float &pt,
+                                                                                       const float &eta){
+                                                                    Variations sf = {1., 1., 1.};
+                                                                    HAA_DEBUG("electronTriggerSF", "Electron - pt {}, eta {}", pt, eta);
                                                                     if (pt >= 0.0){
-                                                                        sf = evaluator_nom->evaluate({eta, pt}) + 
-                                                                             evaluator_syst->evaluate({eta, pt});
+                                                                        const double arguments[2] = {eta, pt};
+                                                                        const double nom = table_nom ? table_nom->Evaluate(arguments)
+                                                                                                     : evaluator_nom->evaluate({eta, pt});
+                                                                        const double syst = table_syst ? table_syst->Evaluate(arguments)
+                                                                                                       : evaluator_syst->evaluate({eta, pt});
+                                                                        sf = {nom, nom + syst, nom - syst};
                                                                     }
-                                                                    Logger::get("electronTriggerSF")->debug("Trigger up - sf {}", sf);
+                                                                    HAA_DEBUG("electronTriggerSF", "Trigger - sf {}, up {}, down {}",
+                                                                              sf[nominal], sf[up], sf[down]);
                                                                     return sf;
                                 },
-                                {pt, eta}
+                                {pt, eta}       
                             );
-                            auto df3 = df2.Define(
-                                trigger_output_down,
-                                [evaluator_nom, evaluator_syst](const float &pt,
-                                                                const float &eta){
-                                                                    double sf = 1;
-                                                                    if (pt >= 0.0){
-                                                                        sf = evaluator_nom->evaluate({eta, pt}) - 
-                                                                             evaluator_syst->evaluate({eta, pt});
-                                                                    }
-                                                                    Logger::get("electronTriggerSF")->debug("Trigger down - sf {}", sf);
-                                                                    return sf;
+                            return ProjectVariations(df1, variations_output, nom_trigger_output,
+                                                     trigger_output_up, trigger_output_down);
+        }
+
+        /**
+         * @brief Electron ID scale factor with its up and down shifts
+         *
+         * Evaluates the nominal, up and down values of the EGM electron ID correction once
+         * per event into the variations column. Corrections that are binned in phi as well
+         * (six inputs) get the phi of the electron.
+         *
+         * @param df input dataframe
+         * @param correctionManager correction manager of the executable
+         * @param variations_output name of the variations column (scalefactor::Variations)
+         * @param nom_output name of the nominal scale factor column
+         * @param output_up name of the scale factor column shifted up
+         * @param output_down name of the scale factor column shifted down
+         * @param pt name of the electron pt column
+         * @param eta name of the electron eta column
+         * @param phi name of the electron phi column
+         * @param year_id year input of the correction
+         * @param wp working point of the ID
+         * @param sf_file correctionlib file of the electron scale factors
+         * @param sf_name name of the scale factor correction
+         * @param nom_variation name of the nominal value in the correction
+         * @param up_variation name of the up value in the correction
+         * @param down_variation name of the down value in the correction
+         * @return a dataframe with the variations and the three scale factor columns
+         */
+        ROOT::RDF::RNode id_variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &pt, const std::string &eta, const std::string &phi,
+                         const std::string &year_id, const std::string &wp,
+                         const std::string &sf_file, const std::string &sf_name,
+                         const std::string &nom_variation, const std::string &up_variation,
+                         const std::string &down_variation){
+                            Logger::get("electronIDSFVariations")
+                                ->debug("Setting up functions for electron id sf {}", sf_name);
+                            auto evaluator = correctionManager.loadCorrection(sf_file, sf_name);
+                            const bool binned_in_phi = evaluator->inputs().size() == 6;
+                            const std::array<std::string, 3> names = {nom_variation, up_variation, down_variation};
+                            auto df1 = df.Define(
+                                variations_output,
+                                [evaluator, binned_in_phi, names, year_id, wp](const float &pt,
+                                                                               const float &eta,
+                                                                               const float &phi){
+                                    Variations sf = {1., 1., 1.};
+                                    HAA_DEBUG("electronIDSFVariations", "Electron - pt {}, eta {}, phi {}", pt, eta, phi);
+                                    if (pt >= 0.0){
+                                        for (int i = 0; i < 3; i++){
+                                            sf[i] = binned_in_phi
+                                                ? evaluator->evaluate({year_id, names[i], wp, eta, pt, phi})
+                                                : evaluator->evaluate({year_id, names[i], wp, eta, pt});
+                                        }
+                                    }
+                                    HAA_DEBUG("electronIDSFVariations", "sf {}, up {}, down {}",
+                                              sf[nominal], sf[up], sf[down]);
+                                    return sf;
                                 },
-                                {pt, eta}
+                                {pt, eta, phi}
                             );
-                            return df3;
+                            return ProjectVariations(df1, variations_output, nom_output,
+                                                     output_up, output_down);
         }
     
     }
+    namespace muon {
+        /**
+         * @brief Muon scale factor with its up and down shifts
+         *
+         * Evaluates the "nominal", "systup" and "systdown" values of a muon POG
+         * correction (ID, isolation or trigger) once per event into the variations column.
+         * This replaces running the scale factor producer once per systematic shift.
+         *
+         * @param df input dataframe
+         * @param correctionManager correction manager of the executable
+         * @param variations_output name of the variations column (scalefactor::Variations)
+         * @param nom_output name of the nominal scale factor column
+         * @param output_up name of the scale factor column shifted up
+         * @param output_down name of the scale factor column shifted down
+         * @param pt name of the muon pt column
+         * @param eta name of the muon eta column
+         * @param sf_file correctionlib file of the muon scale factors
+         * @param sf_name name of the scale factor correction
+         * @param flat_dir directory of the flattened lookup tables of the corrections
+         * (see LoadFlatCorrection), empty to evaluate them with correctionlib
+         * @return a dataframe with the variations and the three scale factor columns
+         */
+        ROOT::RDF::RNode variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &pt, const std::string &eta,
+                         const std::string &sf_file, const std::string &sf_name,
+                         const std::string &flat_dir){
+                            Logger::get("muonSFVariations")
+                                ->debug("Setting up functions for muon sf {}", sf_name);
+                            auto evaluator = correctionManager.loadCorrection(sf_file, sf_name);
+                            auto table = LoadFlatCorrection(evaluator, flat_dir, {"nominal", "systup", "systdown"}, 2);
+                            auto df1 = df.Define(
+                                variations_output,
+                                [evaluator, table](const float &pt, const float &eta){
+                                    Variations sf = {1., 1., 1.};
+                                    HAA_DEBUG("muonSFVariations", "Muon - pt {}, eta {}", pt, eta);
+                                    if (pt >= 0.0){
+                                        const double abs_eta = std::abs(eta);
+                                        const double arguments[2] = {abs_eta, pt};
+                                        sf = table ? table->EvaluateAll<3>(arguments)
+                                            : Variations{evaluator->evaluate({abs_eta, pt, "nominal"}),
+                                                         evaluator->evaluate({abs_eta, pt, "systup"}),
+                                                         evaluator->evaluate({abs_eta, pt, "systdown"})};
+                                    }
+                                    HAA_DEBUG("muonSFVariations", "sf {}, up {}, down {}",
+                                              sf[nominal], sf[up], sf[down]);
+                                    return sf;
+                                },
+                                {pt, eta}
+                            );
+                            return ProjectVariations(df1, variations_output, nom_output,
+                                                     output_up, output_down);
+        }
+    }
+    namespace pileup {
+        /// Number of integer bins of the true number of interactions in the weight table
+        constexpr int ntable_bins = 200;
+
+        /// Nominal, up and down pileup weights of the correction, evaluated with correctionlib
+        inline Variations Evaluate(const correction::Correction *evaluator, const double true_pileup){
+            return {evaluator->evaluate({true_pileup, "nominal"}),
+                    evaluator->evaluate({true_pileup, "up"}),
+                    evaluator->evaluate({true_pileup, "down"})};
+        }
+
+        /**
+         * @brief Table of the pileup weights by integer true number of interactions
+         *
+         * The pileup corrections are binned in the true number of interactions with one bin
+         * per integer. Entry i of the table holds the weights of [i, i + 1), evaluated once at
+         * startup. To make sure the binning has this form, the weights are evaluated at five
+         * points of each interval, which have to give the same weights.
+         *
+         * @param evaluator pileup weight correction
+         * @return the table, nullptr if the correction is not binned in integers
+         */
+        std::shared_ptr<const std::vector<Variations>> WeightTable(const correction::Correction *evaluator){
+            auto table = std::make_shared<std::vector<Variations>>(ntable_bins);
+            for (int i = 0; i < ntable_bins; i++){
+                (*table)[i] = Evaluate(evaluator, i + 0.5);
+                for (const double x : {double(i), i + 0.25, i + 0.75, std::nextafter(i + 1., 0.)}){
+                    if (Evaluate(evaluator, x) != (*table)[i]){
+                        Logger::get("pileupVariations")
+                            ->warn("{} is not binned in integer numbers of interactions ({} in [{}, {})), "
+                                   "the weights are evaluated with correctionlib", evaluator->name(), x, i, i + 1);
+                        return nullptr;
+                    }
+                }
+            }
+            return table;
+        }
+
+        /**
+         * @brief Pileup weight with its up and down shifts
+         *
+         * The "nominal", "up" and "down" pileup weights of the LUM POG correction are
+         * tabulated by integer true number of interactions at startup (see WeightTable), so
+         * that the weights of an event are a single read from the table. Events outside of
+         * the table are evaluated with correctionlib.
+         *
+         * With validation (the validate parameter, or PU_reweighting_validation in
+         * HAA_PARAMETERS), the weights of every event are compared with correctionlib and the
+         * run is stopped if they differ.
+         *
+         * @param df input dataframe
+         * @param correctionManager correction manager of the executable
+         * @param variations_output name of the variations column (scalefactor::Variations)
+         * @param nom_output name of the nominal weight column
+         * @param output_up name of the weight column shifted up
+         * @param output_down name of the weight column shifted down
+         * @param true_pileup name of the column with the true number of interactions
+         * @param sf_file correctionlib file of the pileup weights
+         * @param sf_name name of the pileup weight correction
+         * @param flat_dir directory of the flattened lookup tables of the corrections
+         * (see LoadFlatCorrection), used instead of the table if not empty
+         * @param validate compare the weights of every event with correctionlib if not 0
+         * @return a dataframe with the variations and the three weight columns
+         */
+        ROOT::RDF::RNode variations(ROOT::RDF::RNode df,
+                         correctionManager::CorrectionManager &correctionManager,
+                         const std::string &variations_output, const std::string &nom_output,
+                         const std::string &output_up, const std::string &output_down,
+                         const std::string &true_pileup, const std::string &sf_file,
+                         const std::string &sf_name, const std::string &flat_dir,
+                         const int &validate){
+                            Logger::get("pileupVariations")
+                                ->debug("Setting up functions for pileup weights {}", sf_name);
+                            auto evaluator = correctionManager.loadCorrection(sf_file, sf_name);
+                            auto flat = LoadFlatCorrection(evaluator, flat_dir, {"nominal", "up", "down"}, 1);
+                            auto table = flat ? nullptr : WeightTable(evaluator);
+                            const bool validation = haa::parameters::Get("PU_reweighting_validation", validate) != 0;
+                            if (validation){
+                                Logger::get("pileupVariations")
+                                    ->info("Validating the pileup weights of every event against correctionlib");
+                            }
+                            auto df1 = df.Define(
+                                variations_output,
+                                [evaluator, flat, table, validation](const float &true_pileup){
+                                    const double arguments[1] = {true_pileup};
+                                    Variations weight;
+                                    if (flat){
+                                        weight = flat->EvaluateAll<3>(arguments);
+                                    } else if (table && true_pileup >= 0 && true_pileup < ntable_bins){
+                                        weight = (*table)[static_cast<int>(true_pileup)];
+                                    } else {
+                                        weight = Evaluate(evaluator, true_pileup);
+                                    }
+                                    if (validation && weight != Evaluate(evaluator, true_pileup)){
+                                        Logger::get("pileupVariations")
+                                            ->error("nTrueInt {}: weights differ from correctionlib", true_pileup);
+                                        throw std::runtime_error("pileup weights differ from correctionlib");
+                                    }
+                                    HAA_DEBUG("pileupVariations", "nTrueInt {} - weight {}, up {}, down {}",
+                                              true_pileup, weight[nominal], weight[up], weight[down]);
+                                    return weight;
+                                },
+                                {true_pileup}
+                            );
+                            return ProjectVariations(df1, variations_output, nom_output,
+                                                     output_up, output_down);
+        }
+    }
 }
 #endif // GUARD_SCALEFACTORSEXT_Hsrc
\ No newline at end of file
@@ -2,6 +2,10 @@
 #define GUARD_HAA_H
 
 #include "../include/haa.hxx"
+#include "../include/haa_kernels.hxx"
+#include "../include/haa_logging.hxx"
+#include "../include/haa_parameters.hxx"
+#include "../../../../include/defaults.hxx"
 #include "../../../../include/utility/Logger.hxx"
 #include "../../../../include/utility/utility.hxx"
 #include "ROOT/RDFHelpers.hxx"
@@ -17,22 +21,70 @@
 #include <vector>
 #include <iostream>
 #include <algorithm>
+#include <array>
+#include <stdexcept>
+#include <utility>
 
 /// Namespace for Higgs to pseudoscalar pair analysis functions
 
 namespace haa {
 
+/**
+ * @brief Build the per-event decay tree index of the generator particles
+ *
+ * The index (see gen::DecayTree) holds the children of each particle and the particles of
+ * each pdgId. It is meant to be produced once in the global scope and read by the truth
+ * producers (GetTrueDaughterP4s, GetTruthDaughterPairs), which then do not have to walk
+ * the generator particles themselves. Mother indices outside the collection are stored as -1.
+ *
+ * @param df Input RDataFrame node
+ * @param str_genpart_pdgid Column name for generator particle PDG IDs
+ * @param str_genpart_motheridx Column name for generator particle mother indices
+ * @param str_gen_decay_tree Output column name for the decay tree index
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the decay tree index column
+ */
+ROOT::RDF::RNode GetGenDecayTree(ROOT::RDF::RNode df, const std::string &str_genpart_pdgid, const std::string &str_genpart_motheridx,
+                                 const std::string &str_gen_decay_tree) {
+  auto tree = [](const ROOT::RVec<int> &genpart_pdgid, const ROOT::RVec<int> &genpart_motheridx) {
+    return gen::BuildDecayTree(genpart_pdgid, genpart_motheridx);
+  };
+  auto df1 = df.Define(str_gen_decay_tree, tree, {str_genpart_pdgid, str_genpart_motheridx});
+  return df1;
+}
+
+/**
+ * @brief Flag events with a complete H→aa→4 hadrons decay at generator level
+ *
+ * The flag is true if the pseudoscalars have at least two children with positive and two
+ * with negative pdgId (see gen::HasCompleteDecay), i.e. if GetTrueDaughterP4s finds the
+ * four truth daughters. Together with event::filter::Flags it drops incomplete signal
+ * events before the reconstruction, the dropped events are counted in the cutflow.
+ *
+ * @param df Input RDataFrame node
+ * @param str_gen_decay_tree Column name for the generator particle decay tree index (see GetGenDecayTree)
+ * @param str_gen_decay_complete Output column name for the flag
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the flag column
+ */
+ROOT::RDF::RNode GenDecayComplete(ROOT::RDF::RNode df, const std::string &str_gen_decay_tree, const std::string &str_gen_decay_complete) {
+  auto complete = [](const gen::DecayTree &tree) {
+    return gen::HasCompleteDecay(tree);
+  };
+  auto df1 = df.Define(str_gen_decay_complete, complete, {str_gen_decay_tree});
+  return df1;
+}
+
 /**
  * @brief Extract truth-level daughter particle four-momenta and Higgs boson four-momentum from generator information
  * 
  * This function identifies the four daughter particles from Higgs decay (via intermediate pseudoscalars)
- * by searching for particles with PDG ID 9000006 mothers. It sorts them by charge and pT, then constructs
- * their four-momentum vectors along with the Higgs boson four-momentum.
+ * as the children of the particles with PDG ID ±9000006 (see gen::TruthDaughters). It sorts them by charge
+ * and pT, then constructs their four-momentum vectors along with the Higgs boson four-momentum
+ * (see gen::TruthHiggs).
  * 
  * @param df Input RDataFrame node
- * @param str_ngenpart Column name for number of generator particles
- * @param str_genpart_pdgid Column name for generator particle PDG IDs
- * @param str_genpart_genpartidxmother Column name for generator particle mother indices
+ * @param str_gen_decay_tree Column name for the generator particle decay tree index (see GetGenDecayTree)
  * @param str_genpart_pt Column name for generator particle transverse momentum
  * @param str_genpart_eta Column name for generator particle pseudorapidity
  * @param str_genpart_phi Column name for generator particle azimuthal angle
@@ -47,85 +99,43 @@ namespace haa {
  * @return ROOT::RDF::RNode Updated RDataFrame with truth-level four-momentum columns
  * 
  * @note Daughters are sorted by pT within their charge group (positive/negative)
- * @note The function expects exactly 4 daughters (2 positive, 2 negative charge)
+ * @note The daughter indices are -1 and the four-momenta default_float if there are fewer than
+ *       2 positive and 2 negative daughters, the Higgs four-momentum if no decaying Higgs is found
  */
-ROOT::RDF::RNode GetTrueDaughterP4s(ROOT::RDF::RNode df, const std::string &str_ngenpart, const std::string &str_genpart_pdgid, 
-				    const std::string &str_genpart_genpartidxmother, const std::string &str_genpart_pt,
+ROOT::RDF::RNode GetTrueDaughterP4s(ROOT::RDF::RNode df, const std::string &str_gen_decay_tree, const std::string &str_genpart_pt,
 				    const std::string &str_genpart_eta, const std::string &str_genpart_phi,  
 				    const std::string &str_genpart_mass, const std::string &str_truedaughteridxs, const std::string &str_truth_d1_p4,
 				    const std::string &str_truth_d2_p4, const std::string &str_truth_d3_p4, const std::string &str_truth_d4_p4, const std::string &str_truth_h_p4) {
-  auto truth_didx = [](const unsigned int ngenpart, const ROOT::RVec<int> genpart_pdgid, const ROOT::RVec<int> genpart_genpartidxmother, const ROOT::RVec<float> genpart_pt) {
-    
-    ROOT::RVec<int> truedaughteridxs;
-    std::vector<int> truedaughteridxs_pos;
-    std::vector<int> truedaughteridxs_neg;
-    
-    int ndaughters = 0;
-
-    for (int i = 0; i < ngenpart; i++) {
-      if (std::abs(genpart_pdgid[genpart_genpartidxmother[i]]) == 9000006 && genpart_pdgid[i] > 0){
-      	truedaughteridxs_pos.push_back(i);
-        ndaughters++;
-      }
-      if (std::abs(genpart_pdgid[genpart_genpartidxmother[i]]) == 9000006 && genpart_pdgid[i] < 0) {
-      	truedaughteridxs_neg.push_back(i);
-        ndaughters++; 
-      }
-    }
-
-    std::sort(truedaughteridxs_pos.begin(),truedaughteridxs_pos.end(), [&genpart_pt](int a, int b) {
-	    return genpart_pt[a] > genpart_pt[b];
-      }
-      );
-
-    std::sort(truedaughteridxs_neg.begin(),truedaughteridxs_neg.end(), [&genpart_pt](int a, int b) {
-      return genpart_pt[a] > genpart_pt[b];
-      }
-      );
-
-    truedaughteridxs = {truedaughteridxs_pos[0], truedaughteridxs_neg[0], truedaughteridxs_pos[1], truedaughteridxs_neg[1]};
-
-    return truedaughteridxs;
+  auto truth_didx = [](const gen::DecayTree &tree, const ROOT::RVec<float> &genpart_pt) {
+    return gen::TruthDaughters(tree, genpart_pt);
   };
 
-  auto truth_d1_p4 = [](const ROOT::RVec<int> truedaughteridxs, const ROOT::RVec<float> genpart_pt, const ROOT::RVec<float> genpart_eta, 
-			const ROOT::RVec<float> genpart_phi, const ROOT::RVec<float> genpart_mass) {
-    return ROOT::Math::PtEtaPhiMVector(genpart_pt[truedaughteridxs[0]], genpart_eta[truedaughteridxs[0]], genpart_phi[truedaughteridxs[0]], genpart_mass[truedaughteridxs[0]]); 
-  };
-  
-  auto truth_d2_p4 = [](const ROOT::RVec<int> truedaughteridxs, const ROOT::RVec<float> genpart_pt, const ROOT::RVec<float> genpart_eta,
-			const ROOT::RVec<float> genpart_phi, const ROOT::RVec<float> genpart_mass) {
-    return ROOT::Math::PtEtaPhiMVector(genpart_pt[truedaughteridxs[1]], genpart_eta[truedaughteridxs[1]], genpart_phi[truedaughteridxs[1]], genpart_mass[truedaughteridxs[1]]);
+  auto p4 = [](const int idx, const ROOT::RVec<float> &genpart_pt, const ROOT::RVec<float> &genpart_eta,
+               const ROOT::RVec<float> &genpart_phi, const ROOT::RVec<float> &genpart_mass) {
+    if (idx < 0) {
+      return ROOT::Math::PtEtaPhiMVector(default_float, default_float, default_float, default_float);
+    }
+    return ROOT::Math::PtEtaPhiMVector(genpart_pt[idx], genpart_eta[idx], genpart_phi[idx], genpart_mass[idx]);
   };
-  
-  auto truth_d3_p4 = [](const ROOT::RVec<int> truedaughteridxs, const ROOT::RVec<float> genpart_pt, const ROOT::RVec<float> genpart_eta,
-			const ROOT::RVec<float> genpart_phi, const ROOT::RVec<float> genpart_mass) {
-    return ROOT::Math::PtEtaPhiMVector(genpart_pt[truedaughteridxs[2]], genpart_eta[truedaughteridxs[2]], genpart_phi[truedaughteridxs[2]], genpart_mass[truedaughteridxs[2]]);
+
+  auto truth_d_p4 = [p4](const int position) {
+    return [p4, position](const ROOT::RVec<int> &truedaughteridxs, const ROOT::RVec<float> &genpart_pt, const ROOT::RVec<float> &genpart_eta,
+                          const ROOT::RVec<float> &genpart_phi, const ROOT::RVec<float> &genpart_mass) {
+      return p4(truedaughteridxs[position], genpart_pt, genpart_eta, genpart_phi, genpart_mass);
+    };
   };
-  
-  auto truth_d4_p4 = [](const ROOT::RVec<int> truedaughteridxs, const ROOT::RVec<float> genpart_pt, const ROOT::RVec<float> genpart_eta,
-			const ROOT::RVec<float> genpart_phi, const ROOT::RVec<float> genpart_mass) {
-    return ROOT::Math::PtEtaPhiMVector(genpart_pt[truedaughteridxs[3]], genpart_eta[truedaughteridxs[3]], genpart_phi[truedaughteridxs[3]], genpart_mass[truedaughteridxs[3]]);
-  };
-
-  auto truth_h_p4 = [](const unsigned int ngenpart, const ROOT::RVec<int> genpart_pdgid, const ROOT::RVec<int> genpart_genpartidxmother, 
-		       const ROOT::RVec<float> genpart_pt, const ROOT::RVec<float> genpart_eta, const ROOT::RVec<float> genpart_phi, 
-		       const ROOT::RVec<float> genpart_mass) {
-    int thidx = 0;
-    for (int i = 0; i < ngenpart; i++) {
-      if (genpart_pdgid[genpart_genpartidxmother[i]] == 25) {
-	      thidx = genpart_genpartidxmother[i];
-      }
-    }
-    return ROOT::Math::PtEtaPhiMVector(genpart_pt[thidx], genpart_eta[thidx], genpart_phi[thidx], genpart_mass[thidx]);
+
+  auto truth_h_p4 = [p4](const gen::DecayTree &tree, const ROOT::RVec<float> &genpart_pt, const ROOT::RVec<float> &genpart_eta,
+                         const ROOT::RVec<float> &genpart_phi, const ROOT::RVec<float> &genpart_mass) {
+    return p4(gen::TruthHiggs(tree), genpart_pt, genpart_eta, genpart_phi, genpart_mass);
   };
 
-  auto df1 = df.Define(str_truedaughteridxs, truth_didx, {str_ngenpart, str_genpart_pdgid, str_genpart_genpartidxmother, str_genpart_pt});
-  auto df2 = df1.Define(str_truth_d1_p4, truth_d1_p4, {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
-  auto df3 = df2.Define(str_truth_d2_p4, truth_d2_p4, {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
-  auto df4 = df3.Define(str_truth_d3_p4, truth_d3_p4, {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
-  auto df5 = df4.Define(str_truth_d4_p4, truth_d4_p4, {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
-  auto df6 = df5.Define(str_truth_h_p4, truth_h_p4, {str_ngenpart, str_genpart_pdgid, str_genpart_genpartidxmother, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
+  auto df1 = df.Define(str_truedaughteridxs, truth_didx, {str_gen_decay_tree, str_genpart_pt});
+  auto df2 = df1.Define(str_truth_d1_p4, truth_d_p4(0), {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
+  auto df3 = df2.Define(str_truth_d2_p4, truth_d_p4(1), {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
+  auto df4 = df3.Define(str_truth_d3_p4, truth_d_p4(2), {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
+  auto df5 = df4.Define(str_truth_d4_p4, truth_d_p4(3), {str_truedaughteridxs, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
+  auto df6 = df5.Define(str_truth_h_p4, truth_h_p4, {str_gen_decay_tree, str_genpart_pt, str_genpart_eta, str_genpart_phi, str_genpart_mass});
   
   return df6;
   
@@ -140,23 +150,25 @@ ROOT::RDF::RNode GetTrueDaughterP4s(ROOT::RDF::RNode df, const std::string &str_
  * 
  * @param df Input RDataFrame node
  * @param str_truth_daughters Column name for truth daughter indices
- * @param str_genpart_pdgid Column name for generator particle PDG IDs
- * @param str_genpart_motheridx Column name for generator particle mother indices
+ * @param str_gen_decay_tree Column name for the generator particle decay tree index (see GetGenDecayTree)
  * @param str_truth_ps1 Output column name for first pseudoscalar daughter pair indices
  * @param str_truth_ps2 Output column name for second pseudoscalar daughter pair indices
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with truth-level daughter pair columns
  * 
- * @note Returns {-1, -1} if no valid pairing is found
+ * @note Returns {-1, -1} if no valid pairing is found, e.g. if the truth daughters are missing (-1)
  * @note Assumes daughters come in opposite-charge pairs from the same mother
  */
-ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &str_truth_daughters, const std::string &str_genpart_pdgid, const std::string &str_genpart_motheridx, 
+ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &str_truth_daughters, const std::string &str_gen_decay_tree,
                const std::string &str_truth_ps1, const std::string &str_truth_ps2) {
-  auto truth_ps1 = [](const ROOT::RVec<int> truth_daughters, const ROOT::RVec<int> genpart_pdgid, const ROOT::RVec<int> genpart_motheridx) {
+  auto truth_ps1 = [](const ROOT::RVec<int> &truth_daughters, const gen::DecayTree &tree) {
     ROOT::RVec<int> ps1 = {-1, -1};
     for (int i = 0; i < truth_daughters.size(); i++) {
+      if (truth_daughters[i] < 0 || tree.mother[truth_daughters[i]] < 0) {
+        continue;
+      }
       for (int j = i+1; j < truth_daughters.size(); j++) {
-        if (genpart_motheridx[truth_daughters[i]] == genpart_motheridx[truth_daughters[j]] && genpart_pdgid[truth_daughters[i]] != genpart_pdgid[truth_daughters[j]]) {
+        if (truth_daughters[j] >= 0 && tree.mother[truth_daughters[i]] == tree.mother[truth_daughters[j]] && tree.pdgid[truth_daughters[i]] != tree.pdgid[truth_daughters[j]]) {
           ps1 = {truth_daughters[i], truth_daughters[j]};
           return ps1;
         }
@@ -164,7 +176,7 @@ ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &s
     }
     return ps1;
   };
-  auto truth_ps2 = [](const ROOT::RVec<int> truth_daughters, const ROOT::RVec<int> truth_ps1) {
+  auto truth_ps2 = [](const ROOT::RVec<int> &truth_daughters, const ROOT::RVec<int> &truth_ps1) {
     ROOT::RVec<int> ps2 = {-1, -1};
     for (int i = 0; i < truth_daughters.size(); i++) {
       if (truth_daughters[i] != truth_ps1[0] && truth_daughters[i] != truth_ps1[1]) {
@@ -177,19 +189,193 @@ ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &s
     }
     return ps2;
   };
-  auto df1 = df.Define(str_truth_ps1, truth_ps1, {str_truth_daughters, str_genpart_pdgid, str_genpart_motheridx});
+  auto df1 = df.Define(str_truth_ps1, truth_ps1, {str_truth_daughters, str_gen_decay_tree});
   auto df2 = df1.Define(str_truth_ps2, truth_ps2, {str_truth_daughters, str_truth_ps1});
 
   return df2;
 }
 
 /**
- * @brief Select four PF candidates that form two opposite-charge pairs within ΔR < 0.1
- * 
+ * @brief Match the four reco daughters to the four truth daughters
+ *
+ * Solves the one-to-one ΔR assignment of the reco daughters to the truth daughters
+ * optimally, by scoring all 24 assignments with the sum of the four ΔR (see
+ * matching::BestMatch). This replaces the matching of the written out daughters after the
+ * event loop. Charges are not taken into account. The matching is done once per event
+ * into the match column (matching::DaughterMatch), the other three columns are
+ * projections of it.
+ *
+ * @param df Input RDataFrame node
+ * @param str_d1_p4 Column name for first reco daughter four-momentum
+ * @param str_d2_p4 Column name for second reco daughter four-momentum
+ * @param str_d3_p4 Column name for third reco daughter four-momentum
+ * @param str_d4_p4 Column name for fourth reco daughter four-momentum
+ * @param str_truth_d1_p4 Column name for first truth daughter four-momentum
+ * @param str_truth_d2_p4 Column name for second truth daughter four-momentum
+ * @param str_truth_d3_p4 Column name for third truth daughter four-momentum
+ * @param str_truth_d4_p4 Column name for fourth truth daughter four-momentum
+ * @param str_match Output column name for the matching (matching::DaughterMatch)
+ * @param str_match_indices Output column name for the truth daughter (0-3) matched to each reco daughter
+ * @param str_match_deltaR Output column name for the ΔR between each reco daughter and its truth daughter
+ * @param str_fully_matched Output column name for the flag that all four ΔR are below max_deltaR
+ * @param max_deltaR Maximum ΔR of a matched daughter
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the matching columns
+ *
+ * @note The indices are -1 and the ΔR default_float if a reco or truth daughter is missing
+ *       (non-positive pT)
+ */
+ROOT::RDF::RNode MatchDaughtersToTruth(ROOT::RDF::RNode df, const std::string &str_d1_p4, const std::string &str_d2_p4,
+                                       const std::string &str_d3_p4, const std::string &str_d4_p4, const std::string &str_truth_d1_p4,
+                                       const std::string &str_truth_d2_p4, const std::string &str_truth_d3_p4, const std::string &str_truth_d4_p4,
+                                       const std::string &str_match, const std::string &str_match_indices,
+                                       const std::string &str_match_deltaR, const std::string &str_fully_matched,
+                                       const float &max_deltaR) {
+  using LorentzVector = ROOT::Math::PtEtaPhiMVector;
+  auto match = [](const LorentzVector &d1_p4, const LorentzVector &d2_p4, const LorentzVector &d3_p4, const LorentzVector &d4_p4,
+                  const LorentzVector &truth_d1_p4, const LorentzVector &truth_d2_p4, const LorentzVector &truth_d3_p4,
+                  const LorentzVector &truth_d4_p4) {
+    const std::array<const LorentzVector *, 4> reco = {&d1_p4, &d2_p4, &d3_p4, &d4_p4};
+    const std::array<const LorentzVector *, 4> truth = {&truth_d1_p4, &truth_d2_p4, &truth_d3_p4, &truth_d4_p4};
+    std::array<double, 4> reco_eta, reco_phi, truth_eta, truth_phi;
+    for (int i = 0; i < 4; i++) {
+      if (reco[i]->pt() <= 0 || truth[i]->pt() <= 0) {
+        matching::DaughterMatch missing;
+        missing.truth.fill(-1);
+        missing.deltaR.fill(default_float);
+        return missing;
+      }
+      reco_eta[i] = reco[i]->eta();
+      reco_phi[i] = reco[i]->phi();
+      truth_eta[i] = truth[i]->eta();
+      truth_phi[i] = truth[i]->phi();
+    }
+    return matching::BestMatch(reco_eta, reco_phi, truth_eta, truth_phi);
+  };
+  auto indices = [](const matching::DaughterMatch &m) {
+    return ROOT::RVec<int>(m.truth.begin(), m.truth.end());
+  };
+  auto deltaR = [](const matching::DaughterMatch &m) {
+    return ROOT::RVec<float>(m.deltaR.begin(), m.deltaR.end());
+  };
+  auto fully_matched = [max_deltaR](const matching::DaughterMatch &m) {
+    if (m.truth[0] < 0) {
+      return false;
+    }
+    for (const auto dr : m.deltaR) {
+      if (!(dr < max_deltaR)) {
+        return false;
+      }
+    }
+    return true;
+  };
+  auto df1 = df.Define(str_match, match,
+                       {str_d1_p4, str_d2_p4, str_d3_p4, str_d4_p4, str_truth_d1_p4, str_truth_d2_p4, str_truth_d3_p4, str_truth_d4_p4});
+  auto df2 = df1.Define(str_match_indices, indices, {str_match});
+  auto df3 = df2.Define(str_match_deltaR, deltaR, {str_match});
+  auto df4 = df3.Define(str_fully_matched, fully_matched, {str_match});
+  return df4;
+}
+
+namespace quadruplets {
+
+/**
+ * @brief List all opposite-charge candidate pairs within a ΔR cone
+ *
+ * Pairs are returned as positions in the given candidate list with first < second,
+ * in lexicographic order.
+ *
+ * @param p4s Four-momenta of the candidates
+ * @param charges Charges of the candidates
+ * @param max_deltaR Maximum ΔR between the two candidates of a pair
+ *
+ * @return std::vector<std::pair<int, int>> Positions of the good pairs
+ */
+std::vector<std::pair<int, int>> FindGoodPairs(const ROOT::RVec<ROOT::Math::PtEtaPhiMVector> &p4s,
+                                               const ROOT::RVec<int> &charges, const double max_deltaR) {
+  std::vector<std::pair<int, int>> pairs;
+  const int n = p4s.size();
+  for (int i = 0; i < n; i++) {
+    for (int j = i+1; j < n; j++) {
+      float DeltaR = ROOT::Math::VectorUtil::DeltaR(p4s[i], p4s[j]);
+      if (DeltaR < max_deltaR && charges[i] != charges[j]) {
+        pairs.emplace_back(i, j);
+      }
+    }
+  }
+  return pairs;
+}
+
+} // namespace quadruplets
+
+/**
+ * @brief Build the per-event view of the selected PF candidates
+ *
+ * The view (see PFCandView) holds the selected indices in mask order, the four hardest
+ * candidates and the two hardest of each charge, collected in one pass without sorting, and
+ * the kinematics of the selected candidates (pT, η, φ, sin φ, cos φ, px, py, pz, E, charge). It is meant to be produced
+ * once in the global scope and read by the view overloads of the Higgs reconstruction
+ * algorithms, which then do not have to apply the mask, find the hardest candidates or
+ * build four-vectors again.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_pt Column name for PF candidate transverse momentum
+ * @param str_pfcand_eta Column name for PF candidate pseudorapidity
+ * @param str_pfcand_phi Column name for PF candidate azimuthal angle
+ * @param str_pfcand_mass Column name for PF candidate mass
+ * @param str_pfcand_charge Column name for PF candidate charge
+ * @param str_pfcand_mask Column name for PF candidate selection mask
+ * @param str_pfcand_view Output column name for the PF candidate view
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the PF candidate view column
+ */
+ROOT::RDF::RNode GetPFCandView(ROOT::RDF::RNode df, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi,
+                               const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, const std::string &str_pfcand_mask, const std::string &str_pfcand_view) {
+  auto view = [](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass,
+                 const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+    return BuildPFCandView(pfcand_pt, pfcand_eta, pfcand_phi, pfcand_mass, pfcand_charge, pfcand_mask);
+  };
+  auto df1 = df.Define(str_pfcand_view, view, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
+  return df1;
+}
+
+/**
+ * @brief Build the per-event η-φ grid of a collection
+ *
+ * The grid (see EtaPhiGrid) is a spatial index for ΔR < R queries. It is meant to be built
+ * once per event over all PF candidates and read by the grid overloads of pfCandIso and
+ * ClosestToHiggsMassAlgo. The cell size has to be at least the largest cone radius these
+ * consumers query.
+ *
+ * @param df Input RDataFrame node
+ * @param str_eta Column name for the pseudorapidities
+ * @param str_phi Column name for the azimuthal angles
+ * @param str_grid Output column name for the grid
+ * @param cell_size Minimum cell size in η and φ
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the grid column
+ */
+ROOT::RDF::RNode GetEtaPhiGrid(ROOT::RDF::RNode df, const std::string &str_eta, const std::string &str_phi, const std::string &str_grid, const float &cell_size) {
+  auto grid = [cell_size](const ROOT::RVec<float> &eta, const ROOT::RVec<float> &phi) {
+    return BuildEtaPhiGrid(eta, phi, cell_size);
+  };
+  auto df1 = df.Define(str_grid, grid, {str_eta, str_phi});
+  return df1;
+}
+
+/**
+ * @brief Select four PF candidates that form two opposite-charge pairs within ΔR < max_deltaR
+ *
  * This algorithm selects a Higgs candidate by finding combinations of four PF candidates
- * that contain at least two opposite-charge pairs with ΔR < 0.1. This selection criteria
+ * that contain at least two opposite-charge pairs with ΔR < max_deltaR. This selection criteria
  * is designed to identify collimated decay products from boosted pseudoscalars.
- * 
+ *
+ * The search first lists the good pairs and then combines them into quadruplets (see
+ * quadruplets::LastQuadrupletFromPairs), so its cost grows with the number of good pairs
+ * instead of with C(N,4). Pairs are evaluated on the candidates in mask order, and the
+ * returned indices are read from the pT-ordered candidate list at the same positions,
+ * exactly as in the previous combinatorial implementation.
+ *
  * @param df Input RDataFrame node
  * @param str_pfcand_pt Column name for PF candidate transverse momentum
  * @param str_pfcand_eta Column name for PF candidate pseudorapidity
@@ -198,84 +384,56 @@ ROOT::RDF::RNode GetTruthDaughterPairs(ROOT::RDF::RNode df, const std::string &s
  * @param str_pfcand_charge Column name for PF candidate charge
  * @param str_pfcand_mask Column name for PF candidate selection mask
  * @param str_daughteridxs Output column name for selected daughter indices
+ * @param max_deltaR Maximum ΔR of a good pair, can be overridden at runtime as higgs_pair_max_deltaR (see haa_parameters.hxx)
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
  * 
  * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates are available
- * @note Requires at least 2 opposite-charge pairs within ΔR < 0.1
- * @note Selected hadrons are sorted by pT
+ * @note Requires at least 2 opposite-charge pairs within ΔR < max_deltaR
+ * @note Selected hadrons are sorted by pT, for equal pT the lower index comes first as in SortedByPt
  */
 ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi, 
-					const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, const std::string &str_pfcand_mask, const std::string &str_daughteridxs) {
+					const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, const std::string &str_pfcand_mask, const std::string &str_daughteridxs,
+					const float &max_deltaR) {
   Logger::get("HiggsSelection")->debug("Setting up algorithm");
-  auto hidx = [](const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<float> pfcand_eta, const ROOT::RVec<float> pfcand_phi, const ROOT::RVec<float> pfcand_mass, const ROOT::RVec<int> pfcand_charge,
-		 const ROOT::RVec<int> pfcand_mask) {
+  const float pair_deltaR = parameters::Get("higgs_pair_max_deltaR", max_deltaR);
+  auto hidx = [pair_deltaR](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass, const ROOT::RVec<int> &pfcand_charge,
+		 const ROOT::RVec<int> &pfcand_mask) {
 
-    Logger::get("HiggsSelectionAlgo")
-    ->debug("Running algorithm on all hadrons (ID = 211 or ID == 1)");
+    HAA_DEBUG("HiggsSelectionAlgo", "Running algorithm on all hadrons (ID = 211 or ID == 1)");
     ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
     auto original_pfcand_indices = ROOT::VecOps::Nonzero(pfcand_mask);
-    
-    const auto good_pts = ROOT::VecOps::Take(pfcand_pt, original_pfcand_indices);
-    const auto good_etas = ROOT::VecOps::Take(pfcand_eta, original_pfcand_indices);
-    const auto good_phis = ROOT::VecOps::Take(pfcand_phi, original_pfcand_indices);
-    const auto good_masses = ROOT::VecOps::Take(pfcand_mass, original_pfcand_indices);
-    const auto good_charges = ROOT::VecOps::Take(pfcand_charge, original_pfcand_indices);
-
-    std::sort(original_pfcand_indices.begin(), original_pfcand_indices.end(), [&pfcand_pt](int a, int b) {
+    const std::size_t ncandidates = original_pfcand_indices.size();
+    if (ncandidates < 4) {
+      return selected_hadrons;
+    }
+
+    // four-vectors and charges in mask order, built directly from the columns
+    ROOT::RVec<ROOT::Math::PtEtaPhiMVector> fourVecs(ncandidates);
+    ROOT::RVec<int> good_charges(ncandidates);
+    for (std::size_t k = 0; k < ncandidates; k++) {
+      const auto idx = original_pfcand_indices[k];
+      fourVecs[k] = ROOT::Math::PtEtaPhiMVector(pfcand_pt[idx], pfcand_eta[idx], pfcand_phi[idx], pfcand_mass[idx]);
+      good_charges[k] = pfcand_charge[idx];
+    }
+
+    std::stable_sort(original_pfcand_indices.begin(), original_pfcand_indices.end(), [&pfcand_pt](int a, int b) {
 	return pfcand_pt[a] > pfcand_pt[b];
       }
       );
 
-    if (original_pfcand_indices.size() < 4) {
-      return selected_hadrons; 
-    }
-    
-    auto fourVecs = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(
-	good_pts, good_etas, good_phis, good_masses);
-
-    float hmass_difference = -1.0;
-                                                                                                     //float psmass_difference = 0.5;
-    float hmass_candidate = -1.0;
-    auto selected_hadron_indices = std::vector<int>{-1, -1, -1, -1};
-
-    auto combinations = ROOT::VecOps::Combinations(original_pfcand_indices, 4);
-    
-    for (unsigned long n = 0; n < combinations[0].size(); n++) {
-      auto hadron_1 = fourVecs[combinations[0][n]]; 
-      auto hadron_2 = fourVecs[combinations[1][n]];
-      auto hadron_3 = fourVecs[combinations[2][n]];
-      auto hadron_4 = fourVecs[combinations[3][n]];
-      int count = 0;
-      for (int i = 0; i < 4; i++) {
-	for (int j = i+1; j < 4; j++) {
-	  float DeltaR = ROOT::Math::VectorUtil::DeltaR(fourVecs[combinations[i][n]], fourVecs[combinations[j][n]]);
-	  int charge_1 = good_charges[combinations[i][n]];
-	  int charge_2 = good_charges[combinations[j][n]];
-	                                                                                             //float psmass_candidate = (fourVecs[combinations[i][n]] + fourVecs[combinations[j][n]]).M();
-	  if (DeltaR < 0.1 && charge_1 != charge_2) {                                                //if (DeltaR < 0.1 &&(std::abs(1.5 - psmass_candidate) < psmass_difference) && charge_1 != charge_2) {
-	    count++;
-	  }
-	}
-      }
-      hmass_candidate = (hadron_1 + hadron_2 + hadron_3 + hadron_4).M();
-      if (count >= 2) {
-	//if (std::abs(125.2 - hmass_candidate) < hmass_difference || hmass_difference < 0) {
-	//hmass_difference = std::abs(125.2 - hmass_candidate);
-	  selected_hadron_indices[0] = original_pfcand_indices[combinations[0][n]];
-	  selected_hadron_indices[1] = original_pfcand_indices[combinations[1][n]];
-	  selected_hadron_indices[2] = original_pfcand_indices[combinations[2][n]];
-	  selected_hadron_indices[3] = original_pfcand_indices[combinations[3][n]];
-	  //	}
-      }
+    const auto good_pairs = quadruplets::FindGoodPairs(fourVecs, good_charges, pair_deltaR);
+    const auto quadruplet = quadruplets::LastQuadrupletFromPairs(good_pairs, original_pfcand_indices.size());
+    if (quadruplet[0] < 0) {
+      return selected_hadrons;
     }
 
-    selected_hadrons = {static_cast<int>(selected_hadron_indices[0]), 
-			static_cast<int>(selected_hadron_indices[1]), 
-			static_cast<int>(selected_hadron_indices[2]), 
-			static_cast<int>(selected_hadron_indices[3])};
+    selected_hadrons = {static_cast<int>(original_pfcand_indices[quadruplet[0]]),
+			static_cast<int>(original_pfcand_indices[quadruplet[1]]),
+			static_cast<int>(original_pfcand_indices[quadruplet[2]]),
+			static_cast<int>(original_pfcand_indices[quadruplet[3]])};
 
-    std::sort(selected_hadrons.begin(), selected_hadrons.end(), [&pfcand_pt](int a, int b) {
+    std::stable_sort(selected_hadrons.begin(), selected_hadrons.end(), [&pfcand_pt](int a, int b) {
         return pfcand_pt[a] > pfcand_pt[b];
       }
       );
@@ -284,9 +442,243 @@ ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, const std::string &
   };
   
   auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
-  
+
+  return df1;
+
+}
+
+/**
+ * @brief Select four PF candidates that form two opposite-charge pairs within ΔR < max_deltaR, reading a PF candidate view
+ *
+ * Same selection as the overload on the PF candidate columns, with the mask, the pT
+ * ordering and the candidate kinematics taken from a PFCandView (see GetPFCandView).
+ * The pT-ordered candidate list (SortedByPt) is only built for events with a quadruplet.
+ * Since the quadruplet positions are sorted, the selected indices come out pT-ordered
+ * without another sort.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_daughteridxs Output column name for selected daughter indices
+ * @param max_deltaR Maximum ΔR of a good pair, can be overridden at runtime as higgs_pair_max_deltaR
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
+ *
+ * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates are available
+ * @note Selected hadrons are sorted by pT
+ */
+ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_daughteridxs, const float &max_deltaR) {
+  const float pair_deltaR = parameters::Get("higgs_pair_max_deltaR", max_deltaR);
+  auto hidx = [pair_deltaR](const PFCandView &view) {
+    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+    const int ncandidates = view.indices.size();
+    if (ncandidates < 4) {
+      return selected_hadrons;
+    }
+
+    const auto good_pairs = quadruplets::FindGoodPairs(view, pair_deltaR);
+    const auto quadruplet = quadruplets::LastQuadrupletFromPairs(good_pairs, ncandidates);
+    if (quadruplet[0] < 0) {
+      return selected_hadrons;
+    }
+
+    const auto sorted_indices = SortedByPt(view);
+    selected_hadrons = {sorted_indices[quadruplet[0]],
+			sorted_indices[quadruplet[1]],
+			sorted_indices[quadruplet[2]],
+			sorted_indices[quadruplet[3]]};
+
+    return selected_hadrons;
+  };
+
+  auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_view});
+  return df1;
+}
+
+/**
+ * @brief Select four PF candidates that form two opposite-charge pairs within ΔR < max_deltaR, using the η-φ grid
+ *
+ * Same selection as the PFCandView overload, but the ΔR < max_deltaR partners of each candidate
+ * are only searched in the neighbouring cells of the η-φ grid (see GetEtaPhiGrid), so the
+ * pair search scales with the local candidate density instead of quadratically with the
+ * number of selected candidates. The selected daughters are identical.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_pfcand_grid Column name for the η-φ grid of all PF candidates, cell size >= max_deltaR
+ * @param str_daughteridxs Output column name for selected daughter indices
+ * @param max_deltaR Maximum ΔR of a good pair, can be overridden at runtime as higgs_pair_max_deltaR
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
+ *
+ * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates are available
+ * @note Selected hadrons are sorted by pT
+ */
+ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_pfcand_grid, const std::string &str_daughteridxs,
+                                        const float &max_deltaR) {
+  const float pair_deltaR = parameters::Get("higgs_pair_max_deltaR", max_deltaR);
+  auto hidx = [pair_deltaR](const PFCandView &view, const EtaPhiGrid &grid) {
+    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+    const int ncandidates = view.indices.size();
+    if (ncandidates < 4) {
+      return selected_hadrons;
+    }
+
+    const auto good_pairs = quadruplets::FindGoodPairs(view, grid, pair_deltaR);
+    const auto quadruplet = quadruplets::LastQuadrupletFromPairs(good_pairs, ncandidates);
+    if (quadruplet[0] < 0) {
+      return selected_hadrons;
+    }
+
+    const auto sorted_indices = SortedByPt(view);
+    selected_hadrons = {sorted_indices[quadruplet[0]],
+			sorted_indices[quadruplet[1]],
+			sorted_indices[quadruplet[2]],
+			sorted_indices[quadruplet[3]]};
+
+    return selected_hadrons;
+  };
+
+  auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_view, str_pfcand_grid});
   return df1;
+}
+
+/**
+ * @brief Keep the K best Higgs quadruplets instead of the last accepted one
+ *
+ * Accepts the same quadruplets as ClosestToHiggsMassAlgo (at least two opposite-charge pairs
+ * within ΔR < max_deltaR), but ranks all of them by a score and keeps the K best in a bounded heap
+ * during a single scan (quadruplets::TopQuadruplets), so the result does not depend on the
+ * iteration order. Ambiguity studies can read all K candidates from one run.
+ *
+ * The scores are computed from the candidates that formed the good pairs, and the returned
+ * indices are these candidates (view.indices), so every score belongs to its quadruplet.
+ * Within a quadruplet the indices are sorted by pT.
+ *
+ * ClosestToHiggsMassAlgo reads the PF candidate indices of its quadruplet positions from
+ * the pT-ordered list (SortedByPt) instead, as the combinatorial algorithm it replaces. The two give the
+ * same PF candidates for the same positions only if the selected PF candidates are stored
+ * by decreasing pT, otherwise the indices of ClosestToHiggsMassAlgo are not the candidates
+ * its good pairs were formed of (see benchmarks/ranked_benchmark.cxx).
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_quadruplets Output column name for the 4K daughter indices, best quadruplet first
+ * @param str_scores Output column name for the K scores
+ * @param k Number of quadruplets to keep
+ * @param ranking "higgs_mass" (|m4 - higgs_mass|, lowest first), "sum_pt" (scalar ΣpT,
+ * highest first) or "pair_mass_diff" (|m12 - m34| of the best opposite-charge pairing, lowest first)
+ * @param higgs_mass Higgs mass used by the "higgs_mass" ranking, can be overridden at runtime as higgs_mass
+ * @param max_deltaR Maximum ΔR of a good pair, can be overridden at runtime as higgs_pair_max_deltaR
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the quadruplet and score columns
+ *
+ * @note Missing quadruplets are filled with -1 indices and default_float scores
+ * @note Throws std::invalid_argument for an unknown ranking or k < 1
+ */
+ROOT::RDF::RNode RankedQuadrupletsAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_quadruplets,
+                                       const std::string &str_scores, const int &k, const std::string &ranking, const float &higgs_mass,
+                                       const float &max_deltaR) {
+  quadruplets::Ranking score;
+  if (ranking == "higgs_mass") {
+    score = quadruplets::Ranking::HiggsMass;
+  } else if (ranking == "sum_pt") {
+    score = quadruplets::Ranking::SumPt;
+  } else if (ranking == "pair_mass_diff") {
+    score = quadruplets::Ranking::PairMassDiff;
+  } else {
+    Logger::get("RankedQuadrupletsAlgo")->error("Unknown ranking {}, expected higgs_mass, sum_pt or pair_mass_diff", ranking);
+    throw std::invalid_argument("RankedQuadrupletsAlgo: unknown ranking " + ranking);
+  }
+  if (k < 1) {
+    Logger::get("RankedQuadrupletsAlgo")->error("Number of quadruplets has to be positive, got {}", k);
+    throw std::invalid_argument("RankedQuadrupletsAlgo: k < 1");
+  }
+
+  const float target_mass = parameters::Get("higgs_mass", higgs_mass);
+  const float pair_deltaR = parameters::Get("higgs_pair_max_deltaR", max_deltaR);
+  auto top = [k, score, target_mass, pair_deltaR](const PFCandView &view) {
+    const int ncandidates = view.indices.size();
+    if (ncandidates < 4) {
+      return std::vector<quadruplets::RankedQuadruplet>{};
+    }
+    const auto good_pairs = quadruplets::FindGoodPairs(view, pair_deltaR);
+    return quadruplets::TopQuadruplets(view, good_pairs, k, score, target_mass);
+  };
+  auto indices = [k](const PFCandView &view, const std::vector<quadruplets::RankedQuadruplet> &ranked) {
+    ROOT::RVec<int> quads(4 * k, -1);
+    for (std::size_t q = 0; q < ranked.size(); q++) {
+      auto positions = ranked[q].positions;
+      std::stable_sort(positions.begin(), positions.end(), [&view](int a, int b) {
+        return view.pt[a] > view.pt[b];
+      });
+      for (int i = 0; i < 4; i++) {
+        quads[4 * q + i] = view.indices[positions[i]];
+      }
+    }
+    return quads;
+  };
+  auto scores = [k](const std::vector<quadruplets::RankedQuadruplet> &ranked) {
+    ROOT::RVec<float> values(k, default_float);
+    for (std::size_t q = 0; q < ranked.size(); q++) {
+      values[q] = ranked[q].score;
+    }
+    return values;
+  };
+
+  const std::string str_ranked = str_quadruplets + "_ranked";
+  return df.Define(str_ranked, top, {str_pfcand_view})
+      .Define(str_quadruplets, indices, {str_pfcand_view, str_ranked})
+      .Define(str_scores, scores, {str_ranked});
+}
+
+/**
+ * @brief Run ClosestToHiggsMassAlgo for several working points in one pass
+ *
+ * Working point w requires PF candidates with pT >= min_pt[w] on top of the view selection
+ * and good pairs within ΔR < max_deltaR[w]. All working points share the view, its pT
+ * ordering and a single good pair search with the widest cone (see
+ * quadruplets::LastQuadrupletsScan), so scanning N working points costs much less than N
+ * runs of ClosestToHiggsMassAlgo. Each working point selects the same daughters as
+ * ClosestToHiggsMassAlgo on a view with its pT threshold.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view, built with a pT threshold not above any of min_pt
+ * @param str_daughteridxs Output column name for the daughter indices, four per working point
+ * @param min_pt Minimum PF candidate pT of each working point
+ * @param max_deltaR Maximum ΔR of a good pair of each working point
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the daughter indices column
+ *
+ * @note The daughters of working point w are entries 4w to 4w+3, pT-ordered, {-1, -1, -1, -1} if none are found
+ * @note Throws std::invalid_argument if the working point lists are empty or differ in length
+ */
+ROOT::RDF::RNode ClosestToHiggsMassScan(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_daughteridxs,
+                                        const std::vector<float> &min_pt, const std::vector<float> &max_deltaR) {
+  if (min_pt.empty() || min_pt.size() != max_deltaR.size()) {
+    Logger::get("ClosestToHiggsMassScan")->error("Need the same number of pT thresholds and ΔR cones, got {} and {}", min_pt.size(), max_deltaR.size());
+    throw std::invalid_argument("ClosestToHiggsMassScan: inconsistent working points");
+  }
+  Logger::get("ClosestToHiggsMassScan")->debug("Scanning {} working points", min_pt.size());
+  auto hidx = [min_pt, max_deltaR](const PFCandView &view) {
+    ROOT::RVec<int> selected_hadrons(4 * min_pt.size(), -1);
+    const auto quads = quadruplets::LastQuadrupletsScan(view, min_pt, max_deltaR);
+    ROOT::RVec<int> sorted_indices;
+    for (std::size_t w = 0; w < quads.size(); w++) {
+      if (quads[w][0] < 0) {
+        continue;
+      }
+      if (sorted_indices.empty()) {
+        sorted_indices = SortedByPt(view);
+      }
+      for (int i = 0; i < 4; i++) {
+        selected_hadrons[4 * w + i] = sorted_indices[quads[w][i]];
+      }
+    }
+    return selected_hadrons;
+  };
 
+  auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_view});
+  return df1;
 }
 
 /**
@@ -303,29 +695,50 @@ ROOT::RDF::RNode ClosestToHiggsMassAlgo(ROOT::RDF::RNode df, const std::string &
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
  * 
- * @note Candidates are sorted by pT in descending order
+ * @note Candidates are sorted by pT in descending order. They are found in one pass with
+ *       FindHardest, without sorting all selected candidates; for equal pT the lower index comes first
+ * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates are available
  */
 ROOT::RDF::RNode FourHardestPFCandsAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_pt, const std::string &str_pfcand_mask, const std::string &str_daughteridxs) {
-  auto hidx = [](const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<int> pfcand_mask) {
-
-    auto original_pfcand_indices = ROOT::VecOps::Nonzero(pfcand_mask);
-    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1}; 
-    
-    std::sort(original_pfcand_indices.begin(), original_pfcand_indices.end(), [&pfcand_pt](int a, int b) {
-	return pfcand_pt[a] > pfcand_pt[b];
-      }
-      );
-    selected_hadrons = {static_cast<int>(original_pfcand_indices[0]),
-                        static_cast<int>(original_pfcand_indices[1]),
-                        static_cast<int>(original_pfcand_indices[2]),
-                        static_cast<int>(original_pfcand_indices[3])};
-
+  auto hidx = [](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_mask) {
+    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+    const auto hardest = FindHardest<4>(pfcand_pt, pfcand_mask);
+    if (!hardest.Full()) {
+      return selected_hadrons;
+    }
+    selected_hadrons = {hardest.indices[0], hardest.indices[1], hardest.indices[2], hardest.indices[3]};
     return selected_hadrons;
   };
   auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_pt, str_pfcand_mask});
   return df1;
 }
 
+/**
+ * @brief Select the four highest-pT PF candidates as Higgs daughters, reading a PF candidate view
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_daughteridxs Output column name for selected daughter indices
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
+ *
+ * @note Candidates are sorted by pT in descending order. They are read from the hardest
+ *       candidates the view collected in one pass, the same as FindHardest gives
+ * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates are available
+ */
+ROOT::RDF::RNode FourHardestPFCandsAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_daughteridxs) {
+  auto hidx = [](const PFCandView &view) {
+    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+    if (!view.hardest.Full()) {
+      return selected_hadrons;
+    }
+    selected_hadrons = {view.hardest.indices[0], view.hardest.indices[1], view.hardest.indices[2], view.hardest.indices[3]};
+    return selected_hadrons;
+  };
+  auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_view});
+  return df1;
+}
+
 /**
  * @brief Select four PF candidates as two highest-pT positive and two highest-pT negative candidates
  * 
@@ -346,6 +759,8 @@ ROOT::RDF::RNode FourHardestPFCandsAlgo(ROOT::RDF::RNode df, const std::string &
  * 
  * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates or insufficient charge balance
  * @note Selected indices are ordered as: pos[0], neg[0], pos[1], neg[1]
+ * @note The candidates of each charge are found in one pass with FindHardestByCharge, without
+ *       sorting all selected candidates; for equal pT the lower index comes first
  */
 ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi, const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, 
 				 const std::string &str_pfcand_mask, const std::string &str_daughteridxs) {
@@ -367,42 +782,16 @@ ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df, const std::string &str_pfc
     return sums_pt;
   };
 */
-  auto hidx = [](const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<int> pfcand_charge, const ROOT::RVec<int> pfcand_mask) {
-
-    auto original_pfcand_indices = ROOT::VecOps::Nonzero(pfcand_mask);
+  auto hidx = [](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
     ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
-
-    if (original_pfcand_indices.size() < 4) {
-      return selected_hadrons;
-    }
-    
-    std::sort(original_pfcand_indices.begin(), original_pfcand_indices.end(), [&pfcand_pt](int a, int b) {
-	return pfcand_pt[a] > pfcand_pt[b];
-      }
-      );
-    int countpos = 0;
-    int countneg = 0;
-    ROOT::RVec<int> two_hardest_pos = {-1, -1};
-    ROOT::RVec<int> two_hardest_neg = {-1, -1};
-    for (int i = 0; i < original_pfcand_indices.size(); i++) {
-      if (pfcand_charge[original_pfcand_indices[i]] == 1 && countpos < 2) {
-	two_hardest_pos[countpos] = original_pfcand_indices[i];
-	countpos++;
-      }
-      if (pfcand_charge[original_pfcand_indices[i]] == -1 && countneg < 2) {
-	two_hardest_neg[countneg] = original_pfcand_indices[i];
-	countneg++;
-      }
-    }
-
-    if (countpos < 2 || countneg < 2) {
+    const auto hardest = FindHardestByCharge<2>(pfcand_pt, pfcand_charge, pfcand_mask);
+    if (!hardest.positive.Full() || !hardest.negative.Full()) {
       return selected_hadrons;
     }
-
-    selected_hadrons = {static_cast<int>(two_hardest_pos[0]), 
-			static_cast<int>(two_hardest_neg[0]),
-			static_cast<int>(two_hardest_pos[1]),
-			static_cast<int>(two_hardest_neg[1])};
+    selected_hadrons = {hardest.positive.indices[0],
+			hardest.negative.indices[0],
+			hardest.positive.indices[1],
+			hardest.negative.indices[1]};
     return selected_hadrons;
   };
   //auto df1 = df.Define("PFCands_iso", iso, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass});
@@ -410,6 +799,67 @@ ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df, const std::string &str_pfc
   return df1;
   }
 
+/**
+ * @brief Select the two highest-pT positive and two highest-pT negative candidates, reading a PF candidate view
+ *
+ * @param df Input RDataFrame node
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_daughteridxs Output column name for selected daughter indices
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with selected daughter indices column
+ *
+ * @note Returns {-1, -1, -1, -1} if fewer than 4 candidates or insufficient charge balance
+ * @note Selected indices are ordered as: pos[0], neg[0], pos[1], neg[1]
+ * @note The candidates are read from the hardest candidates of each charge the view
+ *       collected in one pass, the same as FindHardestByCharge gives
+ */
+ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df, const std::string &str_pfcand_view, const std::string &str_daughteridxs) {
+  auto hidx = [](const PFCandView &view) {
+    ROOT::RVec<int> selected_hadrons = {-1, -1, -1, -1};
+    const auto &hardest = view.hardest_by_charge;
+    if (!hardest.positive.Full() || !hardest.negative.Full()) {
+      return selected_hadrons;
+    }
+    selected_hadrons = {hardest.positive.indices[0],
+			hardest.negative.indices[0],
+			hardest.positive.indices[1],
+			hardest.negative.indices[1]};
+    return selected_hadrons;
+  };
+  auto df1 = df.Define(str_daughteridxs, hidx, {str_pfcand_view});
+  return df1;
+}
+
+/**
+ * @brief Reject events that cannot give four Higgs daughters, before the daughter search
+ *
+ * Named event filter counting the selected positive and negative PF candidates above the
+ * daughter pT threshold (see CanFormHiggsDaughters). It only needs one pass over the mask,
+ * without sorting or pair search, so events without enough candidates of both charges are
+ * dropped before the PF candidate view and the Higgs daughter algorithms are evaluated.
+ * The filter appears under its name in the cutflow.
+ *
+ * @param df Input RDataFrame node
+ * @param filtername Name of the filter in the cutflow
+ * @param str_pfcand_pt Column name for PF candidate transverse momentum
+ * @param str_pfcand_charge Column name for PF candidate charge
+ * @param str_pfcand_mask Column name for PF candidate selection mask
+ * @param min_pt Minimum daughter pT
+ * @param min_per_charge Minimum number of candidates of each charge, 2 for ChargePairsAlgo and 1 for ClosestToHiggsMassAlgo
+ *
+ * @return ROOT::RDF::RNode Filtered RDataFrame
+ *
+ * @note With min_pt equal to the PF candidate selection threshold and min_per_charge matching
+ * the daughter algorithm, no event with valid Higgs daughters is rejected
+ */
+ROOT::RDF::RNode HiggsDaughtersPreFilter(ROOT::RDF::RNode df, const std::string &filtername, const std::string &str_pfcand_pt, const std::string &str_pfcand_charge,
+                                         const std::string &str_pfcand_mask, const float &min_pt, const int &min_per_charge) {
+  auto prefilter = [min_pt, min_per_charge](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+    return CanFormHiggsDaughters(pfcand_pt, pfcand_charge, pfcand_mask, min_pt, min_per_charge);
+  };
+  return df.Filter(prefilter, {str_pfcand_pt, str_pfcand_charge, str_pfcand_mask}, filtername);
+}
+
 /**
  * @brief Compute the Higgs boson four-momentum by summing four daughter four-momenta
  * 
@@ -427,8 +877,8 @@ ROOT::RDF::RNode ChargePairsAlgo(ROOT::RDF::RNode df, const std::string &str_pfc
  */
 ROOT::RDF::RNode GetHiggsP4(ROOT::RDF::RNode df, const std::string &str_d1_p4, const std::string &str_d2_p4, 
 			    const std::string &str_d3_p4, const std::string &str_d4_p4, const std::string &str_H_p4) {
-  auto H_p4 = [](const ROOT::Math::PtEtaPhiMVector d1_p4, const ROOT::Math::PtEtaPhiMVector d2_p4, const ROOT::Math::PtEtaPhiMVector d3_p4,                                                                
-		 const ROOT::Math::PtEtaPhiMVector d4_p4) {
+  auto H_p4 = [](const ROOT::Math::PtEtaPhiMVector &d1_p4, const ROOT::Math::PtEtaPhiMVector &d2_p4, const ROOT::Math::PtEtaPhiMVector &d3_p4,                                                                
+		 const ROOT::Math::PtEtaPhiMVector &d4_p4) {
     auto H_p4 = d1_p4 + d2_p4 + d3_p4 + d4_p4;
     return H_p4;
   }; 
@@ -436,12 +886,116 @@ ROOT::RDF::RNode GetHiggsP4(ROOT::RDF::RNode df, const std::string &str_d1_p4, c
   return df1;
 }
 
+namespace pairing {
+
+/**
+ * @brief Check that the daughter indices are four valid PF candidate indices
+ *
+ * @param daughterIdx PF candidate indices of the daughters
+ * @param npfcands Number of PF candidates
+ *
+ * @return bool true if there are four daughters and all indices are in range
+ */
+bool ValidDaughters(const ROOT::RVec<int> &daughterIdx, const std::size_t npfcands) {
+  if (daughterIdx.size() != 4) {
+    return false;
+  }
+  for (const int idx : daughterIdx) {
+    if (idx < 0 || idx >= static_cast<int>(npfcands)) {
+      return false;
+    }
+  }
+  return true;
+}
+
+/**
+ * @brief Positions of the four daughters in a PF candidate view
+ *
+ * @param daughters PF candidate indices of the four daughters
+ * @param view PF candidate view
+ * @param positions Output positions in the view arrays
+ *
+ * @return bool false if a daughter is not in the view
+ */
+bool ViewPositions(const std::array<int, 4> &daughters, const PFCandView &view, std::array<int, 4> &positions) {
+  for (int i = 0; i < 4; i++) {
+    positions[i] = view.Position(daughters[i]);
+    if (positions[i] < 0) {
+      return false;
+    }
+  }
+  return true;
+}
+
+/**
+ * @brief PF candidate indices of the two pseudoscalar pairs in the layout of GetMinMassDiff and GetPseudoScalars
+ *
+ * The first pair is the first pair of the best pairing, the second pair are the remaining
+ * daughters in daughter order (see Partners), as the separate partner columns used to compute.
+ *
+ * @param daughterIdx PF candidate indices of the four daughters
+ * @param daughters PF candidate indices of the daughters the pairing positions refer to
+ * @param best Best pairing
+ *
+ * @return ROOT::RVec<int> {first pair, second pair}, the first pair is {-1, -1} if no pairing is found
+ */
+ROOT::RVec<int> PairIndices(const ROOT::RVec<int> &daughterIdx, const std::array<int, 4> &daughters, const FourBodyPairing &best) {
+  std::array<int, 2> ps1 = {-1, -1};
+  if (best.Valid()) {
+    ps1 = {daughters[best.pairs[0][0]], daughters[best.pairs[0][1]]};
+  }
+  const auto ps2 = Partners(daughterIdx, ps1);
+  return {ps1[0], ps1[1], ps2[0], ps2[1]};
+}
+
+/**
+ * @brief Pairing criterion from its configuration name
+ *
+ * @param name "min_mass_diff", "highest_pair_pt" or "mass_window"
+ *
+ * @return Criterion
+ *
+ * @note Throws std::invalid_argument for unknown names
+ */
+Criterion CriterionFromName(const std::string &name) {
+  if (name == "min_mass_diff") {
+    return Criterion::MinMassDiff;
+  }
+  if (name == "highest_pair_pt") {
+    return Criterion::HighestPairPt;
+  }
+  if (name == "mass_window") {
+    return Criterion::MassWindowChi2;
+  }
+  Logger::get("PseudoScalarPairing")->error("Unknown pairing criterion {}, expected min_mass_diff, highest_pair_pt or mass_window", name);
+  throw std::invalid_argument("pairing: unknown criterion " + name);
+}
+
+/**
+ * @brief Split a pair index column {first pair, second pair} into two pair columns
+ *
+ * @param df Input RDataFrame node
+ * @param str_pairs Column name for the four pair indices
+ * @param str_ps1Pair Output column name for the first pair
+ * @param str_ps2Pair Output column name for the second pair
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the two pair columns
+ */
+ROOT::RDF::RNode SplitPairs(ROOT::RDF::RNode df, const std::string &str_pairs, const std::string &str_ps1Pair, const std::string &str_ps2Pair) {
+  return df.Define(str_ps1Pair, [](const ROOT::RVec<int> &pairs) { return ROOT::RVec<int>{pairs[0], pairs[1]}; }, {str_pairs})
+      .Define(str_ps2Pair, [](const ROOT::RVec<int> &pairs) { return ROOT::RVec<int>{pairs[2], pairs[3]}; }, {str_pairs});
+}
+
+} // namespace pairing
+
 /**
  * @brief Pair daughters into pseudoscalars based on highest combined pT
  * 
  * This function identifies two opposite-charge pairs from the four daughters. The pair
  * with the highest combined pT is selected as the first pseudoscalar, and the remaining
- * two daughters form the second pseudoscalar.
+ * two daughters form the second pseudoscalar. The three pairings are scored once with
+ * pairing::BestPairing and both pairs are taken from the intermediate column
+ * <str_highPtPair>_pairing.
  * 
  * @param df Input RDataFrame node
  * @param daughterIdx Column name for daughter indices
@@ -456,69 +1010,73 @@ ROOT::RDF::RNode GetHiggsP4(ROOT::RDF::RNode df, const std::string &str_d1_p4, c
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with pseudoscalar pair columns
  * 
- * @note Only considers opposite-charge pairs
+ * @note Only considers pairings into two opposite-charge pairs
  * @note Returns {-1, -1} if no valid pairing is found
  */
 ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df, const std::string &daughterIdx, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi, 
                                   const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, const std::string &str_pfcand_mask, const std::string &str_highPtPair, 
                                   const std::string &str_lowPtPair) {
-  auto highPtPair = [](const ROOT::RVec<int> daughterIdx, const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<float> pfcand_eta, const ROOT::RVec<float> pfcand_phi, const ROOT::RVec<float> pfcand_mass, const ROOT::RVec<int> pfcand_charge, const ROOT::RVec<int> pfcand_mask) {
-    
-    const auto good_pts = ROOT::VecOps::Take(pfcand_pt, daughterIdx);
-    const auto good_etas = ROOT::VecOps::Take(pfcand_eta, daughterIdx);
-    const auto good_phis = ROOT::VecOps::Take(pfcand_phi, daughterIdx);
-    const auto good_masses = ROOT::VecOps::Take(pfcand_mass, daughterIdx);
-    const auto good_charges = ROOT::VecOps::Take(pfcand_charge, daughterIdx);
-
-    ROOT::RVec<int> highPtPairIdxs = {-1, -1};  
-    float highPt = 0;
-
-    auto combinations = ROOT::VecOps::Combinations(daughterIdx, 2);
-    for (int n = 0; n < combinations[0].size(); n++) {
-      auto daughter_1 = ROOT::Math::PtEtaPhiMVector(good_pts[combinations[0][n]], good_etas[combinations[0][n]], good_phis[combinations[0][n]], good_masses[combinations[0][n]]);
-      auto daughter_2 = ROOT::Math::PtEtaPhiMVector(good_pts[combinations[1][n]], good_etas[combinations[1][n]], good_phis[combinations[1][n]], good_masses[combinations[1][n]]);
-      int charge_1 = good_charges[combinations[0][n]];
-      int charge_2 = good_charges[combinations[1][n]];
-      if (charge_1 != charge_2) {
-        auto ps = daughter_1 + daughter_2;
-        if (ps.Pt() > highPt) {
-          highPt = ps.Pt();
-          highPtPairIdxs = {static_cast<int>(daughterIdx[combinations[0][n]]), static_cast<int>(daughterIdx[combinations[1][n]])};
-        }
-      }
+  auto pairs = [](const ROOT::RVec<int> &daughterIdx, const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+    std::array<int, 4> daughters = {-1, -1, -1, -1};
+    pairing::FourBodyPairing best;
+    if (pairing::ValidDaughters(daughterIdx, pfcand_pt.size())) {
+      daughters = {daughterIdx[0], daughterIdx[1], daughterIdx[2], daughterIdx[3]};
+      best = pairing::BestPairing(pairing::FourBodyFromPFCands(pfcand_pt, pfcand_eta, pfcand_phi, pfcand_mass, pfcand_charge, daughters),
+                                  pairing::Criterion::HighestPairPt);
     }
-    return highPtPairIdxs;
+    return pairing::PairIndices(daughterIdx, daughters, best);
   };
 
-  auto lowPtPair = [](const ROOT::RVec<int> daughterIdx, const ROOT::RVec<int> highPtPairIdxs) {
-    ROOT::RVec<int> lowPtPairIdxs = {-1, -1};
-    for (auto idx : daughterIdx) {
-      if (idx != highPtPairIdxs[0] && idx != highPtPairIdxs[1]) {
-        if (lowPtPairIdxs[0] == -1) {
-          lowPtPairIdxs[0] = idx;
-        } else {
-          lowPtPairIdxs[1] = idx;
-        }
+  const std::string str_pairs = str_highPtPair + "_pairing";
+  auto df1 = df.Define(str_pairs, pairs, {daughterIdx, str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
+  return pairing::SplitPairs(df1, str_pairs, str_highPtPair, str_lowPtPair);
+}
+
+/**
+ * @brief Pair daughters into pseudoscalars based on highest combined pT, reading a PF candidate view
+ *
+ * Same pairing as the overload on the PF candidate columns, with the pair momenta summed
+ * from the cached Cartesian components of the PFCandView.
+ *
+ * @param df Input RDataFrame node
+ * @param daughterIdx Column name for daughter indices
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_highPtPair Output column name for high-pT pseudoscalar daughter pair indices
+ * @param str_lowPtPair Output column name for low-pT pseudoscalar daughter pair indices
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with pseudoscalar pair columns
+ *
+ * @note Only considers pairings into two opposite-charge pairs
+ * @note Returns {-1, -1} if no valid pairing is found or a daughter is not in the view
+ */
+ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df, const std::string &daughterIdx, const std::string &str_pfcand_view, const std::string &str_highPtPair,
+                                  const std::string &str_lowPtPair) {
+  auto pairs = [](const ROOT::RVec<int> &daughterIdx, const PFCandView &view) {
+    std::array<int, 4> daughters = {-1, -1, -1, -1};
+    std::array<int, 4> positions;
+    pairing::FourBodyPairing best;
+    if (daughterIdx.size() == 4) {
+      daughters = {daughterIdx[0], daughterIdx[1], daughterIdx[2], daughterIdx[3]};
+      if (pairing::ViewPositions(daughters, view, positions)) {
+        best = pairing::BestPairing(pairing::FourBodyFromView(view, positions), pairing::Criterion::HighestPairPt);
       }
     }
-
-    return lowPtPairIdxs;
-
+    return pairing::PairIndices(daughterIdx, daughters, best);
   };
 
-  auto df1 = df.Define(str_highPtPair, highPtPair, {daughterIdx, str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
-  auto df2 = df1.Define(str_lowPtPair, lowPtPair, {daughterIdx, str_highPtPair});
-
-  return df2;
-    
+  const std::string str_pairs = str_highPtPair + "_pairing";
+  auto df1 = df.Define(str_pairs, pairs, {daughterIdx, str_pfcand_view});
+  return pairing::SplitPairs(df1, str_pairs, str_highPtPair, str_lowPtPair);
 }
 
 /**
  * @brief Pair daughters into pseudoscalars by minimizing the invariant mass difference
  * 
- * This function tests all possible opposite-charge pairings of the four daughters and
+ * This function tests the three opposite-charge pairings of the four daughters and
  * selects the pairing that minimizes the absolute difference between the two pair masses.
- * This approach assumes the two pseudoscalars should have similar masses.
+ * This approach assumes the two pseudoscalars should have similar masses. The daughters
+ * are sorted by index first, so the first pseudoscalar always holds the daughter with the
+ * lowest PF candidate index, as with the permutation scan this replaces.
  * 
  * @param df Input RDataFrame node
  * @param daughterIdx Column name for daughter indices
@@ -533,65 +1091,117 @@ ROOT::RDF::RNode GetPseudoScalars(ROOT::RDF::RNode df, const std::string &daught
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with pseudoscalar pair columns
  * 
- * @note Uses permutations to test all possible pairings
  * @note Only considers opposite-charge pairs
  * @note Returns {-1, -1} if no valid pairing is found
  */
 ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df, const std::string &daughterIdx, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi, 
                                const std::string &str_pfcand_mass, const std::string &str_pfcand_charge, const std::string &str_pfcand_mask, const std::string &str_ps1Pair, 
                                const std::string &str_ps2Pair) {
-  auto minMassDiff = [](const ROOT::RVec<int> daughterIdx, const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<float> pfcand_eta, 
-                        const ROOT::RVec<float> pfcand_phi, const ROOT::RVec<float> pfcand_mass, const ROOT::RVec<int> pfcand_charge, const ROOT::RVec<int> pfcand_mask) {
-                        
-    //const auto good_pts = ROOT::VecOps::Take(pfcand_pt, daughterIdx);
-    //const auto good_etas = ROOT::VecOps::Take(pfcand_eta, daughterIdx);
-    //const auto good_phis = ROOT::VecOps::Take(pfcand_phi, daughterIdx);
-    //const auto good_masses = ROOT::VecOps::Take(pfcand_mass, daughterIdx);
-    //const auto good_charges = ROOT::VecOps::Take(pfcand_charge, daughterIdx);
-
-    ROOT::RVec<int> minMassDiffIdxs = {-1, -1};
-    ROOT::RVec<int> daughters = daughterIdx;
-    std::sort(daughters.begin(), daughters.end());
-    float minMassDiff = 9999.0;
-    do {
-      if (pfcand_charge[daughters[0]] != pfcand_charge[daughters[1]] && pfcand_charge[daughters[2]] != pfcand_charge[daughters[3]]) {
-        auto daughter_1 = ROOT::Math::PtEtaPhiMVector(pfcand_pt[daughters[0]], pfcand_eta[daughters[0]], pfcand_phi[daughters[0]], pfcand_mass[daughters[0]]);
-        auto daughter_2 = ROOT::Math::PtEtaPhiMVector(pfcand_pt[daughters[1]], pfcand_eta[daughters[1]], pfcand_phi[daughters[1]], pfcand_mass[daughters[1]]);
-        auto daughter_3 = ROOT::Math::PtEtaPhiMVector(pfcand_pt[daughters[2]], pfcand_eta[daughters[2]], pfcand_phi[daughters[2]], pfcand_mass[daughters[2]]);
-        auto daughter_4 = ROOT::Math::PtEtaPhiMVector(pfcand_pt[daughters[3]], pfcand_eta[daughters[3]], pfcand_phi[daughters[3]], pfcand_mass[daughters[3]]);
-        auto ps1 = daughter_1 + daughter_2;
-        auto ps2 = daughter_3 + daughter_4;
-        float massDiff = std::abs(ps1.M() - ps2.M());
-        if (massDiff < minMassDiff) {
-          minMassDiff = massDiff;
-          minMassDiffIdxs = {daughters[0], daughters[1]};
-        }
-      }
+  auto pairs = [](const ROOT::RVec<int> &daughterIdx, const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, 
+                  const ROOT::RVec<float> &pfcand_phi, const ROOT::RVec<float> &pfcand_mass, const ROOT::RVec<int> &pfcand_charge, const ROOT::RVec<int> &pfcand_mask) {
+    std::array<int, 4> daughters = {-1, -1, -1, -1};
+    pairing::FourBodyPairing best;
+    if (pairing::ValidDaughters(daughterIdx, pfcand_pt.size())) {
+      daughters = {daughterIdx[0], daughterIdx[1], daughterIdx[2], daughterIdx[3]};
+      std::sort(daughters.begin(), daughters.end());
+      best = pairing::BestPairing(pairing::FourBodyFromPFCands(pfcand_pt, pfcand_eta, pfcand_phi, pfcand_mass, pfcand_charge, daughters),
+                                  pairing::Criterion::MinMassDiff);
     }
-    while (std::next_permutation(daughters.begin(), daughters.end()));
-
-    return minMassDiffIdxs;
+    return pairing::PairIndices(daughterIdx, daughters, best);
   };
 
-  auto partners = [](const ROOT::RVec<int> daughterIdx, const ROOT::RVec<int> minMassDiffIdxs) {
-    ROOT::RVec<int> partners = {-1, -1};
-    for (auto idx : daughterIdx) {
-      if (idx != minMassDiffIdxs[0] && idx != minMassDiffIdxs[1]) {
-        if (partners[0] == -1) {
-          partners[0] = idx;
-        } else {
-          partners[1] = idx;
-        }
+  const std::string str_pairs = str_ps1Pair + "_pairing";
+  auto df1 = df.Define(str_pairs, pairs, {daughterIdx, str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
+  return pairing::SplitPairs(df1, str_pairs, str_ps1Pair, str_ps2Pair);
+}
+
+/**
+ * @brief Pair daughters into pseudoscalars by minimizing the invariant mass difference, reading a PF candidate view
+ *
+ * Same pairing as the overload on the PF candidate columns, with the daughter four-momenta
+ * taken from the cached Cartesian components of the PFCandView.
+ *
+ * @param df Input RDataFrame node
+ * @param daughterIdx Column name for daughter indices
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_ps1Pair Output column name for first pseudoscalar daughter pair indices
+ * @param str_ps2Pair Output column name for second pseudoscalar daughter pair indices
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with pseudoscalar pair columns
+ *
+ * @note Only considers opposite-charge pairs
+ * @note Returns {-1, -1} if no valid pairing is found or a daughter is not in the view
+ */
+ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df, const std::string &daughterIdx, const std::string &str_pfcand_view, const std::string &str_ps1Pair,
+                                const std::string &str_ps2Pair) {
+  auto pairs = [](const ROOT::RVec<int> &daughterIdx, const PFCandView &view) {
+    std::array<int, 4> daughters = {-1, -1, -1, -1};
+    std::array<int, 4> positions;
+    pairing::FourBodyPairing best;
+    if (daughterIdx.size() == 4) {
+      daughters = {daughterIdx[0], daughterIdx[1], daughterIdx[2], daughterIdx[3]};
+      std::sort(daughters.begin(), daughters.end());
+      if (pairing::ViewPositions(daughters, view, positions)) {
+        best = pairing::BestPairing(pairing::FourBodyFromView(view, positions), pairing::Criterion::MinMassDiff);
       }
     }
-    return partners;
+    return pairing::PairIndices(daughterIdx, daughters, best);
   };
 
-  auto df1 = df.Define(str_ps1Pair, minMassDiff, {daughterIdx, str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_pfcand_charge, str_pfcand_mask});
-  auto df2 = df1.Define(str_ps2Pair, partners, {daughterIdx, str_ps1Pair});
+  const std::string str_pairs = str_ps1Pair + "_pairing";
+  auto df1 = df.Define(str_pairs, pairs, {daughterIdx, str_pfcand_view});
+  return pairing::SplitPairs(df1, str_pairs, str_ps1Pair, str_ps2Pair);
+}
 
-  return df2;
+/**
+ * @brief Pair daughters into pseudoscalars with a selectable criterion, reading a PF candidate view
+ *
+ * Scores the three opposite-charge pairings of the four daughters once with
+ * pairing::BestPairing. Both pairs are in daughter order.
+ *
+ * @param df Input RDataFrame node
+ * @param daughterIdx Column name for daughter indices
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_ps1Pair Output column name for first pseudoscalar daughter pair indices
+ * @param str_ps2Pair Output column name for second pseudoscalar daughter pair indices
+ * @param criterion "min_mass_diff" (smallest |m1 - m2|, first pair holds the first daughter),
+ * "highest_pair_pt" (first pair is the highest-pT pair) or "mass_window" (smallest
+ * ((m1 - m)/σ)² + ((m2 - m)/σ)², first pair holds the first daughter)
+ * @param ps_mass Pseudoscalar mass hypothesis m, only used by "mass_window"
+ * @param ps_mass_width Mass resolution σ, only used by "mass_window"
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with pseudoscalar pair columns
+ *
+ * @note Both pairs are {-1, -1} if no valid pairing is found or a daughter is not in the view
+ * @note Throws std::invalid_argument for an unknown criterion
+ */
+ROOT::RDF::RNode GetPseudoScalarPairs(ROOT::RDF::RNode df, const std::string &daughterIdx, const std::string &str_pfcand_view, const std::string &str_ps1Pair,
+                                      const std::string &str_ps2Pair, const std::string &criterion, const float &ps_mass, const float &ps_mass_width) {
+  const auto ranking = pairing::CriterionFromName(criterion);
+  auto pairs = [ranking, ps_mass, ps_mass_width](const ROOT::RVec<int> &daughterIdx, const PFCandView &view) {
+    ROOT::RVec<int> pairIdxs = {-1, -1, -1, -1};
+    if (daughterIdx.size() != 4) {
+      return pairIdxs;
+    }
+    const std::array<int, 4> daughters = {daughterIdx[0], daughterIdx[1], daughterIdx[2], daughterIdx[3]};
+    std::array<int, 4> positions;
+    if (!pairing::ViewPositions(daughters, view, positions)) {
+      return pairIdxs;
+    }
+    const auto best = pairing::BestPairing(pairing::FourBodyFromView(view, positions), ranking, ps_mass, ps_mass_width);
+    if (!best.Valid()) {
+      return pairIdxs;
+    }
+    for (int k = 0; k < 2; k++) {
+      pairIdxs[2 * k] = daughters[best.pairs[k][0]];
+      pairIdxs[2 * k + 1] = daughters[best.pairs[k][1]];
+    }
+    return pairIdxs;
+  };
 
+  const std::string str_pairs = str_ps1Pair + "_pairing";
+  auto df1 = df.Define(str_pairs, pairs, {daughterIdx, str_pfcand_view});
+  return pairing::SplitPairs(df1, str_pairs, str_ps1Pair, str_ps2Pair);
 }
 
 /**
@@ -599,116 +1209,390 @@ ROOT::RDF::RNode GetMinMassDiff(ROOT::RDF::RNode df, const std::string &daughter
  * 
  * This function computes PF-based relative isolation for each Higgs daughter using the
  * standard formula with pileup correction (delta-beta method). Isolation includes charged
- * hadrons from primary vertex, neutral hadrons, and photons within ΔR < 0.4, corrected
+ * hadrons from primary vertex, neutral hadrons, and photons within the isolation cone, corrected
  * for pileup using charged hadrons not from the primary vertex.
+ *
+ * The cone sums of all four daughters are filled in a single pass over the PF candidates
+ * (see iso::FillConeSums), without per-event memory allocations.
  * 
  * @param df Input RDataFrame node
  * @param str_pf_cand_iso Output column name for relative isolation values
  * @param str_pfcand_pt Column name for PF candidate transverse momentum
  * @param str_pfcand_eta Column name for PF candidate pseudorapidity
  * @param str_pfcand_phi Column name for PF candidate azimuthal angle
- * @param str_pfcand_mass Column name for PF candidate mass
+ * @param str_pfcand_mass Column name for PF candidate mass (not used, the daughter mass does not enter the isolation)
  * @param str_higgsdaughters Column name for Higgs daughter indices
  * @param str_pfcand_charged_hadron_mask Column name for charged hadron mask
  * @param str_pfcand_neutral_hadron_mask Column name for neutral hadron mask
  * @param str_pfcand_photon_mask Column name for photon mask
  * @param str_pfcand_fromPV_mask Column name for primary vertex association mask
+ * @param cone ΔR of the isolation cone, can be overridden at runtime as daughter_iso_cone (see haa_parameters.hxx)
+ * @param deltabeta_factor Factor of the delta-beta pileup correction, can be overridden at runtime as daughter_iso_deltabeta
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with isolation column
  * 
- * @note Uses ΔR < 0.4 cone for isolation calculation
- * @note Applies delta-beta pileup correction with factor 0.5
- * @note Assumes kaon mass (0.493677 GeV) for daughter particles
- * @note Excludes the daughter itself from its isolation sum
+ * @note Excludes the daughters from the charged hadron isolation sums
+ * @note Returns default_float for all daughters if a daughter index is invalid
  */
 ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df, const std::string &str_pf_cand_iso, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi, 
                            const std::string &str_pfcand_mass, const std::string &str_higgsdaughters, const std::string &str_pfcand_charged_hadron_mask, 
-                           const std::string &str_pfcand_neutral_hadron_mask, const std::string &str_pfcand_photon_mask, const std::string &str_pfcand_fromPV_mask) {
-  auto iso = [](const ROOT::RVec<float> pfcand_pt, const ROOT::RVec<float> pfcand_eta, const ROOT::RVec<float> pfcand_phi, const ROOT::RVec<float> pfcand_mass, 
-                const ROOT::RVec<int> higgsdaughters, const ROOT::RVec<int> pfcand_charged_hadron_mask, const ROOT::RVec<int> pfcand_neutral_hadron_mask,
-                const ROOT::RVec<int> pfcand_photon_mask, const ROOT::RVec<int> pfcand_fromPV_mask) {
-    ROOT::RVec<float> Rel_isos;
-
-    auto daughter_pts =  ROOT::VecOps::Take(pfcand_pt, higgsdaughters);
-    auto daughter_etas = ROOT::VecOps::Take(pfcand_eta, higgsdaughters);
-    auto daughter_phis = ROOT::VecOps::Take(pfcand_phi, higgsdaughters);
-    ROOT::RVec<float> daughter_masses = {0.493677, 0.493677, 0.493677, 0.493677};
-
-    auto daughter_p4s = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(daughter_pts, daughter_etas, daughter_phis, daughter_masses);
-
-    auto non_PU_charged_hadron_indices = ROOT::VecOps::Nonzero(pfcand_charged_hadron_mask && pfcand_fromPV_mask);
-    auto neutral_hadron_indices = ROOT::VecOps::Nonzero(pfcand_neutral_hadron_mask);
-    auto photon_indices = ROOT::VecOps::Nonzero(pfcand_photon_mask);
-    auto PU_charged_hadron_indices = ROOT::VecOps::Nonzero(pfcand_charged_hadron_mask && !pfcand_fromPV_mask);
-
-    auto charged_hadron_pts_from_pv = ROOT::VecOps::Take(pfcand_pt, non_PU_charged_hadron_indices);
-    auto charged_hadron_etas_from_pv = ROOT::VecOps::Take(pfcand_eta, non_PU_charged_hadron_indices);
-    auto charged_hadron_phis_from_pv = ROOT::VecOps::Take(pfcand_phi, non_PU_charged_hadron_indices);
-    auto charged_hadron_masses_from_pv = ROOT::VecOps::Take(pfcand_mass, non_PU_charged_hadron_indices);
-
-    auto charged_hadron_p4s_from_pv = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(charged_hadron_pts_from_pv, charged_hadron_etas_from_pv, charged_hadron_phis_from_pv, charged_hadron_masses_from_pv);
-
-    auto neutral_hadron_pts = ROOT::VecOps::Take(pfcand_pt, neutral_hadron_indices);
-    auto neutral_hadron_etas = ROOT::VecOps::Take(pfcand_eta, neutral_hadron_indices);
-    auto neutral_hadron_phis = ROOT::VecOps::Take(pfcand_phi, neutral_hadron_indices);
-    auto neutral_hadron_masses = ROOT::VecOps::Take(pfcand_mass, neutral_hadron_indices);
-
-    auto neutral_hadron_p4s = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(neutral_hadron_pts, neutral_hadron_etas, neutral_hadron_phis, neutral_hadron_masses);
-
-    auto photon_pts = ROOT::VecOps::Take(pfcand_pt, photon_indices);
-    auto photon_etas = ROOT::VecOps::Take(pfcand_eta, photon_indices);
-    auto photon_phis = ROOT::VecOps::Take(pfcand_phi, photon_indices);
-    auto photon_masses = ROOT::VecOps::Take(pfcand_mass, photon_indices);
-
-    auto photon_p4s = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(photon_pts, photon_etas, photon_phis, photon_masses);
-
-    auto charged_hadron_pts_not_from_pv = ROOT::VecOps::Take(pfcand_pt, PU_charged_hadron_indices);
-    auto charged_hadron_etas_not_from_pv = ROOT::VecOps::Take(pfcand_eta, PU_charged_hadron_indices);
-    auto charged_hadron_phis_not_from_pv = ROOT::VecOps::Take(pfcand_phi, PU_charged_hadron_indices);
-    auto charged_hadron_masses_not_from_pv = ROOT::VecOps::Take(pfcand_mass, PU_charged_hadron_indices);
-
-    auto charged_hadron_p4s_not_from_pv = ROOT::VecOps::Construct<ROOT::Math::PtEtaPhiMVector>(charged_hadron_pts_not_from_pv, charged_hadron_etas_not_from_pv, charged_hadron_phis_not_from_pv, charged_hadron_masses_not_from_pv);
-    
-    for (int i = 0; i < daughter_p4s.size(); i++) {
-      float sum_charged_hadron_pt_from_pv = 0;
-      float sum_neutral_hadron_pt = 0;
-      float sum_photon_pt = 0;
-      float sum_charged_hadron_pt_not_from_pv = 0;
-      
-      for (int j = 0; j < charged_hadron_p4s_from_pv.size(); j++) {
-        float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], charged_hadron_p4s_from_pv[j]);
-        if (dR < 0.4 && std::find(higgsdaughters.begin(), higgsdaughters.end(), non_PU_charged_hadron_indices[j]) == higgsdaughters.end()) {
-          sum_charged_hadron_pt_from_pv += charged_hadron_pts_from_pv[j];
-        }
+                           const std::string &str_pfcand_neutral_hadron_mask, const std::string &str_pfcand_photon_mask, const std::string &str_pfcand_fromPV_mask,
+                           const float &cone, const float &deltabeta_factor) {
+  const float iso_cone = parameters::Get("daughter_iso_cone", cone);
+  const float deltabeta = parameters::Get("daughter_iso_deltabeta", deltabeta_factor);
+  auto iso = [iso_cone, deltabeta](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi,
+                const ROOT::RVec<int> &higgsdaughters, const ROOT::RVec<int> &pfcand_charged_hadron_mask, const ROOT::RVec<int> &pfcand_neutral_hadron_mask,
+                const ROOT::RVec<int> &pfcand_photon_mask, const ROOT::RVec<int> &pfcand_fromPV_mask) {
+    ROOT::RVec<float> Rel_isos(iso::ndaughters, default_float);
+    if (higgsdaughters.size() < iso::ndaughters) {
+      return Rel_isos;
+    }
+    for (int i = 0; i < iso::ndaughters; i++) {
+      if (higgsdaughters[i] < 0 || higgsdaughters[i] >= static_cast<int>(pfcand_pt.size())) {
+        return Rel_isos;
       }
-      
-      for (int j = 0; j < neutral_hadron_p4s.size(); j++) {
-        float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], neutral_hadron_p4s[j]);
-        if (dR < 0.4) {
-          sum_neutral_hadron_pt += neutral_hadron_pts[j];
-        }
+    }
+
+    const auto sums = iso::FillConeSums(pfcand_pt, pfcand_eta, pfcand_phi, higgsdaughters, pfcand_charged_hadron_mask,
+                                        pfcand_neutral_hadron_mask, pfcand_photon_mask, pfcand_fromPV_mask, iso_cone);
+    for (int i = 0; i < iso::ndaughters; i++) {
+      Rel_isos[i] = iso::RelativeIsolation(sums, i, pfcand_pt[higgsdaughters[i]], deltabeta);
+    }
+
+    return Rel_isos;
+  };
+
+
+  auto df1 = df.Define(str_pf_cand_iso, iso, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_higgsdaughters, str_pfcand_charged_hadron_mask, str_pfcand_neutral_hadron_mask, str_pfcand_photon_mask, str_pfcand_fromPV_mask});
+  return df1;
+}
+
+/**
+ * @brief Calculate relative isolation for Higgs daughter candidates, using the η-φ grid
+ *
+ * Same isolation as pfCandIso, but the cone sums of each daughter only visit the PF
+ * candidates in the neighbouring cells of the η-φ grid (see GetEtaPhiGrid). The candidates
+ * are added in the same order, so the isolation values are identical.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pf_cand_iso Output column name for relative isolation values
+ * @param str_pfcand_pt Column name for PF candidate transverse momentum
+ * @param str_pfcand_eta Column name for PF candidate pseudorapidity
+ * @param str_pfcand_phi Column name for PF candidate azimuthal angle
+ * @param str_pfcand_mass Column name for PF candidate mass (not used)
+ * @param str_higgsdaughters Column name for Higgs daughter indices
+ * @param str_pfcand_charged_hadron_mask Column name for charged hadron mask
+ * @param str_pfcand_neutral_hadron_mask Column name for neutral hadron mask
+ * @param str_pfcand_photon_mask Column name for photon mask
+ * @param str_pfcand_fromPV_mask Column name for primary vertex association mask
+ * @param str_pfcand_grid Column name for the η-φ grid of all PF candidates, cell size >= cone
+ * @param cone ΔR of the isolation cone, can be overridden at runtime as daughter_iso_cone
+ * @param deltabeta_factor Factor of the delta-beta pileup correction, can be overridden at runtime as daughter_iso_deltabeta
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with isolation column
+ *
+ * @note Returns default_float for all daughters if a daughter index is invalid
+ */
+ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df, const std::string &str_pf_cand_iso, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta, const std::string &str_pfcand_phi,
+                           const std::string &str_pfcand_mass, const std::string &str_higgsdaughters, const std::string &str_pfcand_charged_hadron_mask,
+                           const std::string &str_pfcand_neutral_hadron_mask, const std::string &str_pfcand_photon_mask, const std::string &str_pfcand_fromPV_mask,
+                           const std::string &str_pfcand_grid, const float &cone, const float &deltabeta_factor) {
+  const float iso_cone = parameters::Get("daughter_iso_cone", cone);
+  const float deltabeta = parameters::Get("daughter_iso_deltabeta", deltabeta_factor);
+  auto iso = [iso_cone, deltabeta](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi,
+                const ROOT::RVec<int> &higgsdaughters, const ROOT::RVec<int> &pfcand_charged_hadron_mask, const ROOT::RVec<int> &pfcand_neutral_hadron_mask,
+                const ROOT::RVec<int> &pfcand_photon_mask, const ROOT::RVec<int> &pfcand_fromPV_mask, const EtaPhiGrid &grid) {
+    ROOT::RVec<float> Rel_isos(iso::ndaughters, default_float);
+    if (higgsdaughters.size() < iso::ndaughters) {
+      return Rel_isos;
+    }
+    for (int i = 0; i < iso::ndaughters; i++) {
+      if (higgsdaughters[i] < 0 || higgsdaughters[i] >= static_cast<int>(pfcand_pt.size())) {
+        return Rel_isos;
       }
-      for (int j = 0; j < photon_p4s.size(); j++) {
-        float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], photon_p4s[j]);
-        if (dR < 0.4) {
-          sum_photon_pt += photon_pts[j];
-        }
+    }
+
+    const auto sums = iso::FillConeSums(pfcand_pt, pfcand_eta, pfcand_phi, higgsdaughters, pfcand_charged_hadron_mask,
+                                        pfcand_neutral_hadron_mask, pfcand_photon_mask, pfcand_fromPV_mask, iso_cone, grid);
+    for (int i = 0; i < iso::ndaughters; i++) {
+      Rel_isos[i] = iso::RelativeIsolation(sums, i, pfcand_pt[higgsdaughters[i]], deltabeta);
+    }
+
+    return Rel_isos;
+  };
+
+  auto df1 = df.Define(str_pf_cand_iso, iso, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_higgsdaughters, str_pfcand_charged_hadron_mask, str_pfcand_neutral_hadron_mask, str_pfcand_photon_mask, str_pfcand_fromPV_mask, str_pfcand_grid});
+  return df1;
+}
+
+/**
+ * @brief Calculate the relative isolation of the Higgs daughters for several working points in one pass
+ *
+ * Same isolation as pfCandIso, for the daughters of each working point of ClosestToHiggsMassScan
+ * with its own cone size. All cone sums are filled in a single pass over the PF candidates
+ * (see iso::FillConeSumsScan), working points that selected the same daughters share the ΔR
+ * computation.
+ *
+ * @param df Input RDataFrame node
+ * @param str_pf_cand_iso Output column name for the relative isolations, four per working point
+ * @param str_pfcand_pt Column name for PF candidate transverse momentum
+ * @param str_pfcand_eta Column name for PF candidate pseudorapidity
+ * @param str_pfcand_phi Column name for PF candidate azimuthal angle
+ * @param str_pfcand_mass Column name for PF candidate mass (not used)
+ * @param str_higgsdaughters Column name for the daughter indices, four per working point
+ * @param str_pfcand_charged_hadron_mask Column name for charged hadron mask
+ * @param str_pfcand_neutral_hadron_mask Column name for neutral hadron mask
+ * @param str_pfcand_photon_mask Column name for photon mask
+ * @param str_pfcand_fromPV_mask Column name for primary vertex association mask
+ * @param cones ΔR of the isolation cone of each working point
+ * @param deltabeta_factor Factor of the delta-beta pileup correction, can be overridden at runtime as daughter_iso_deltabeta
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with isolation column
+ *
+ * @note Returns default_float for all daughters of a working point with an invalid daughter index
+ */
+ROOT::RDF::RNode pfCandIsoScan(ROOT::RDF::RNode df, const std::string &str_pf_cand_iso, const std::string &str_pfcand_pt, const std::string &str_pfcand_eta,
+                               const std::string &str_pfcand_phi, const std::string &str_pfcand_mass, const std::string &str_higgsdaughters,
+                               const std::string &str_pfcand_charged_hadron_mask, const std::string &str_pfcand_neutral_hadron_mask,
+                               const std::string &str_pfcand_photon_mask, const std::string &str_pfcand_fromPV_mask,
+                               const std::vector<float> &cones, const float &deltabeta_factor) {
+  const float deltabeta = parameters::Get("daughter_iso_deltabeta", deltabeta_factor);
+  auto iso = [cones, deltabeta](const ROOT::RVec<float> &pfcand_pt, const ROOT::RVec<float> &pfcand_eta, const ROOT::RVec<float> &pfcand_phi,
+                                const ROOT::RVec<int> &higgsdaughters, const ROOT::RVec<int> &pfcand_charged_hadron_mask, const ROOT::RVec<int> &pfcand_neutral_hadron_mask,
+                                const ROOT::RVec<int> &pfcand_photon_mask, const ROOT::RVec<int> &pfcand_fromPV_mask) {
+    ROOT::RVec<float> Rel_isos(iso::ndaughters * cones.size(), default_float);
+    const auto sums = iso::FillConeSumsScan(pfcand_pt, pfcand_eta, pfcand_phi, higgsdaughters, pfcand_charged_hadron_mask,
+                                            pfcand_neutral_hadron_mask, pfcand_photon_mask, pfcand_fromPV_mask, cones);
+    for (std::size_t w = 0; w < cones.size() && iso::ndaughters * w + 3 < higgsdaughters.size(); w++) {
+      bool valid = true;
+      for (int i = 0; i < iso::ndaughters; i++) {
+        const int idx = higgsdaughters[iso::ndaughters * w + i];
+        valid = valid && idx >= 0 && idx < static_cast<int>(pfcand_pt.size());
       }
-      for (int j = 0; j < charged_hadron_p4s_not_from_pv.size(); j++) {
-        float dR = ROOT::Math::VectorUtil::DeltaR(daughter_p4s[i], charged_hadron_p4s_not_from_pv[j]);
-        if (dR < 0.4 && std::find(higgsdaughters.begin(), higgsdaughters.end(), PU_charged_hadron_indices[j]) == higgsdaughters.end()) {
-          sum_charged_hadron_pt_not_from_pv += charged_hadron_pts_not_from_pv[j];
-        }
+      if (!valid) {
+        continue;
+      }
+      for (int i = 0; i < iso::ndaughters; i++) {
+        Rel_isos[iso::ndaughters * w + i] = iso::RelativeIsolation(sums[w], i, pfcand_pt[higgsdaughters[iso::ndaughters * w + i]], deltabeta);
       }
-      float Rel_iso = (sum_charged_hadron_pt_from_pv + std::max(0.0, sum_neutral_hadron_pt + sum_photon_pt - 0.5*sum_charged_hadron_pt_not_from_pv))/daughter_p4s[i].Pt();
-      Rel_isos.push_back(Rel_iso);
     }
-
     return Rel_isos;
   };
 
+  auto df1 = df.Define(str_pf_cand_iso, iso, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_higgsdaughters, str_pfcand_charged_hadron_mask, str_pfcand_neutral_hadron_mask, str_pfcand_photon_mask, str_pfcand_fromPV_mask});
+  return df1;
+}
+
+/**
+ * @brief Reconstruct the full Higgs candidate in a single column
+ *
+ * Computes in one call what the chain of daughter four-vectors (lorentzvector::buildFromPFCand),
+ * daughter and Higgs kinematics (GetHiggsP4, lorentzvector::Get*), the pseudoscalar pairing
+ * (GetMinMassDiff) and the pseudoscalar masses and ΔR (lorentzvector::GetMass, getDaughterDeltaR)
+ * computes in separate columns, and stores the result in a HiggsCandidate struct. The daughter
+ * four-vectors get the kaon mass as in lorentzvector::buildKaon; the pairing uses
+ * the PF candidate masses as in GetMinMassDiff. The members are exposed as columns by
+ * UnpackHiggsCandidate.
+ *
+ * In the same pass, the daughter, Higgs and pseudoscalar masses are computed for every mass
+ * hypothesis of the daughters (pion, kaon and nanoAOD mass, see MassHypothesis) and exposed by
+ * UnpackMassHypotheses, so both hypotheses can be studied with one executable. The pairing
+ * does not depend on the hypothesis.
+ *
+ * @param df Input RDataFrame node
+ * @param str_higgsdaughters Column name for Higgs daughter indices
+ * @param str_pfcand_view Column name for the PF candidate view
+ * @param str_daughter_isos Column name for the daughter isolations (see pfCandIso)
+ * @param str_pfcand_mass Column name for PF candidate mass, used by the nanoAOD mass hypothesis
+ * @param str_higgs_candidate Output column name for the Higgs candidate
+ * @param kaon_mass Mass assigned to the daughters, can be overridden at runtime as kaon_mass (see haa_parameters.hxx)
+ * @param pion_mass Mass of the pion hypothesis, can be overridden at runtime as pion_mass
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the Higgs candidate column
+ *
+ * @note All kinematic members are default_float if a daughter index is invalid, the pseudoscalar
+ *       members are default_float if no opposite-charge pairing is found
+ */
+ROOT::RDF::RNode GetHiggsCandidate(ROOT::RDF::RNode df, const std::string &str_higgsdaughters, const std::string &str_pfcand_view,
+                                   const std::string &str_daughter_isos, const std::string &str_pfcand_mass, const std::string &str_higgs_candidate,
+                                   const float &kaon_mass, const float &pion_mass) {
+  const double daughter_mass = parameters::Get("kaon_mass", kaon_mass);
+  const double pion_hypothesis = parameters::Get("pion_mass", pion_mass);
+  auto candidate = [daughter_mass, pion_hypothesis](const ROOT::RVec<int> &higgsdaughters, const PFCandView &view, const ROOT::RVec<float> &daughter_isos,
+                                                    const ROOT::RVec<float> &pfcand_mass) {
+    HiggsCandidate cand;
+    cand.daughters = {-1, -1, -1, -1};
+    cand.daughter_pt.fill(default_float);
+    cand.daughter_eta.fill(default_float);
+    cand.daughter_phi.fill(default_float);
+    cand.daughter_mass.fill(default_float);
+    cand.daughter_iso.fill(default_float);
+    cand.pt = default_float;
+    cand.eta = default_float;
+    cand.phi = default_float;
+    cand.mass = default_float;
+    cand.ps_daughters = {{{-1, -1}, {-1, -1}}};
+    cand.ps_mass.fill(default_float);
+    cand.ps_deltaR.fill(default_float);
+    for (int h = 0; h < nMassHypotheses; h++) {
+      cand.hypothesis_daughter_mass[h].fill(default_float);
+      cand.hypothesis_mass[h] = default_float;
+      cand.hypothesis_ps_mass[h].fill(default_float);
+    }
+
+    if (higgsdaughters.size() < 4) {
+      return cand;
+    }
+    std::array<ROOT::Math::PtEtaPhiMVector, 4> p4s;
+    for (int i = 0; i < 4; i++) {
+      const int pos = view.Position(higgsdaughters[i]);
+      if (pos < 0) {
+        return cand;
+      }
+      p4s[i] = ROOT::Math::PtEtaPhiMVector(view.pt[pos], view.eta[pos], view.phi[pos], daughter_mass);
+    }
+    ROOT::Math::PtEtaPhiMVector H_p4 = p4s[0] + p4s[1] + p4s[2] + p4s[3];
+    for (int i = 0; i < 4; i++) {
+      cand.daughters[i] = higgsdaughters[i];
+      cand.daughter_pt[i] = p4s[i].pt();
+      cand.daughter_eta[i] = p4s[i].eta();
+      cand.daughter_phi[i] = p4s[i].phi();
+      cand.daughter_mass[i] = p4s[i].mass();
+      if (i < static_cast<int>(daughter_isos.size())) {
+        cand.daughter_iso[i] = daughter_isos[i];
+      }
+    }
+    cand.pt = H_p4.pt();
+    cand.eta = H_p4.eta();
+    cand.phi = H_p4.phi();
+    cand.mass = H_p4.mass();
+
+    std::array<int, 4> daughters = {higgsdaughters[0], higgsdaughters[1], higgsdaughters[2], higgsdaughters[3]};
+    std::sort(daughters.begin(), daughters.end());
+    std::array<int, 4> positions;
+    pairing::ViewPositions(daughters, view, positions);
+    const auto best = pairing::BestPairing(pairing::FourBodyFromView(view, positions), pairing::Criterion::MinMassDiff);
+    if (!best.Valid()) {
+      return cand;
+    }
+    const std::array<int, 2> ps1 = {daughters[best.pairs[0][0]], daughters[best.pairs[0][1]]};
+    const auto ps2 = pairing::Partners(higgsdaughters, ps1);
+    cand.ps_daughters = {ps1, ps2};
+    // slots (0-3, in the order of the Higgs daughter indices) of the pseudoscalar daughters
+    std::array<std::array<int, 2>, 2> ps_slots;
+    for (int k = 0; k < 2; k++) {
+      for (int j = 0; j < 2; j++) {
+        ps_slots[k][j] = std::find(higgsdaughters.begin(), higgsdaughters.begin() + 4, cand.ps_daughters[k][j]) - higgsdaughters.begin();
+      }
+      cand.ps_mass[k] = (p4s[ps_slots[k][0]] + p4s[ps_slots[k][1]]).mass();
+      cand.ps_deltaR[k] = ROOT::Math::VectorUtil::DeltaR(p4s[ps_slots[k][0]], p4s[ps_slots[k][1]]);
+    }
+
+    for (int h = 0; h < nMassHypotheses; h++) {
+      std::array<ROOT::Math::PtEtaPhiMVector, 4> hypothesis_p4s;
+      for (int i = 0; i < 4; i++) {
+        double mass = daughter_mass;
+        if (h == PionMass) {
+          mass = pion_hypothesis;
+        } else if (h == NanoAODMass) {
+          mass = pfcand_mass[higgsdaughters[i]];
+        }
+        hypothesis_p4s[i] = ROOT::Math::PtEtaPhiMVector(p4s[i].pt(), p4s[i].eta(), p4s[i].phi(), mass);
+        cand.hypothesis_daughter_mass[h][i] = hypothesis_p4s[i].mass();
+      }
+      cand.hypothesis_mass[h] = (hypothesis_p4s[0] + hypothesis_p4s[1] + hypothesis_p4s[2] + hypothesis_p4s[3]).mass();
+      for (int k = 0; k < 2; k++) {
+        cand.hypothesis_ps_mass[h][k] = (hypothesis_p4s[ps_slots[k][0]] + hypothesis_p4s[ps_slots[k][1]]).mass();
+      }
+    }
+    return cand;
+  };
+  auto df1 = df.Define(str_higgs_candidate, candidate, {str_higgsdaughters, str_pfcand_view, str_daughter_isos, str_pfcand_mass});
+  return df1;
+}
+
+/**
+ * @brief Expose the members of the Higgs candidate as scalar columns
+ *
+ * Every output column only reads one member of the HiggsCandidate struct. The output names
+ * have to be given in the following order:
+ *
+ * H_pt, H_eta, H_phi, H_mass, ps_1_mass, ps_2_mass, ps_1_deltaR, ps_2_deltaR,
+ * followed by pt, eta, phi, mass and iso of each of the four daughters (d1_pt, ..., d4_iso)
+ *
+ * @param df Input RDataFrame node
+ * @param str_higgs_candidate Column name for the Higgs candidate
+ * @param outputs Output column names, 28 in the order given above
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the Higgs candidate quantities
+ */
+ROOT::RDF::RNode UnpackHiggsCandidate(ROOT::RDF::RNode df, const std::string &str_higgs_candidate, const std::vector<std::string> &outputs) {
+  if (outputs.size() != 28) {
+    Logger::get("UnpackHiggsCandidate")->error("Expected 28 output columns, got {}", outputs.size());
+    throw std::invalid_argument("UnpackHiggsCandidate: wrong number of output columns");
+  }
+  auto df1 = df.Define(outputs[0], [](const HiggsCandidate &cand) { return cand.pt; }, {str_higgs_candidate})
+                 .Define(outputs[1], [](const HiggsCandidate &cand) { return cand.eta; }, {str_higgs_candidate})
+                 .Define(outputs[2], [](const HiggsCandidate &cand) { return cand.phi; }, {str_higgs_candidate})
+                 .Define(outputs[3], [](const HiggsCandidate &cand) { return cand.mass; }, {str_higgs_candidate});
+  for (int k = 0; k < 2; k++) {
+    df1 = df1.Define(outputs[4 + k], [k](const HiggsCandidate &cand) { return cand.ps_mass[k]; }, {str_higgs_candidate});
+    df1 = df1.Define(outputs[6 + k], [k](const HiggsCandidate &cand) { return cand.ps_deltaR[k]; }, {str_higgs_candidate});
+  }
+  for (int i = 0; i < 4; i++) {
+    const int offset = 8 + 5 * i;
+    df1 = df1.Define(outputs[offset], [i](const HiggsCandidate &cand) { return cand.daughter_pt[i]; }, {str_higgs_candidate});
+    df1 = df1.Define(outputs[offset + 1], [i](const HiggsCandidate &cand) { return cand.daughter_eta[i]; }, {str_higgs_candidate});
+    df1 = df1.Define(outputs[offset + 2], [i](const HiggsCandidate &cand) { return cand.daughter_phi[i]; }, {str_higgs_candidate});
+    df1 = df1.Define(outputs[offset + 3], [i](const HiggsCandidate &cand) { return cand.daughter_mass[i]; }, {str_higgs_candidate});
+    df1 = df1.Define(outputs[offset + 4], [i](const HiggsCandidate &cand) { return cand.daughter_iso[i]; }, {str_higgs_candidate});
+  }
+  return df1;
+}
 
-  auto df1 = df.Define(str_pf_cand_iso, iso, {str_pfcand_pt, str_pfcand_eta, str_pfcand_phi, str_pfcand_mass, str_higgsdaughters, str_pfcand_charged_hadron_mask, str_pfcand_neutral_hadron_mask, str_pfcand_photon_mask, str_pfcand_fromPV_mask});
+/**
+ * @brief Expose the masses of the Higgs candidate for all daughter mass hypotheses as vector columns
+ *
+ * The entries of each column are in the order of MassHypothesis (pion, kaon, nanoAOD mass).
+ * The output names have to be given in the following order:
+ *
+ * H_mass, ps_1_mass, ps_2_mass (one entry per hypothesis), daughter masses (four entries per
+ * hypothesis, hypothesis after hypothesis)
+ *
+ * @param df Input RDataFrame node
+ * @param str_higgs_candidate Column name for the Higgs candidate
+ * @param outputs Output column names, 4 in the order given above
+ *
+ * @return ROOT::RDF::RNode Updated RDataFrame with the mass hypothesis columns
+ *
+ * @note The masses are default_float if the candidate or its pairing is not valid
+ */
+ROOT::RDF::RNode UnpackMassHypotheses(ROOT::RDF::RNode df, const std::string &str_higgs_candidate, const std::vector<std::string> &outputs) {
+  if (outputs.size() != 4) {
+    Logger::get("UnpackMassHypotheses")->error("Expected 4 output columns, got {}", outputs.size());
+    throw std::invalid_argument("UnpackMassHypotheses: wrong number of output columns");
+  }
+  auto df1 = df.Define(outputs[0], [](const HiggsCandidate &cand) {
+                 return ROOT::RVec<float>(cand.hypothesis_mass.begin(), cand.hypothesis_mass.end());
+               }, {str_higgs_candidate});
+  for (int k = 0; k < 2; k++) {
+    df1 = df1.Define(outputs[1 + k], [k](const HiggsCandidate &cand) {
+      ROOT::RVec<float> masses(nMassHypotheses);
+      for (int h = 0; h < nMassHypotheses; h++) {
+        masses[h] = cand.hypothesis_ps_mass[h][k];
+      }
+      return masses;
+    }, {str_higgs_candidate});
+  }
+  df1 = df1.Define(outputs[3], [](const HiggsCandidate &cand) {
+    ROOT::RVec<float> masses(4 * nMassHypotheses);
+    for (int h = 0; h < nMassHypotheses; h++) {
+      for (int i = 0; i < 4; i++) {
+        masses[4 * h + i] = cand.hypothesis_daughter_mass[h][i];
+      }
+    }
+    return masses;
+  }, {str_higgs_candidate});
   return df1;
 }
 
@@ -726,15 +1610,18 @@ ROOT::RDF::RNode pfCandIso(ROOT::RDF::RNode df, const std::string &str_pf_cand_i
  * 
  * @return ROOT::RDF::RNode Updated RDataFrame with generator pT column
  * 
- * @note Returns the pT of the first particle passing the mask
+ * @note Returns the pT of the first particle passing the mask, default_float if none passes
  */
 ROOT::RDF::RNode getGenPt(ROOT::RDF::RNode df, const std::string &str_genpart_mask, const std::string &str_genpart_pt, const std::string &str_gen_pt){ 
   auto df1 = df.Define(
 		       str_gen_pt,
-		       [](const ROOT::RVec<int> genpart_mask, const ROOT::RVec<float> genpart_pt){
-			 auto original_genpart_indices = ROOT::VecOps::Nonzero(genpart_mask);
-			 const auto good_pts = ROOT::VecOps::Take(genpart_pt, original_genpart_indices);
-			 return good_pts[0];
+		       [](const ROOT::RVec<int> &genpart_mask, const ROOT::RVec<float> &genpart_pt){
+			 for (std::size_t i = 0; i < genpart_mask.size(); i++) {
+			   if (genpart_mask[i]) {
+			     return genpart_pt[i];
+			   }
+			 }
+			 return default_float;
 		       },
 		       {str_genpart_mask, str_genpart_pt}
 		       );
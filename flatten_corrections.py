@@ -0,0 +1,250 @@
+"""
+Flatten binned correctionlib corrections into dense lookup tables.
+
+The tables are read by the scale factor producers in cpp_addons/src/custom_sfs.cxx
+(haa::flat::Table), which evaluate a correction with one bin lookup per object instead
+of walking the correctionlib tree. The producers compare every bin of a table with
+correctionlib when they are set up, so a table that does not reproduce its correction
+stops the run.
+
+Supported are corrections built from binning, multibinning and category nodes with
+numbers as leaves. The string inputs are either fixed to a value (--fix) or enumerate
+the variations that are stored next to each other in every bin (--variations). All
+binnings of a numeric input must have the same edges and flow.
+
+Usage:
+    python flatten_corrections.py FILE NAME [NAME ...] --output-dir DIR \\
+        [--variations INPUT=KEY,KEY,...] [--fix INPUT=VALUE ...]
+
+e.g. for the muon scale factors and the pileup weights of 2018:
+    python flatten_corrections.py data/jsonpog-integration/POG/MUO/2018_UL/muon_Z.json.gz \\
+        NUM_TightID_DEN_TrackerMuons NUM_TightRelIso_DEN_TightIDandIPCut \\
+        NUM_IsoMu24_DEN_CutBasedIdTight_and_PFIsoTight \\
+        --variations scale_factors=nominal,systup,systdown --output-dir data/flat_corrections/2018
+    python flatten_corrections.py data/jsonpog-integration/POG/LUM/2018_UL/puWeights.json.gz \\
+        Collisions18_UltraLegacy_goldenJSON --variations weights=nominal,up,down \\
+        --output-dir data/flat_corrections/2018
+
+Each correction is written to DIR/NAME.flat.
+"""
+
+import argparse
+import bisect
+import gzip
+import itertools
+import json
+import os
+
+
+class FlattenError(Exception):
+    pass
+
+
+def load_corrections(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        data = json.load(f)
+    return {correction["name"]: correction for correction in data["corrections"]}
+
+
+def read_edges(edges):
+    """Edges of a binning as ("uniform", n, low, high) or ("edges", [edges])"""
+    if isinstance(edges, dict):
+        return ("uniform", edges["n"], float(edges["low"]), float(edges["high"]))
+    return ("edges", [float(edge) for edge in edges])
+
+
+def n_bins(edges):
+    return edges[1] if edges[0] == "uniform" else len(edges[1]) - 1
+
+
+def find_bin(edges, flow, x):
+    """Bin of x with the arithmetic of correctionlib, None for a flow value"""
+    if edges[0] == "uniform":
+        _, n, low, high = edges
+    else:
+        n, low, high = len(edges[1]) - 1, edges[1][0], edges[1][-1]
+    if x < low or x >= high:
+        if flow == "clamp":
+            return 0 if x < low else n - 1
+        if flow == "error":
+            raise FlattenError(f"value {x} outside of the binning")
+        return None
+    if edges[0] == "uniform":
+        return min(int((x - low) / (high - low) * n), n - 1)
+    return bisect.bisect_right(edges[1], x) - 1
+
+
+def center(edges, i):
+    if edges[0] == "uniform":
+        _, n, low, high = edges
+        return low + (i + 0.5) * (high - low) / n
+    return 0.5 * (edges[1][i] + edges[1][i + 1])
+
+
+def read_flow(node):
+    flow = node.get("flow", "error")
+    if isinstance(flow, str):
+        return flow
+    if isinstance(flow, (int, float)):
+        return float(flow)
+    raise FlattenError(f"flow {flow} is not supported, only clamp, error or a number")
+
+
+def evaluate(node, inputs):
+    """Evaluate the correction tree at the inputs (a dict by input name)"""
+    while not isinstance(node, (int, float)):
+        if not isinstance(node, dict):
+            raise FlattenError(f"unsupported node {node}")
+        nodetype = node["nodetype"]
+        if nodetype == "binning":
+            edges = read_edges(node["edges"])
+            flow = read_flow(node)
+            i = find_bin(edges, flow, inputs[node["input"]])
+            node = flow if i is None else node["content"][i]
+        elif nodetype == "multibinning":
+            position = 0
+            flow = read_flow(node)
+            for name, edges in zip(node["inputs"], node["edges"]):
+                edges = read_edges(edges)
+                i = find_bin(edges, flow, inputs[name])
+                if i is None:
+                    position = None
+                    break
+                position = position * n_bins(edges) + i
+            node = flow if position is None else node["content"][position]
+        elif nodetype == "category":
+            value = inputs[node["input"]]
+            for item in node["content"]:
+                if item["key"] == value:
+                    node = item["value"]
+                    break
+            else:
+                if node.get("default") is None:
+                    raise FlattenError(f"no category {value} of input {node['input']}")
+                node = node["default"]
+        else:
+            raise FlattenError(f"{nodetype} nodes are not supported, only binned corrections")
+    return float(node)
+
+
+def collect_axes(node, categories, axes):
+    """Binning and flow of every numeric input reached with the given category values"""
+    if isinstance(node, (int, float)):
+        return
+    nodetype = node["nodetype"]
+    if nodetype == "binning":
+        binnings = [(node["input"], read_edges(node["edges"]))]
+        children = node["content"]
+    elif nodetype == "multibinning":
+        binnings = [(name, read_edges(edges)) for name, edges in zip(node["inputs"], node["edges"])]
+        children = node["content"]
+    elif nodetype == "category":
+        value = categories[node["input"]]
+        children = [item["value"] for item in node["content"] if item["key"] == value]
+        if not children and node.get("default") is not None:
+            children = [node["default"]]
+        binnings = []
+    else:
+        raise FlattenError(f"{nodetype} nodes are not supported, only binned corrections")
+    flow = read_flow(node) if binnings else None
+    for name, edges in binnings:
+        if name in axes and axes[name] != (edges, flow):
+            raise FlattenError(f"input {name} is binned differently in different nodes")
+        axes[name] = (edges, flow)
+    for child in children:
+        collect_axes(child, categories, axes)
+
+
+def parse_assignments(assignments):
+    result = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        result[name] = value
+    return result
+
+
+def flatten(correction, fixed, variations):
+    """Lines of the table of the correction"""
+    name = correction["name"]
+    variation_input, keys = None, ["-"]
+    if variations:
+        variation_input, _, keys = variations.partition("=")
+        keys = keys.split(",")
+    lines = ["flat_correction 1", f"name {name}"]
+    arguments = []
+    for item in correction["inputs"]:
+        if item["name"] == variation_input:
+            lines.append(f"input {item['name']} {item['type']} variation")
+        elif item["name"] in fixed:
+            lines.append(f"input {item['name']} {item['type']} fixed {fixed[item['name']]}")
+        elif item["type"] == "string":
+            raise FlattenError(f"string input {item['name']} of {name} has to be fixed or the variation input")
+        else:
+            lines.append(f"input {item['name']} {item['type']} argument")
+            arguments.append(item["name"])
+    lines.append(f"variations {len(keys)} {' '.join(keys)}")
+
+    def categories(key):
+        values = {k: int(v) if _input_type(correction, k) == "int" else v for k, v in fixed.items()}
+        if variation_input is not None:
+            values[variation_input] = key
+        return values
+
+    axes = {}
+    for key in keys:
+        collect_axes(correction["data"], categories(key), axes)
+    binned = [argument for argument in arguments if argument in axes]
+    for argument in binned:
+        edges, flow = axes[argument]
+        line = f"axis {arguments.index(argument)} "
+        if edges[0] == "uniform":
+            line += f"uniform {edges[1]} {edges[2]!r} {edges[3]!r}"
+        else:
+            line += f"edges {len(edges[1]) - 1} {' '.join(repr(edge) for edge in edges[1])}"
+        line += f" value {flow!r}" if isinstance(flow, float) else f" {flow}"
+        lines.append(line)
+
+    values = []
+    bins = [range(n_bins(axes[argument][0])) for argument in binned]
+    for cell in itertools.product(*bins):
+        inputs = {argument: 0.0 for argument in arguments}
+        for argument, i in zip(binned, cell):
+            inputs[argument] = center(axes[argument][0], i)
+        for key in keys:
+            values.append(evaluate(correction["data"], {**inputs, **categories(key)}))
+    lines.append(f"values {len(values)} {' '.join(repr(value) for value in values)}")
+    return lines
+
+
+def _input_type(correction, name):
+    for item in correction["inputs"]:
+        if item["name"] == name:
+            return item["type"]
+    raise FlattenError(f"{correction['name']} has no input {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten binned correctionlib corrections into lookup tables")
+    parser.add_argument("file", help="correctionlib json(.gz) file")
+    parser.add_argument("names", nargs="+", help="names of the corrections")
+    parser.add_argument("--output-dir", required=True, help="directory of the tables")
+    parser.add_argument("--variations", default=None, help="string input enumerating the variations, INPUT=KEY,KEY,...")
+    parser.add_argument("--fix", nargs="*", default=[], help="values of the other string inputs, INPUT=VALUE")
+    args = parser.parse_args()
+
+    corrections = load_corrections(args.file)
+    fixed = parse_assignments(args.fix)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in args.names:
+        if name not in corrections:
+            raise FlattenError(f"{args.file} has no correction {name}")
+        lines = flatten(corrections[name], fixed, args.variations)
+        path = os.path.join(args.output_dir, f"{name}.flat")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -152,7 +152,10 @@ def build_config(
             "photon_pfcands_pdgid": "22",
             "fromPV": "3",
 
-            #"kaon_mass": 0.493677,
+            # parameters of the Higgs reconstruction, can be overridden at runtime through HAA_PARAMETERS
+            "daughter_iso_cone": 0.4,
+            "daughter_iso_deltabeta": 0.5,
+            "kaon_mass": 0.493677,
 
             "genpart_pdgid": "23",
             "genpart_status": "62",
@@ -305,9 +308,26 @@ def build_config(
         {
             "deltaR_jet_veto": 0.4,
             "pairselection_min_dR": 0.5,
+            # maximum delta R of a reco daughter and its truth daughter (TruthMatching)
+            "truth_match_max_deltaR": 0.05,
         },
     )
 
+    if sample != "data":
+        configuration.add_producers(
+            "global",
+            [
+                genparticles.GenDecayTree,
+            ],
+        )
+    # signal: drop events without a complete H->aa->4h decay before the reconstruction
+    if sample == "Haa":
+        configuration.add_producers(
+            "global",
+            [
+                genparticles.GenDecayFilter,
+            ],
+        )
     configuration.add_producers(
         "global",
         [
@@ -329,7 +349,8 @@ def build_config(
             pfcands.ChargedPFCands,
             pfcands.NeutralPFCands,
             pfcands.PhotonPFCands,
-            pfcands.fromPV
+            pfcands.fromPV,
+            pfcands.PFCandView,
 #            fromnano.copy,
             #simplejets.GoodJets,
             #simplejets.NumberOfJets,
@@ -358,7 +379,7 @@ def build_config(
         )
 
     configuration.add_producers(
-        scopes,
+        "global",
         [
             higgs.ChargePairs,
             higgs.GoodHiggsDaughtersFilter,
@@ -367,10 +388,16 @@ def build_config(
             higgs.ps_quantities,
             higgs.GetPS,
             higgsdaughters.ps_daughters,
+        ],
+    )
+    configuration.add_producers(
+        scopes,
+        [
             higgsdaughters.GetTrueDaughterP4s,
             higgsdaughters.truth_dQuantities,
             higgs.GetTruthPS,
             higgs.TruthPSQuantities,
+            higgsdaughters.TruthMatching,
             #higgs.ps_masses,
         ],
     )
@@ -644,6 +671,9 @@ def build_config(
             q.puweight,
             q.puweight_up,
             q.puweight_down,
+            q.truth_match_indices,
+            q.truth_match_deltaR,
+            q.truth_fully_matched,
             #q.pt_1,
             #q.pt_2,
             #q.eta_1,
@@ -689,6 +719,9 @@ def build_config(
             q.puweight,
             q.puweight_up,
             q.puweight_down,
+            q.truth_match_indices,
+            q.truth_match_deltaR,
+            q.truth_fully_matched,
             #q.pt_1,
             #q.pt_2,
             #q.eta_1,
@@ -736,6 +769,9 @@ def build_config(
             q.puweight,
             q.puweight_up,
             q.puweight_down,
+            q.truth_match_indices,
+            q.truth_match_deltaR,
+            q.truth_fully_matched,
             #q.pt_1,
             #q.pt_2,
             #q.eta_1,
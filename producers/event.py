@@ -118,4 +118,11 @@ PUweights = Producer(
     input=[nanoAOD.Pileup_nTrueInt],
     output=[q.puweight],
     scopes=["mm","global"],
+)
+PUweightsVariations = Producer(
+    name="PUweightsVariations",
+    call='scalefactor::pileup::variations({df}, correctionManager, {output}, {input}, "{PU_reweighting_file}", "{PU_reweighting_era}", "{flat_corrections_dir}", {PU_reweighting_validation})',
+    input=[nanoAOD.Pileup_nTrueInt],
+    output=[q.puweight_variations, q.puweight, q.puweight_up, q.puweight_down],
+    scopes=["global"],
 )
\ No newline at end of file
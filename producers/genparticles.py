@@ -1,7 +1,32 @@
 from ..quantities import output as q
 from ..quantities import nanoAOD as nanoAOD
-from code_generation.producer import Producer, ProducerGroup
+from code_generation.producer import Producer, ProducerGroup, Filter
 
+####################
+# Decay tree index of the genParticles, built once per event for the truth producers
+####################
+GenDecayTree = Producer(
+    name="GenDecayTree",
+    call="haa::GetGenDecayTree({df}, {input}, {output})",
+    input=[nanoAOD.GenParticle_pdgId, nanoAOD.GenParticle_motherid],
+    output=[q.gen_decay_tree],
+    scopes=["global"],
+)
+# signal only: drop events without a complete H->aa->4h decay before the reconstruction
+GenDecayCompleteFlag = Producer(
+    name="GenDecayCompleteFlag",
+    call="haa::GenDecayComplete({df}, {input}, {output})",
+    input=[q.gen_decay_tree],
+    output=[q.gen_decay_complete],
+    scopes=["global"],
+)
+GenDecayFilter = Filter(
+    name="GenDecayFilter",
+    call='event::filter::Flags({df}, "GenDecayFilter", {input}, "any_of")',
+    input=[],
+    scopes=["global"],
+    subproducers=[GenDecayCompleteFlag],
+)
 ####################
 # Set of producers to get the genParticles from the ditaupair
 ####################
@@ -1,59 +1,88 @@
 from ..quantities import output as q
 from ..quantities import nanoAOD as nanoAOD
-from code_generation.producer import Producer, Filter, ProducerGroup
+from code_generation.producer import BaseFilter, Producer, Filter, ProducerGroup
+
+HiggsDaughtersPreFilter = BaseFilter(
+    name="HiggsDaughtersPreFilter",
+    call='haa::HiggsDaughtersPreFilter({df}, "HiggsDaughtersPreFilter", {input}, {min_pfcands_pt}, {higgs_prefilter_min_per_charge})',
+    input=[nanoAOD.PFCands_pt, nanoAOD.PFCands_charge, q.base_pfcands_mask],
+    scopes=["global"],
+)
 
 HiggsSelection = Producer(
 	name = "HiggsSelection",
-	call = "haa::ClosestToHiggsMassAlgo({df}, {output}, {input})",
+	call = "haa::ClosestToHiggsMassAlgo({df}, {input}, {output}, {higgs_pair_max_deltaR})",
+	input = [
+            q.pfcand_view,
+        ],
+	output = [q.higgsdaughters],
+	scopes = ["global"],
+)
+
+HiggsSelectionGrid = Producer(
+	name = "HiggsSelectionGrid",
+	call = "haa::ClosestToHiggsMassAlgo({df}, {input}, {output}, {higgs_pair_max_deltaR})",
 	input = [
-            nanoAOD.PFCands_pt,
-            nanoAOD.PFCands_eta,
-            nanoAOD.PFCands_phi,
-            nanoAOD.PFCands_mass,
-            nanoAOD.PFCands_charge,
-            q.base_pfcands_mask,
+            q.pfcand_view,
+            q.pfcand_grid,
         ],
 	output = [q.higgsdaughters],
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
+)
+
+# K best quadruplets by the configured ranking, as 4K indices and K scores
+HiggsSelectionRanked = Producer(
+	name = "HiggsSelectionRanked",
+	call = 'haa::RankedQuadrupletsAlgo({df}, {input}, {output}, {higgs_quadruplets_k}, "{higgs_quadruplets_ranking}", {higgs_mass}, {higgs_pair_max_deltaR})',
+	input = [
+            q.pfcand_view,
+        ],
+	output = [q.higgs_quadruplets, q.higgs_quadruplet_scores],
+	scopes = ["global"],
+)
+
+# ClosestToHiggsMass daughters for each (pT threshold, pair ΔR) working point, four indices per working point
+HiggsSelectionScan = Producer(
+	name = "HiggsSelectionScan",
+	call = "haa::ClosestToHiggsMassScan({df}, {input}, {output}, {vec_open}{scan_min_pfcands_pt}{vec_close}, {vec_open}{scan_higgs_pair_max_deltaR}{vec_close})",
+	input = [
+            q.pfcand_view,
+        ],
+	output = [q.higgsdaughters_scan],
+	scopes = ["global"],
 )
 
 FourHardestPFCands = Producer(
         name = "FourHardestPFCands",
-        call = "haa::FourHardestPFCandsAlgo({df}, {output}, {input})",
+        call = "haa::FourHardestPFCandsAlgo({df}, {input}, {output})",
         input = [
-            nanoAOD.PFCands_pt,
-            q.base_pfcands_mask,
+            q.pfcand_view,
         ],
         output = [q.higgsdaughters],
-        scopes = ["mm", "ee", "em"],
+        scopes = ["global"],
 )
 ChargePairs = Producer(
         name = "ChargePairs",
         call = "haa::ChargePairsAlgo({df}, {input}, {output})",
         input = [
-            nanoAOD.PFCands_pt,
-            nanoAOD.PFCands_eta,
-            nanoAOD.PFCands_phi,
-            nanoAOD.PFCands_mass,
-            nanoAOD.PFCands_charge,
-            q.base_pfcands_mask,
+            q.pfcand_view,
         ],
         output = [q.higgsdaughters],
-        scopes = ["mm", "ee", "em"],
+        scopes = ["global"],
 )
 GoodHiggsDaughtersFlag = Producer(
     name="GoodHiggsDaughtersFlag",
     call="ditau_pairselection::flagGoodPairs({df}, {output}, {input})",
     input=[q.higgsdaughters],
     output=[],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 GoodHiggsDaughtersFilter = Filter(
     name="GoodHiggsDaughtersFilter",
     call='event::filter::Flags({df}, "GoodHiggsDaughtersFlag", {input}, "any_of")',
     input=[],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
     subproducers=[GoodHiggsDaughtersFlag],
 )
 
@@ -67,7 +96,7 @@ H_p4 = Producer(
         q.d4_p4,
     ],
     output=[q.H_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 H_pt = Producer(
@@ -75,7 +104,7 @@ H_pt = Producer(
     call="lorentzvector::GetPt({df}, {output}, {input})",
     input=[q.H_p4],
     output=[q.H_pt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 H_eta = Producer(
@@ -83,7 +112,7 @@ H_eta = Producer(
     call="lorentzvector::GetEta({df}, {output}, {input})",
     input=[q.H_p4],
     output=[q.H_eta],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 H_phi = Producer(
@@ -91,7 +120,7 @@ H_phi = Producer(
     call="lorentzvector::GetPhi({df}, {output}, {input})",
     input=[q.H_p4],
     output=[q.H_phi],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 H_mass = Producer(
@@ -99,7 +128,7 @@ H_mass = Producer(
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.H_p4],
     output=[q.H_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 HiggsQuantities = ProducerGroup(
@@ -107,7 +136,7 @@ HiggsQuantities = ProducerGroup(
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [H_p4, H_pt, H_eta, H_phi, H_mass],
 )
 
@@ -116,15 +145,23 @@ GetPS = Producer(
     call="haa::GetMinMassDiff({df}, {input}, {output})",
     input=[
         q.higgsdaughters,
-        nanoAOD.PFCands_pt,
-        nanoAOD.PFCands_eta,
-        nanoAOD.PFCands_phi,
-        nanoAOD.PFCands_mass,
-        nanoAOD.PFCands_charge,
-        q.base_pfcands_mask,
+        q.pfcand_view,
     ],
     output=[q.ps1Pair, q.ps2Pair],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
+)
+
+# Same outputs as GetPS, with the pairing criterion taken from the config:
+# "min_mass_diff", "highest_pair_pt" or "mass_window" (uses ps_mass_hypothesis and ps_mass_width)
+GetPSPairs = Producer(
+    name="GetPSPairs",
+    call='haa::GetPseudoScalarPairs({df}, {input}, {output}, "{ps_pairing_criterion}", {ps_mass_hypothesis}, {ps_mass_width})',
+    input=[
+        q.higgsdaughters,
+        q.pfcand_view,
+    ],
+    output=[q.ps1Pair, q.ps2Pair],
+    scopes=["global"],
 )
 
 ps_1_mass = Producer(
@@ -132,7 +169,7 @@ ps_1_mass = Producer(
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.ps_1_d_1_p4, q.ps_1_d_2_p4],
     output=[q.ps_1_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_1_deltaR = Producer(
@@ -140,7 +177,7 @@ ps_1_deltaR = Producer(
     call="haa::getDaughterDeltaR({df}, {input_vec}, {output})",
     input=[q.ps_1_d_1_p4, q.ps_1_d_2_p4],
     output=[q.ps_1_deltaR],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_2_mass = Producer(
@@ -148,7 +185,7 @@ ps_2_mass = Producer(
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.ps_2_d_1_p4, q.ps_2_d_2_p4],
     output=[q.ps_2_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_2_deltaR = Producer(
@@ -156,7 +193,7 @@ ps_2_deltaR = Producer(
     call="haa::getDaughterDeltaR({df}, {input_vec}, {output})",
     input=[q.ps_2_d_1_p4, q.ps_2_d_2_p4],
     output=[q.ps_2_deltaR],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_quantities = ProducerGroup(
@@ -164,17 +201,83 @@ ps_quantities = ProducerGroup(
     call=None,
     input=None,
     output=None,
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
     subproducers=[ps_1_mass, ps_2_mass, ps_1_deltaR, ps_2_deltaR]
 )
+
+# Fused Higgs candidate: replaces HiggsQuantities, dQuantities (except Daughter_Iso),
+# GetPS, ps_daughters and ps_quantities with one struct column and its accessors
+
+HiggsCandidate = Producer(
+    name="HiggsCandidate",
+    call="haa::GetHiggsCandidate({df}, {input}, {output}, {kaon_mass}, {pion_mass})",
+    input=[
+        q.higgsdaughters,
+        q.pfcand_view,
+        q.daughter_isos,
+        nanoAOD.PFCands_mass,
+    ],
+    output=[q.higgs_candidate],
+    scopes=["global"],
+)
+
+HiggsCandidateQuantities = Producer(
+    name="HiggsCandidateQuantities",
+    call="haa::UnpackHiggsCandidate({df}, {input}, {output_vec})",
+    input=[q.higgs_candidate],
+    output=[
+        q.H_pt,
+        q.H_eta,
+        q.H_phi,
+        q.H_mass,
+        q.ps_1_mass,
+        q.ps_2_mass,
+        q.ps_1_deltaR,
+        q.ps_2_deltaR,
+        q.d1_pt,
+        q.d1_eta,
+        q.d1_phi,
+        q.d1_mass,
+        q.d1_iso,
+        q.d2_pt,
+        q.d2_eta,
+        q.d2_phi,
+        q.d2_mass,
+        q.d2_iso,
+        q.d3_pt,
+        q.d3_eta,
+        q.d3_phi,
+        q.d3_mass,
+        q.d3_iso,
+        q.d4_pt,
+        q.d4_eta,
+        q.d4_phi,
+        q.d4_mass,
+        q.d4_iso,
+    ],
+    scopes=["global"],
+)
+
+# H, ps_1, ps_2 and daughter masses for the pion, kaon and nanoAOD mass hypotheses of the daughters
+HiggsCandidateMassHypotheses = Producer(
+    name="HiggsCandidateMassHypotheses",
+    call="haa::UnpackMassHypotheses({df}, {input}, {output_vec})",
+    input=[q.higgs_candidate],
+    output=[
+        q.H_mass_hypotheses,
+        q.ps_1_mass_hypotheses,
+        q.ps_2_mass_hypotheses,
+        q.daughter_mass_hypotheses,
+    ],
+    scopes=["global"],
+)
 '''
 GetTruthPS = Producer(
     name="GetTruthPS",
-    call="haa::GetTruthDaughterPairs({df}, {output}, {input})",
+    call="haa::GetTruthDaughterPairs({df}, {input}, {output})",
     input=[
         q.truth_daughters,
-        nanoAOD.GenParticle_pdgId,
-        nanoAOD.GenParticle_motherid,
+        q.gen_decay_tree,
     ],
     output=[q.truth_ps_1, q.truth_ps_2],
     scopes=["mm", "ee", "em"],
@@ -4,7 +4,7 @@ from code_generation.producer import Producer, ProducerGroup
 
 Daughter_Iso = Producer(
     name = "Daughter_Iso",
-    call = "haa::pfCandIso({df}, {output}, {input})",
+    call = "haa::pfCandIso({df}, {output}, {input}, {daughter_iso_cone}, {daughter_iso_deltabeta})",
     input = [
         nanoAOD.PFCands_pt, 
         nanoAOD.PFCands_eta, 
@@ -17,14 +17,51 @@ Daughter_Iso = Producer(
         q.fromPV,
         ],
     output = [q.daughter_isos],
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
+)
+
+Daughter_IsoGrid = Producer(
+    name = "Daughter_IsoGrid",
+    call = "haa::pfCandIso({df}, {output}, {input}, {daughter_iso_cone}, {daughter_iso_deltabeta})",
+    input = [
+        nanoAOD.PFCands_pt, 
+        nanoAOD.PFCands_eta, 
+        nanoAOD.PFCands_phi, 
+        nanoAOD.PFCands_mass,
+        q.higgsdaughters,
+        q.ChargedPFCands,
+        q.NeutralPFCands,
+        q.PhotonPFCands,
+        q.fromPV,
+        q.pfcand_grid,
+        ],
+    output = [q.daughter_isos],
+    scopes = ["global"],
+)
+
+Daughter_IsoScan = Producer(
+    name = "Daughter_IsoScan",
+    call = "haa::pfCandIsoScan({df}, {output}, {input}, {vec_open}{scan_daughter_iso_cone}{vec_close}, {daughter_iso_deltabeta})",
+    input = [
+        nanoAOD.PFCands_pt, 
+        nanoAOD.PFCands_eta, 
+        nanoAOD.PFCands_phi, 
+        nanoAOD.PFCands_mass,
+        q.higgsdaughters_scan,
+        q.ChargedPFCands,
+        q.NeutralPFCands,
+        q.PhotonPFCands,
+        q.fromPV,
+        ],
+    output = [q.daughter_isos_scan],
+    scopes = ["global"],
 )
 
 # Get kinematics of hardest hadron
 
 LVPFCand1 = Producer(
     name="LVPFCand1",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output}, {kaon_mass})",
     input=[
         q.higgsdaughters,
         nanoAOD.PFCands_pt,
@@ -33,7 +70,7 @@ LVPFCand1 = Producer(
         nanoAOD.PFCands_mass,
     ],
     output=[q.d1_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d1_pt = Producer(
@@ -41,7 +78,7 @@ d1_pt = Producer(
     call="lorentzvector::GetPt({df}, {output}, {input})",
     input=[q.d1_p4],
     output=[q.d1_pt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d1_eta = Producer(
@@ -49,7 +86,7 @@ d1_eta = Producer(
     call="lorentzvector::GetEta({df}, {output}, {input})",
     input=[q.d1_p4],
     output=[q.d1_eta],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d1_phi = Producer(
@@ -57,35 +94,35 @@ d1_phi = Producer(
     call="lorentzvector::GetPhi({df}, {output}, {input})",
     input=[q.d1_p4],
     output=[q.d1_phi],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d1_mass = Producer(
     name="d1_mass",
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.d1_p4],
     output=[q.d1_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d1_promptFlag = Producer(
     name="d1_promptFlag",
     call="quantities::charge({df}, {output}, 0, {input})",
     input=[q.higgsdaughters, nanoAOD.PFCands_fromPV],
     output=[q.d1_prompt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d1_iso = Producer(
     name="d1_iso",
     call = "event::quantity::Get<float>({df}, {output}, {input}, 0)",
     input = [q.daughter_isos],
     output = [q.d1_iso],
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
 )
 d1Quantities = ProducerGroup(
 	name = "d1Quantities",
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [LVPFCand1, d1_pt, d1_eta, d1_phi, d1_mass, d1_iso],
 )
 
@@ -93,7 +130,7 @@ d1Quantities = ProducerGroup(
 
 LVPFCand2 = Producer(
     name="LVPFCand2",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output}, {kaon_mass})",
     input=[
         q.higgsdaughters,
         nanoAOD.PFCands_pt,
@@ -102,7 +139,7 @@ LVPFCand2 = Producer(
         nanoAOD.PFCands_mass,
     ],
     output=[q.d2_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 
@@ -111,7 +148,7 @@ d2_pt = Producer(
     call="lorentzvector::GetPt({df}, {output}, {input})",
     input=[q.d2_p4],
     output=[q.d2_pt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d2_eta = Producer(
@@ -119,7 +156,7 @@ d2_eta = Producer(
     call="lorentzvector::GetEta({df}, {output}, {input})",
     input=[q.d2_p4],
     output=[q.d2_eta],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d2_phi = Producer(
@@ -127,35 +164,35 @@ d2_phi = Producer(
     call="lorentzvector::GetPhi({df}, {output}, {input})",
     input=[q.d2_p4],
     output=[q.d2_phi],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d2_mass = Producer(
     name="d2_mass",
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.d2_p4],
     output=[q.d2_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d2_promptFlag = Producer(
     name="d1_promptFlag",
     call="quantities::charge({df}, {output}, 1, {input})",
     input=[q.higgsdaughters, nanoAOD.PFCands_fromPV],
     output=[q.d2_prompt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d2_iso = Producer(
     name="d2_iso",
     call = "event::quantity::Get<float>({df}, {output}, {input}, 1)",
     input = [q.daughter_isos],
     output = [q.d2_iso],
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
 )
 d2Quantities = ProducerGroup(
 	name = "d2Quantities",
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [LVPFCand2, d2_pt, d2_eta, d2_phi, d2_mass, d2_iso],
 )
 
@@ -163,7 +200,7 @@ d2Quantities = ProducerGroup(
 
 LVPFCand3 = Producer(
     name="LVPFCand3",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 2, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 2, {output}, {kaon_mass})",
     input=[
         q.higgsdaughters,
         nanoAOD.PFCands_pt,
@@ -172,7 +209,7 @@ LVPFCand3 = Producer(
         nanoAOD.PFCands_mass,
     ],
     output=[q.d3_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 
@@ -181,7 +218,7 @@ d3_pt = Producer(
     call="lorentzvector::GetPt({df}, {output}, {input})",
     input=[q.d3_p4],
     output=[q.d3_pt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d3_eta = Producer(
@@ -189,7 +226,7 @@ d3_eta = Producer(
     call="lorentzvector::GetEta({df}, {output}, {input})",
     input=[q.d3_p4],
     output=[q.d3_eta],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d3_phi = Producer(
@@ -197,35 +234,35 @@ d3_phi = Producer(
     call="lorentzvector::GetPhi({df}, {output}, {input})",
     input=[q.d3_p4],
     output=[q.d3_phi],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d3_mass = Producer(
     name="d3_mass",
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.d3_p4],
     output=[q.d3_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d3_promptFlag = Producer(
     name="d1_promptFlag",
     call="quantities::charge({df}, {output}, 2, {input})",
     input=[q.higgsdaughters, nanoAOD.PFCands_fromPV],
     output=[q.d3_prompt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d3_iso = Producer(
     name="d3_iso",
     call = "event::quantity::Get<float>({df}, {output}, {input}, 2)",
     input = [q.daughter_isos],
     output = [q.d3_iso],
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
 )
 d3Quantities = ProducerGroup(
 	name = "d3Quantities",
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [LVPFCand3, d3_pt, d3_eta, d3_phi, d3_mass, d3_iso],
 )
 
@@ -233,7 +270,7 @@ d3Quantities = ProducerGroup(
 
 LVPFCand4 = Producer(
     name="LVPFCand4",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 3, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 3, {output}, {kaon_mass})",
     input=[
         q.higgsdaughters,
         nanoAOD.PFCands_pt,
@@ -242,7 +279,7 @@ LVPFCand4 = Producer(
         nanoAOD.PFCands_mass,
     ],
     output=[q.d4_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 
@@ -251,7 +288,7 @@ d4_pt = Producer(
     call="lorentzvector::GetPt({df}, {output}, {input})",
     input=[q.d4_p4],
     output=[q.d4_pt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d4_eta = Producer(
@@ -259,7 +296,7 @@ d4_eta = Producer(
     call="lorentzvector::GetEta({df}, {output}, {input})",
     input=[q.d4_p4],
     output=[q.d4_eta],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 d4_phi = Producer(
@@ -267,35 +304,35 @@ d4_phi = Producer(
     call="lorentzvector::GetPhi({df}, {output}, {input})",
     input=[q.d4_p4],
     output=[q.d4_phi],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d4_mass = Producer(
     name="d4_mass",
     call="lorentzvector::GetMass({df}, {output}, {input})",
     input=[q.d4_p4],
     output=[q.d4_mass],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d4_promptFlag = Producer(
     name="d4_promptFlag",
     call="quantities::charge({df}, {output}, 3, {input})",
     input=[q.higgsdaughters, nanoAOD.PFCands_fromPV],
     output=[q.d4_prompt],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 d4_iso = Producer(
     name="d4_iso",
     call = "event::quantity::Get<float>({df}, {output}, {input}, 3)",
     input = [q.daughter_isos],
     output = [q.d4_iso],
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
 )
 d4Quantities = ProducerGroup(
 	name = "d4Quantities",
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [LVPFCand4, d4_pt, d4_eta, d4_phi, d4_mass, d4_iso],
 )
 dQuantities = ProducerGroup(
@@ -303,7 +340,7 @@ dQuantities = ProducerGroup(
 	call = None,
 	input = None,
 	output = None,
-	scopes = ["mm", "ee", "em"],
+	scopes = ["global"],
 	subproducers = [Daughter_Iso, d1Quantities, d2Quantities, d3Quantities, d4Quantities],
 )
 
@@ -311,7 +348,7 @@ dQuantities = ProducerGroup(
 
 ps_1_d_1_p4 = Producer(
     name="ps_1_d_1_p4",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output}, {kaon_mass})",
     input=[
             q.ps1Pair, 
             nanoAOD.PFCands_pt,
@@ -320,12 +357,12 @@ ps_1_d_1_p4 = Producer(
             nanoAOD.PFCands_mass,
         ],
     output=[q.ps_1_d_1_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_1_d_2_p4 = Producer(
     name="ps_1_d_2_p4",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output}, {kaon_mass})",
     input=[
             q.ps1Pair, 
             nanoAOD.PFCands_pt,
@@ -334,12 +371,12 @@ ps_1_d_2_p4 = Producer(
             nanoAOD.PFCands_mass,
         ],
     output=[q.ps_1_d_2_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_2_d_1_p4 = Producer(
     name="ps_2_d_1_p4",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 0, {output}, {kaon_mass})",
     input=[
             q.ps2Pair, 
             nanoAOD.PFCands_pt,
@@ -348,12 +385,12 @@ ps_2_d_1_p4 = Producer(
             nanoAOD.PFCands_mass,
         ],
     output=[q.ps_2_d_1_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_2_d_2_p4 = Producer(
     name="ps_2_d_2_p4",
-    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output})",
+    call="lorentzvector::buildFromPFCand({df}, {input_vec}, 1, {output}, {kaon_mass})",
     input=[
             q.ps2Pair, 
             nanoAOD.PFCands_pt,
@@ -362,7 +399,7 @@ ps_2_d_2_p4 = Producer(
             nanoAOD.PFCands_mass,
         ],
     output=[q.ps_2_d_2_p4],
-    scopes=["mm", "ee", "em"],
+    scopes=["global"],
 )
 
 ps_daughters = ProducerGroup(
@@ -370,7 +407,7 @@ ps_daughters = ProducerGroup(
     call = None,
     input = None,
     output = None,
-    scopes = ["mm", "ee", "em"],
+    scopes = ["global"],
     subproducers = [ps_1_d_1_p4, ps_1_d_2_p4, ps_2_d_1_p4, ps_2_d_2_p4],
 )
 
@@ -378,11 +415,9 @@ ps_daughters = ProducerGroup(
 
 GetTrueDaughterP4s = Producer(
 	name = "GetTrueDaughterP4s",
-	call = "haa::GetTrueDaughterP4s({df}, {output}, {input})",
+	call = "haa::GetTrueDaughterP4s({df}, {input}, {output})",
 	input = [
-			    nanoAOD.nGenParticle,
-                nanoAOD.GenParticle_pdgId,
-                nanoAOD.GenParticle_motherid,
+			    q.gen_decay_tree,
 			    nanoAOD.GenParticle_pt, 
 			    nanoAOD.GenParticle_eta, 
 			    nanoAOD.GenParticle_phi, 
@@ -589,3 +624,22 @@ truth_dQuantities = ProducerGroup(
 	scopes = ["mm", "ee", "em"],
 	subproducers = [truth_d1Quantities, truth_d2Quantities, truth_d3Quantities, truth_d4Quantities, truth_hQuantities],
 )
+
+# Match the reco daughters to the truth daughters
+
+TruthMatching = Producer(
+    name="TruthMatching",
+    call="haa::MatchDaughtersToTruth({df}, {input}, {output}, {truth_match_max_deltaR})",
+    input=[
+        q.d1_p4,
+        q.d2_p4,
+        q.d3_p4,
+        q.d4_p4,
+        q.truth_d1_p4,
+        q.truth_d2_p4,
+        q.truth_d3_p4,
+        q.truth_d4_p4,
+    ],
+    output=[q.truth_match, q.truth_match_indices, q.truth_match_deltaR, q.truth_fully_matched],
+    scopes=["mm", "ee", "em"],
+)
@@ -91,25 +91,23 @@ PFCandsFromPVSelection = Producer(
     scopes=["global"],
 )
 
-VetoOverlappingPFCandsLooseElectrons = Producer(
-    name="VetoOverlappingPFCandsLooseElectrons",
-    call="physicsobject::jet::VetoOverlappingJetsLooseLeptons({df}, {output}, {input}, {deltaR_jet_veto})",
-    input=[nanoAOD.PFCands_eta, nanoAOD.PFCands_phi, q.base_electrons_mask, nanoAOD.Electron_eta, nanoAOD.Electron_phi],
-    output=[q.pfcand_electron_overlap_veto_mask],
-    scopes=["global"],
-)
-VetoOverlappingPFCandsLooseMuons = Producer(
-    name="VetoOverlappingPFCandsLooseMuons",
-    call="physicsobject::jet::VetoOverlappingJetsLooseLeptons({df}, {output}, {input}, {deltaR_jet_veto})",
-    input=[nanoAOD.PFCands_eta, nanoAOD.PFCands_phi, q.base_muons_mask, nanoAOD.Muon_eta, nanoAOD.Muon_phi],
-    output=[q.pfcand_muon_overlap_veto_mask],
-    scopes=["global"],
-)
-VetoOverlappingPFCandsLoosePhotons = Producer(
-    name="VetoOverlappingPFCandsLoosePhotons",
-    call="physicsobject::jet::VetoOverlappingJetsLooseLeptons({df}, {output}, {input}, {deltaR_jet_veto})",
-    input=[nanoAOD.PFCands_eta, nanoAOD.PFCands_phi, q.base_photons_mask, nanoAOD.Photon_eta, nanoAOD.Photon_phi],
-    output=[q.pfcand_photon_overlap_veto_mask],
+VetoOverlappingPFCandsLooseObjects = Producer(
+    name="VetoOverlappingPFCandsLooseObjects",
+    call="physicsobject::jet::VetoOverlappingObjects({df}, {output}, {input_vec}, {deltaR_jet_veto})",
+    input=[
+        nanoAOD.PFCands_eta,
+        nanoAOD.PFCands_phi,
+        q.base_electrons_mask,
+        nanoAOD.Electron_eta,
+        nanoAOD.Electron_phi,
+        q.base_muons_mask,
+        nanoAOD.Muon_eta,
+        nanoAOD.Muon_phi,
+        q.base_photons_mask,
+        nanoAOD.Photon_eta,
+        nanoAOD.Photon_phi,
+    ],
+    output=[q.pfcand_overlap_veto_mask],
     scopes=["global"],
 )
 BasePFCands = ProducerGroup(
@@ -120,9 +118,7 @@ BasePFCands = ProducerGroup(
     scopes=["global"],
     subproducers=[
         ChargedPFCandsPdgId,
-        VetoOverlappingPFCandsLooseElectrons,
-        VetoOverlappingPFCandsLooseMuons,
-        VetoOverlappingPFCandsLoosePhotons,
+        VetoOverlappingPFCandsLooseObjects,
         PFCandsPtCut,
         PFCandsEtaCut,
         PFCandsMinMassCut,
@@ -130,6 +126,52 @@ BasePFCands = ProducerGroup(
         #PFCandsFromPVSelection,
     ],
 )
+BasePFCandsFused = Producer(
+    name="BasePFCandsFused",
+    call="physicsobject::pfcand::FusedSelection({df}, {output}, {input_vec}, {vec_open}{pfcands_pdgid}{vec_close}, {min_pfcands_pt}, {max_pfcands_eta}, {min_pfcands_mass}, {max_pfcands_mass}, {deltaR_jet_veto})",
+    input=[
+        nanoAOD.PFCands_pdgId,
+        nanoAOD.PFCands_pt,
+        nanoAOD.PFCands_eta,
+        nanoAOD.PFCands_phi,
+        nanoAOD.PFCands_mass,
+        q.base_electrons_mask,
+        nanoAOD.Electron_eta,
+        nanoAOD.Electron_phi,
+        q.base_muons_mask,
+        nanoAOD.Muon_eta,
+        nanoAOD.Muon_phi,
+        q.base_photons_mask,
+        nanoAOD.Photon_eta,
+        nanoAOD.Photon_phi,
+    ],
+    output=[q.base_pfcands_mask, q.base_pfcands_indices],
+    scopes=["global"],
+)
+PFCandView = Producer(
+    name="PFCandView",
+    call="haa::GetPFCandView({df}, {input}, {output})",
+    input=[
+        nanoAOD.PFCands_pt,
+        nanoAOD.PFCands_eta,
+        nanoAOD.PFCands_phi,
+        nanoAOD.PFCands_mass,
+        nanoAOD.PFCands_charge,
+        q.base_pfcands_mask,
+    ],
+    output=[q.pfcand_view],
+    scopes=["global"],
+)
+PFCandGrid = Producer(
+    name="PFCandGrid",
+    call="haa::GetEtaPhiGrid({df}, {input}, {output}, {pfcand_grid_cell_size})",
+    input=[
+        nanoAOD.PFCands_eta,
+        nanoAOD.PFCands_phi,
+    ],
+    output=[q.pfcand_grid],
+    scopes=["global"],
+)
 ChargedPFCands = Producer(
     name="ChargedPFCands",
     call="physicsobject::CutQuantity<int>({df}, {output}, {input}, {vec_open}{charged_pfcands_pdgid}{vec_close})",
@@ -110,22 +110,135 @@ Ele_2_ID_SF = Producer(
     scopes=["ee"],
 )
 
+Ele_1_ID_SF_Variations = Producer(
+    name="Ele_1_ID_SF_Variations",
+    call='scalefactor::electron::id_variations({df}, correctionManager, {output}, {input}, "{ele_sf_year_id}", "Medium", "{ele_sf_file}", "{ele_id_sf_name}", "{ele_sf_varation}", "sfup", "sfdown")',
+    input=[q.pt_1, q.eta_1, q.phi_1],
+    output=[
+        q.id_wgt_ele_1_variations,
+        q.id_wgt_ele_1,
+        q.id_wgt_ele_1_up,
+        q.id_wgt_ele_1_down,
+    ],
+    scopes=["em", "ee"],
+)
+Ele_2_ID_SF_Variations = Producer(
+    name="Ele_2_ID_SF_Variations",
+    call='scalefactor::electron::id_variations({df}, correctionManager, {output}, {input}, "{ele_sf_year_id}", "Medium", "{ele_sf_file}", "{ele_id_sf_name}", "{ele_sf_varation}", "sfup", "sfdown")',
+    input=[q.pt_2, q.eta_2, q.phi_2],
+    output=[
+        q.id_wgt_ele_2_variations,
+        q.id_wgt_ele_2,
+        q.id_wgt_ele_2_up,
+        q.id_wgt_ele_2_down,
+    ],
+    scopes=["ee"],
+)
+
 Ele_1_Trigger_SF = Producer(
     name="Ele_1_Trigger_SF",
-    call='scalefactor::electron::trigger({df}, {output}, {input}, "{nom_ele_trigger_sf_file}", "{nom_ele_trigger_sf_name}", "{syst_ele_trigger_sf_file}", "{syst_ele_trigger_sf_name}")',
+    call='scalefactor::electron::trigger({df}, correctionManager, {output}, {input}, "{nom_ele_trigger_sf_file}", "{nom_ele_trigger_sf_name}", "{syst_ele_trigger_sf_file}", "{syst_ele_trigger_sf_name}", "{flat_corrections_dir}")',
     input=[q.pt_1, q.eta_1],
-    output=[q.trigger_wgt_ele_1, q.trigger_wgt_ele_1_up, q.trigger_wgt_ele_1_down],
+    output=[
+        q.trigger_wgt_ele_1_variations,
+        q.trigger_wgt_ele_1,
+        q.trigger_wgt_ele_1_up,
+        q.trigger_wgt_ele_1_down,
+    ],
     scopes=["ee","em"],
 )
 
 Ele_2_Trigger_SF = Producer(
     name="Ele_2_Trigger_SF",
-    call='scalefactor::electron::trigger({df}, {output}, {input}, "{nom_ele_trigger_sf_file}", "{nom_ele_trigger_sf_name}", "{syst_ele_trigger_sf_file}", "{syst_ele_trigger_sf_name}")',
+    call='scalefactor::electron::trigger({df}, correctionManager, {output}, {input}, "{nom_ele_trigger_sf_file}", "{nom_ele_trigger_sf_name}", "{syst_ele_trigger_sf_file}", "{syst_ele_trigger_sf_name}", "{flat_corrections_dir}")',
     input=[q.pt_2, q.eta_2],
-    output=[q.trigger_wgt_ele_2, q.trigger_wgt_ele_2_up, q.trigger_wgt_ele_2_down],
+    output=[
+        q.trigger_wgt_ele_2_variations,
+        q.trigger_wgt_ele_2,
+        q.trigger_wgt_ele_2_up,
+        q.trigger_wgt_ele_2_down,
+    ],
     scopes=["ee"], 
 )
 
+############################
+# Muon ID, ISO, Trigger SF with their up and down shifts
+# All variations are evaluated once per event, instead of one producer run per shift
+############################
+
+Muon_1_ID_SF_Variations = Producer(
+    name="MuonID_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_id_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_1, q.eta_1],
+    output=[
+        q.id_wgt_mu_1_variations,
+        q.id_wgt_mu_1,
+        q.id_wgt_mu_1_up,
+        q.id_wgt_mu_1_down,
+    ],
+    scopes=["mm"],
+)
+Muon_1_Iso_SF_Variations = Producer(
+    name="MuonIso_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_iso_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_1, q.eta_1],
+    output=[
+        q.iso_wgt_mu_1_variations,
+        q.iso_wgt_mu_1,
+        q.iso_wgt_mu_1_up,
+        q.iso_wgt_mu_1_down,
+    ],
+    scopes=["mm"],
+)
+Muon_1_Trigger_SF_Variations = Producer(
+    name="MuonTrigger_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_trigger_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_1, q.eta_1],
+    output=[
+        q.trigger_wgt_mu_1_variations,
+        q.trigger_wgt_mu_1,
+        q.trigger_wgt_mu_1_up,
+        q.trigger_wgt_mu_1_down,
+    ],
+    scopes=["mm"],
+)
+Muon_2_ID_SF_Variations = Producer(
+    name="MuonID_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_id_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_2, q.eta_2],
+    output=[
+        q.id_wgt_mu_2_variations,
+        q.id_wgt_mu_2,
+        q.id_wgt_mu_2_up,
+        q.id_wgt_mu_2_down,
+    ],
+    scopes=["mm", "em"],
+)
+Muon_2_Iso_SF_Variations = Producer(
+    name="MuonIso_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_iso_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_2, q.eta_2],
+    output=[
+        q.iso_wgt_mu_2_variations,
+        q.iso_wgt_mu_2,
+        q.iso_wgt_mu_2_up,
+        q.iso_wgt_mu_2_down,
+    ],
+    scopes=["mm", "em"],
+)
+Muon_2_Trigger_SF_Variations = Producer(
+    name="MuonTrigger_SF_Variations",
+    call='scalefactor::muon::variations({df}, correctionManager, {output}, {input}, "{muon_sf_file}", "{muon_trigger_sf_name}", "{flat_corrections_dir}")',
+    input=[q.pt_2, q.eta_2],
+    output=[
+        q.trigger_wgt_mu_2_variations,
+        q.trigger_wgt_mu_2,
+        q.trigger_wgt_mu_2_up,
+        q.trigger_wgt_mu_2_down,
+    ],
+    scopes=["mm", "em"],
+)
+
 MuonIDIsoTrigger_SF = ProducerGroup(
     name="MuonIDIso_SF",
     call=None,
@@ -149,6 +262,29 @@ MuonIDIsoTrigger_SF = ProducerGroup(
     },
 )
 
+MuonIDIsoTrigger_SF_Variations = ProducerGroup(
+    name="MuonIDIso_SF_Variations",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["em", "mm"],
+    subproducers={
+        "em": [
+            Muon_2_ID_SF_Variations,
+            Muon_2_Iso_SF_Variations,
+            Muon_2_Trigger_SF_Variations,
+        ],
+        "mm": [
+            Muon_1_ID_SF_Variations,
+            Muon_1_Iso_SF_Variations,
+            Muon_1_Trigger_SF_Variations,
+            Muon_2_ID_SF_Variations,
+            Muon_2_Iso_SF_Variations,
+            Muon_2_Trigger_SF_Variations,
+        ],
+    },
+)
+
 ElectronIDTrigger_SF = ProducerGroup(
     name="ElectronIDTrigger_SF",
     call=None,
@@ -169,6 +305,26 @@ ElectronIDTrigger_SF = ProducerGroup(
     }
 )
 
+ElectronIDTrigger_SF_Variations = ProducerGroup(
+    name="ElectronIDTrigger_SF_Variations",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["ee", "em"],
+    subproducers={
+        "ee": [
+            Ele_1_ID_SF_Variations,
+            Ele_2_ID_SF_Variations,
+            Ele_1_Trigger_SF,
+            Ele_2_Trigger_SF,
+        ],
+        "em": [
+            Ele_1_ID_SF_Variations,
+            Ele_1_Trigger_SF,
+        ],
+    },
+)
+
 
 MuonIDIso_SF_RooWorkspace = ProducerGroup(
     name="MuonIDIso_SF_RooWorkspace",
@@ -4,6 +4,7 @@ lumi = Quantity("lumi")
 puweight = Quantity("puweight")
 puweight_up = Quantity("puweight_up")
 puweight_down = Quantity("puweight_down")
+puweight_variations = Quantity("puweight_variations")
 prefireweight = Quantity("prefiring_wgt")
 
 base_taus_mask = Quantity("base_taus_mask")
@@ -20,15 +21,18 @@ veto_electrons_mask_2 = Quantity("veto_electrons_mask_2")
 electron_veto_flag = Quantity("extraelec_veto")
 base_photons_mask = Quantity("base_photons_mask")
 base_pfcands_mask = Quantity("base_pfcands_mask")
+base_pfcands_indices = Quantity("base_pfcands_indices")
+pfcand_view = Quantity("pfcand_view")
+pfcand_grid = Quantity("pfcand_grid")
+gen_decay_tree = Quantity("gen_decay_tree")
+gen_decay_complete = Quantity("gen_decay_complete")
 jet_id_mask = Quantity("jet_id_mask")
 jet_puid_mask = Quantity("jet_puid_mask")
 jet_overlap_veto_mask = Quantity("jet_overlap_veto_mask")
 jet_electron_overlap_veto_mask = Quantity("jet_electron_overlap_veto_mask")
 jet_muon_overlap_veto_mask = Quantity("jet_muon_overlap_veto_mask")
 jet_photon_overlap_veto_mask = Quantity("jet_photon_overlap_veto_mask")
-pfcand_electron_overlap_veto_mask = Quantity("pfcand_electron_overlap_veto_mask")
-pfcand_muon_overlap_veto_mask = Quantity("pfcand_muon_overlap_veto_mask")
-pfcand_photon_overlap_veto_mask = Quantity("pfcand_photon_overlap_veto_mask")
+pfcand_overlap_veto_mask = Quantity("pfcand_overlap_veto_mask")
 met_pt_mask = Quantity("met_pt_mask")
 good_jets_mask = Quantity("good_jets_mask")
 good_fatjets_mask = Quantity("good_fatjets_mask")
@@ -110,6 +114,10 @@ good_pfcands_mask = Quantity("good_pfcands_mask")
 npfcands = Quantity("npfcands")
 
 higgsdaughters = Quantity("higgsdaughters")
+higgs_quadruplets = Quantity("higgs_quadruplets")
+higgs_quadruplet_scores = Quantity("higgs_quadruplet_scores")
+higgsdaughters_scan = Quantity("higgsdaughters_scan")
+higgs_candidate = Quantity("higgs_candidate")
 ChargedPFCands = Quantity("ChargedPFCands")
 NeutralPFCands = Quantity("NeutralPFCands")
 PhotonPFCands = Quantity("PhotonPFCands")
@@ -136,6 +144,7 @@ pfcands_phi = Quantity("pfcands_phi")
 pfcands_mass = Quantity("pfcands_mass")
 
 daughter_isos = Quantity("daughter_isos")
+daughter_isos_scan = Quantity("daughter_isos_scan")
 
 d1_p4 = Quantity("d1_p4")
 d1_pt = Quantity("d1_pt")
@@ -191,6 +200,11 @@ truth_d4_pt = Quantity("truth_d4_pt")
 truth_d4_eta = Quantity("truth_d4_eta")
 truth_d4_phi = Quantity("truth_d4_phi")
 
+truth_match = Quantity("truth_match")
+truth_match_indices = Quantity("truth_match_indices")
+truth_match_deltaR = Quantity("truth_match_deltaR")
+truth_fully_matched = Quantity("truth_fully_matched")
+
 truth_ps_1_d_1_p4 = Quantity("truth_ps_1_d_1_p4")
 truth_ps_1_d_2_p4 = Quantity("truth_ps_1_d_2_p4")
 truth_ps_1_mass = Quantity("truth_ps_1_mass")
@@ -213,6 +227,12 @@ H_eta = Quantity("H_eta")
 H_phi = Quantity("H_phi")
 H_mass = Quantity("H_mass")
 
+# masses for the pion, kaon and nanoAOD mass hypotheses of the daughters, in this order
+H_mass_hypotheses = Quantity("H_mass_hypotheses")
+ps_1_mass_hypotheses = Quantity("ps_1_mass_hypotheses")
+ps_2_mass_hypotheses = Quantity("ps_2_mass_hypotheses")
+daughter_mass_hypotheses = Quantity("daughter_mass_hypotheses")
+
 ps_mass_12 = Quantity("ps_mass_12")
 ps_mass_14 = Quantity("ps_mass_14")
 ps_mass_23 = Quantity("ps_mass_23")
@@ -487,12 +507,20 @@ id_wgt_ele_wp80nonIso_1 = Quantity("id_wgt_ele_wp80nonIso_1")
 id_wgt_ele_wp80nonIso_2 = Quantity("id_wgt_ele_wp80nonIso_2")
 id_wgt_ele_1 = Quantity("id_wgt_ele_1")
 id_wgt_ele_2 = Quantity("id_wgt_ele_2")
+id_wgt_ele_1_up = Quantity("id_wgt_ele_1_up")
+id_wgt_ele_2_up = Quantity("id_wgt_ele_2_up")
+id_wgt_ele_1_down = Quantity("id_wgt_ele_1_down")
+id_wgt_ele_2_down = Quantity("id_wgt_ele_2_down")
+id_wgt_ele_1_variations = Quantity("id_wgt_ele_1_variations")
+id_wgt_ele_2_variations = Quantity("id_wgt_ele_2_variations")
 trigger_wgt_ele_1 = Quantity("trigger_wgt_ele_1")
 trigger_wgt_ele_2 = Quantity("trigger_wgt_ele_2")
 trigger_wgt_ele_1_up = Quantity("trigger_wgt_ele_1_up")
 trigger_wgt_ele_2_up = Quantity("trigger_wgt_ele_2_up")
 trigger_wgt_ele_1_down = Quantity("trigger_wgt_ele_1_down")
 trigger_wgt_ele_2_down = Quantity("trigger_wgt_ele_2_down")
+trigger_wgt_ele_1_variations = Quantity("trigger_wgt_ele_1_variations")
+trigger_wgt_ele_2_variations = Quantity("trigger_wgt_ele_2_variations")
 # Muon weights
 id_wgt_mu_1 = Quantity("id_wgt_mu_1")
 id_wgt_mu_2 = Quantity("id_wgt_mu_2")
@@ -500,6 +528,24 @@ iso_wgt_mu_1 = Quantity("iso_wgt_mu_1")
 iso_wgt_mu_2 = Quantity("iso_wgt_mu_2")
 trigger_wgt_mu_1 = Quantity("trigger_wgt_mu_1")
 trigger_wgt_mu_2 = Quantity("trigger_wgt_mu_2")
+id_wgt_mu_1_up = Quantity("id_wgt_mu_1_up")
+id_wgt_mu_2_up = Quantity("id_wgt_mu_2_up")
+id_wgt_mu_1_down = Quantity("id_wgt_mu_1_down")
+id_wgt_mu_2_down = Quantity("id_wgt_mu_2_down")
+id_wgt_mu_1_variations = Quantity("id_wgt_mu_1_variations")
+id_wgt_mu_2_variations = Quantity("id_wgt_mu_2_variations")
+iso_wgt_mu_1_up = Quantity("iso_wgt_mu_1_up")
+iso_wgt_mu_2_up = Quantity("iso_wgt_mu_2_up")
+iso_wgt_mu_1_down = Quantity("iso_wgt_mu_1_down")
+iso_wgt_mu_2_down = Quantity("iso_wgt_mu_2_down")
+iso_wgt_mu_1_variations = Quantity("iso_wgt_mu_1_variations")
+iso_wgt_mu_2_variations = Quantity("iso_wgt_mu_2_variations")
+trigger_wgt_mu_1_up = Quantity("trigger_wgt_mu_1_up")
+trigger_wgt_mu_2_up = Quantity("trigger_wgt_mu_2_up")
+trigger_wgt_mu_1_down = Quantity("trigger_wgt_mu_1_down")
+trigger_wgt_mu_2_down = Quantity("trigger_wgt_mu_2_down")
+trigger_wgt_mu_1_variations = Quantity("trigger_wgt_mu_1_variations")
+trigger_wgt_mu_2_variations = Quantity("trigger_wgt_mu_2_variations")
 
 # TriggerObject Quantities
 TriggerObject_filterBits_vector = Quantity("TriggerObject_filterBits_vector")